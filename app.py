@@ -1,9 +1,117 @@
-from flask import Flask, render_template, request, jsonify
-from compiler import lexer, parser, evaluator, semantic
-import traceback
+from flask import Flask, g, render_template, request, jsonify, stream_with_context, url_for
+from compiler import artifacts, batch, cache, evaluator, incremental, live, stream, jsonenc, limits, metrics, pipeline, profiling, session
+import os
+import time
 
 app = Flask(__name__)
 
+# Presupuesto (en bytes) de la caché de respuestas de /compile; 0 la desactiva.
+app.config['COMPILE_CACHE_MAX_BYTES'] = int(os.environ.get('COMPILE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+compile_cache = cache.CompileCache(app.config['COMPILE_CACHE_MAX_BYTES'])
+
+# Directorio del almacén de artefactos (tokens, AST, parse-tree y análisis
+# semántico de cada código ya compilado, ver compiler.artifacts); vacío lo
+# desactiva. Conviene que persista entre despliegues.
+app.config['ARTIFACT_DIR'] = os.environ.get('ARTIFACT_DIR', '')
+artifact_store = artifacts.open_store(app.config['ARTIFACT_DIR'])
+
+# Documentos abiertos por el editor para la compilación incremental
+app.config['MAX_OPEN_DOCUMENTS'] = int(os.environ.get('MAX_OPEN_DOCUMENTS', 256))
+documents = incremental.DocumentStore(app.config['MAX_OPEN_DOCUMENTS'])
+
+# Canales de compilación en vivo (/live, ver compiler.live): máximo de
+# canales abiertos y segundos entre mensajes para mantener vivo el stream
+app.config['MAX_LIVE_CHANNELS'] = int(os.environ.get('MAX_LIVE_CHANNELS', 256))
+app.config['LIVE_KEEPALIVE_SECONDS'] = float(os.environ.get('LIVE_KEEPALIVE_SECONDS', live.KEEPALIVE_SECONDS))
+live_channels = live.ChannelStore(app.config['MAX_LIVE_CHANNELS'])
+
+# Sesiones persistentes (/session, ver compiler.session): máximo de sesiones
+# abiertas, segundos de inactividad hasta que expiran (0: nunca) y límites de
+# cada sesión (variables y bytes estimados de sus valores; 0: sin límite)
+app.config['MAX_SESSIONS'] = int(os.environ.get('MAX_SESSIONS', 256))
+app.config['SESSION_IDLE_SECONDS'] = float(os.environ.get('SESSION_IDLE_SECONDS', 900))
+app.config['SESSION_MAX_VARIABLES'] = int(os.environ.get('SESSION_MAX_VARIABLES', 10000))
+app.config['SESSION_MAX_BYTES'] = int(os.environ.get('SESSION_MAX_BYTES', 4 * 1024 * 1024))
+sessions = session.SessionStore(app.config['MAX_SESSIONS'], app.config['SESSION_IDLE_SECONDS'],
+                                app.config['SESSION_MAX_VARIABLES'], app.config['SESSION_MAX_BYTES'])
+
+# Compilación por lotes (/compile/batch): procesos de trabajo (0 = uno por
+# CPU), programas por bloque (0 = automático) y máximo de programas por lote
+app.config['BATCH_WORKERS'] = int(os.environ.get('BATCH_WORKERS', 0))
+app.config['BATCH_CHUNK_SIZE'] = int(os.environ.get('BATCH_CHUNK_SIZE', 0))
+app.config['BATCH_MAX_PROGRAMS'] = int(os.environ.get('BATCH_MAX_PROGRAMS', 10000))
+# Continuaciones por petición a /compile/branches
+app.config['MAX_BRANCHES'] = int(os.environ.get('MAX_BRANCHES', 1000))
+batch_compiler = batch.BatchCompiler(app.config['BATCH_WORKERS'] or None, app.config['BATCH_CHUNK_SIZE'] or None)
+
+# Límites de recursos por compilación (ver compiler.limits); 0 desactiva cada
+# uno. El deadline (segundos) cuenta desde que llega la petición (en
+# /compile/batch, desde que empieza cada programa; en /compile/stream los
+# demás límites valen para cada sentencia). Por defecto MAX_INT_BITS es el entero más ancho que todavía se
+# puede convertir a texto (ver sys.get_int_max_str_digits).
+app.config['MAX_SOURCE_BYTES'] = int(os.environ.get('MAX_SOURCE_BYTES', 4 * 1024 * 1024))
+app.config['MAX_TOKENS'] = int(os.environ.get('MAX_TOKENS', 1000000))
+app.config['MAX_AST_DEPTH'] = int(os.environ.get('MAX_AST_DEPTH', 2000))
+app.config['MAX_AST_NODES'] = int(os.environ.get('MAX_AST_NODES', 1000000))
+app.config['MAX_EVAL_STEPS'] = int(os.environ.get('MAX_EVAL_STEPS', 5000000))
+app.config['MAX_INT_BITS'] = int(os.environ.get('MAX_INT_BITS', limits.MAX_TEXT_INT_BITS))
+app.config['COMPILE_DEADLINE'] = float(os.environ.get('COMPILE_DEADLINE', 10))
+
+# Perfilado bajo demanda de /compile (ver compiler.profiling): fracción de
+# las peticiones que lo piden que se perfilan (0 lo desactiva), máximo de
+# perfiles por minuto (0: sin máximo) y perfiles guardados para /profile/<id>
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0))
+app.config['PROFILE_MAX_PER_MINUTE'] = int(os.environ.get('PROFILE_MAX_PER_MINUTE', 60))
+app.config['PROFILE_MAX_STORED'] = int(os.environ.get('PROFILE_MAX_STORED', 32))
+profile_sampler = profiling.Sampler(app.config['PROFILE_SAMPLE_RATE'], app.config['PROFILE_MAX_PER_MINUTE'])
+profiles = profiling.ProfileStore(app.config['PROFILE_MAX_STORED'])
+
+# Métricas de la aplicación (las del pipeline están en compiler.metrics)
+REQUEST_SECONDS = metrics.REGISTRY.histogram(
+    'http_request_seconds', 'Latencia de las peticiones por endpoint', metrics.LATENCY_BUCKETS, ('endpoint',))
+REQUESTS = metrics.REGISTRY.counter(
+    'http_requests_total', 'Peticiones atendidas por endpoint y código de estado', ('endpoint', 'status'))
+LIVE_COMPILES = metrics.REGISTRY.counter(
+    'compile_live_requests_total', 'Versiones recibidas por los canales en vivo según su destino', ('outcome',))
+PROFILE_REQUESTS = metrics.REGISTRY.counter(
+    'compile_profile_requests_total', 'Peticiones que pidieron perfilado, perfiladas o no', ('outcome',))
+metrics.REGISTRY.callback(
+    'compile_cache_events_total', 'Aciertos, fallos y expulsiones de la caché de /compile', 'counter',
+    lambda: {(k,): v for k, v in compile_cache.stats().items() if k in ('hits', 'misses', 'evictions')}, ('event',))
+metrics.REGISTRY.callback(
+    'compile_cache_entries', 'Respuestas guardadas en la caché de /compile', 'gauge',
+    lambda: compile_cache.stats()['entries'])
+metrics.REGISTRY.callback(
+    'compile_cache_bytes', 'Bytes ocupados por la caché de /compile', 'gauge',
+    lambda: compile_cache.stats()['bytes'])
+metrics.REGISTRY.callback(
+    'compile_live_channels', 'Canales de compilación en vivo abiertos', 'gauge', lambda: len(live_channels))
+metrics.REGISTRY.callback(
+    'compile_sessions_open', 'Sesiones abiertas', 'gauge', lambda: sessions.stats()['open'])
+metrics.REGISTRY.callback(
+    'compile_sessions_events_total', 'Sesiones creadas, expiradas, cerradas y rechazadas', 'counter',
+    lambda: {(k,): v for k, v in sessions.stats().items() if k != 'open'}, ('event',))
+if artifact_store is not None:
+    metrics.REGISTRY.callback(
+        'compile_artifacts_events_total', 'Aciertos, fallos, escrituras y errores del almacén de artefactos',
+        'counter', lambda: {(k,): v for k, v in artifact_store.stats().items()}, ('event',))
+
+
+@app.before_request
+def _start_timer():
+    g.start_time = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    # las respuestas en streaming sólo miden hasta que empieza el envío
+    start = g.pop('start_time', None)
+    if start is not None and request.endpoint != 'metrics_endpoint':
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+        REQUESTS.inc(endpoint, str(response.status_code))
+    return response
+
 
 @app.route('/')
 def index():
@@ -15,99 +123,401 @@ def index():
 def compile_code():
     """Endpoint que recibe el código del cliente, lo compila y devuelve
 
-    Resumen del flujo:
-    1. LEX: tokenizar con lexer.lex
-    2. PARSE: construir AST y parse-tree usando parser.parse
-    3. SEMANTIC: análisis semántico simple (uso antes de asignar)
-    4. EVALUATE: si no hay errores semánticos, evaluar el AST
-    5. Construir respuesta JSON con tokens, representación legible (lex),
-       AST serializada, texto del parse-tree y resultados/validaciones.
+    Las respuestas correctas se guardan en `compile_cache` indexadas por el
+    hash del código, de modo que un reenvío idéntico sólo cuesta calcular el
+    hash y buscarlo (ver compiler.pipeline.compile_source para el pipeline completo).
+    Con `profile: true` (o la cabecera `X-Profile: 1`) la compilación se
+    perfila si el muestreo lo admite (ver _profile_for).
     """
     code = request.json.get('code', '')
+    if not isinstance(code, str):
+        return jsonify({'ok': False, 'error': '`code` debe ser un string'}), 400
+    budget = _budget()
+    # backend, tokenizer, optimize, flat, share, sections y render (ver pipeline.read_options)
     try:
-        # LEXICAL: convertir texto a tokens
-        tokens = lexer.lex(code)
-        validation = {
-            'lexical': {'ok': True, 'message': f'{len(tokens)} token(s) generados' if tokens else '0 tokens'}
-        }
+        options = pipeline.read_options(request.json)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    prof = _profile_for(request.json)
+    if prof is not None:
+        return _profiled(prof, code, options, budget)
+    if request.json.get('doc') is not None:
+        return _compile_document(request.json, options, budget)
+    # ambos backends, todos los lexers y todas las formas del AST producen la
+    # misma respuesta: no entran en la clave
+    key = cache.make_key(code, options['optimize'], options['sections'], options['render_options'])
+    body = compile_cache.get(key)
+    if body is not None:
+        return app.response_class(body, mimetype=app.json.mimetype, headers={'X-Cache': 'HIT'})
+    payload, status = pipeline.compile_source(code, budget=budget, store=artifact_store, **options)
+    if status != 200:
+        return jsonify(payload), status
+    body, status = _json_body(payload)
+    if status != 200:
+        return app.response_class(body, status=status, mimetype=app.json.mimetype)
+    compile_cache.put(key, body)
+    return app.response_class(body, mimetype=app.json.mimetype, headers={'X-Cache': 'MISS'})
+
+
+def _profile_for(data):
+    """Profile para esta petición, o None si no lo pidió o el muestreo no lo admite."""
+    flag = data.get('profile')
+    if flag is None:
+        flag = request.headers.get('X-Profile', '').lower() in ('1', 'true', 'yes')
+    if not flag:
+        return None
+    if not profile_sampler.admit():
+        PROFILE_REQUESTS.inc('skipped')
+        return None
+    PROFILE_REQUESTS.inc('profiled')
+    return profiling.Profile()
 
-        # SYNTACTIC: parsear tokens -> AST + parse-tree
-        try:
-            parsed = parser.parse(tokens)
-            # parser.parse devuelve (program, parse_root)
-            if isinstance(parsed, tuple):
-                ast_node, parse_root = parsed
-            else:
-                ast_node = parsed
-                parse_root = None
-            validation['syntactic'] = {'ok': True, 'message': 'Parseo correcto'}
-        except Exception as pe:
-            # Capturar error de parseo y continuar para devolver información útil
-            ast_node = None
-            parse_root = None
-            validation['syntactic'] = {'ok': False, 'message': str(pe)}
-
-        # SEMANTIC: sólo si el parse fue correcto
-        if validation.get('syntactic', {}).get('ok'):
-            semantic_res = semantic.analyze(ast_node)
-            validation['semantic'] = {'ok': semantic_res.get('ok', False), 'message': semantic_res.get('message', '')}
-        else:
-            semantic_res = {'symbols': {}, 'errors': ['Parse error, análisis semántico omitido'], 'ok': False, 'message': 'Omitido'}
-            validation['semantic'] = {'ok': False, 'message': 'Omitido por error sintáctico'}
 
-        # EVALUATION: si hay errores semánticos no evaluamos
-        if semantic_res.get('errors'):
-            result = None
+def _profiled(prof, code, options, budget):
+    """Compila perfilando (sin pasar por la caché de respuestas).
+
+    La respuesta es la de siempre más `profile: {id, url}` y la cabecera
+    X-Profile-Id; el reporte queda en /profile/<id>.
+    """
+    with prof:
+        if request.json.get('doc') is not None:
+            response = app.make_response(_compile_document(request.json, options, budget, prof))
         else:
-            result = evaluator.evaluate(ast_node)
-
-        # Mapeo para etiquetas legibles en español y reconocimiento de keywords
-        def token_label(tok):
-            t = tok.type
-            v = tok.value
-            # detectar 'keywords' simples (si se decide introducirlas)
-            if t == 'ID' and isinstance(v, str) and v in ('let', 'var', 'const'):
-                return ('declare', v)
-            if t == 'ID':
-                return ('identificador', v)
-            if t == 'NUMBER':
-                return ('number', v)
-            if t in ('ASSIGN', 'PLUS', 'MINUS', 'MUL', 'DIV'):
-                return ('operador', v)
-            if t in ('LPAREN', 'RPAREN'):
-                return ('paren', v)
-            if t == 'SEMI':
-                return ('separador', v)
-            return (t.lower(), v)
-
-        lex_display = [f"[{lbl}: {val}]" for (lbl, val) in (token_label(t) for t in tokens)]
-
-        # Intentar producir ambas formas de texto del parse-tree (vertical y centrado)
-        parse_text = None
-        try:
-            parse_text = parse_root.to_text(0) if parse_root and hasattr(parse_root, 'to_text') else None
-        except Exception:
-            parse_text = None
-        parse_text_centered = None
+            payload, status = pipeline.compile_source(code, budget=budget, store=artifact_store,
+                                                     counters=prof.counters, **options)
+            payload['profile'] = _profile_link(prof)
+            response = _json_response(payload, status)
+    prof.counters['response_bytes'] = response.content_length
+    profiles.put(prof)
+    response.headers['X-Profile-Id'] = prof.id
+    return response
+
+
+def _profile_link(prof):
+    return {'id': prof.id, 'url': url_for('profile_report', profile_id=prof.id)}
+
+
+@app.route('/profile/<profile_id>', methods=['GET'])
+def profile_report(profile_id):
+    """Reporte de una compilación perfilada.
+
+    Por defecto JSON con contadores y las funciones más costosas (`limit`,
+    50 por defecto); `format=collapsed` devuelve las pilas en formato plegado
+    para herramientas de flame graph (flamegraph.pl, inferno, speedscope).
+    """
+    prof = profiles.get(profile_id)
+    if prof is None:
+        return jsonify({'ok': False, 'error': 'Perfil desconocido'}), 404
+    if request.args.get('format') == 'collapsed':
+        return app.response_class(prof.collapsed(), mimetype='text/plain')
+    try:
+        limit = int(request.args.get('limit', profiling.DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'ok': False, 'error': '`limit` debe ser un entero'}), 400
+    return jsonify(dict(prof.to_dict(limit), ok=True))
+
+
+@app.route('/compile/stream', methods=['POST'])
+def compile_stream():
+    """Compilación en streaming para programas muy grandes.
+
+    El cuerpo de la petición es el código en texto plano; se lee por bloques
+    y la respuesta (NDJSON, enviada por partes) tiene una línea por sentencia
+    a medida que se evalúa (ver compiler.stream.run_stream). Los límites de
+    la configuración valen para cada sentencia; el deadline, para todo el
+    stream.
+    """
+    records = stream.run_stream(request.stream, budget=_budget())
+    lines = (app.json.dumps(r) + '\n' for r in records)
+    return app.response_class(stream_with_context(lines), mimetype='application/x-ndjson')
+
+
+@app.route('/compile/batch', methods=['POST'])
+def compile_batch():
+    """Compila muchos programas en una sola petición.
+
+    Cuerpo: {programs: [código, ...]} más las mismas opciones que /compile
+    (backend, tokenizer, optimize, sections, flat, share, render), que se aplican a todos. Responde
+    {ok, results} con un payload por programa, en el mismo orden; un programa
+    con error (también si su resultado no se puede serializar) no afecta a
+    los demás (ver compiler.batch).
+    """
+    programs = request.json.get('programs')
+    if not isinstance(programs, list) or not all(isinstance(p, str) for p in programs):
+        return jsonify({'ok': False, 'error': '`programs` debe ser una lista de strings'}), 400
+    if len(programs) > app.config['BATCH_MAX_PROGRAMS']:
+        return jsonify({'ok': False, 'error': f'Demasiados programas (máximo {app.config["BATCH_MAX_PROGRAMS"]})'}), 400
+    try:
+        options = pipeline.read_options(request.json)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    results = batch_compiler.compile(programs, limits=limits.from_config(app.config),
+                                     artifact_dir=app.config['ARTIFACT_DIR'] or None, **options)
+    payload = {'ok': True, 'results': results}
+    body, status = _json_body(payload)
+    if status != 200:
+        # un resultado que no se puede serializar se reemplaza por su error;
+        # los de los demás programas se conservan
+        payload['results'] = [_serializable(r) for r in results]
+        body, status = _json_body(payload)
+    return app.response_class(body, status=status, mimetype=app.json.mimetype)
+
+
+@app.route('/compile/branches', methods=['POST'])
+def compile_branches():
+    """Evalúa un prefijo común una vez y varias continuaciones sobre su estado.
+
+    Cuerpo: {prefix: código, suffixes: [código, ...], backend}. Responde
+    {ok, prefix, branches} con un resultado por continuación, en el mismo
+    orden (ver compiler.pipeline.compile_branches).
+    """
+    data = request.json
+    prefix = data.get('prefix', '')
+    suffixes = data.get('suffixes')
+    if not isinstance(prefix, str) or not isinstance(suffixes, list) or not all(isinstance(s, str) for s in suffixes):
+        return jsonify({'ok': False, 'error': '`prefix` debe ser un string y `suffixes` una lista de strings'}), 400
+    if len(suffixes) > app.config['MAX_BRANCHES']:
+        return jsonify({'ok': False, 'error': f'Demasiadas continuaciones (máximo {app.config["MAX_BRANCHES"]})'}), 400
+    backend = data.get('backend', 'tree')
+    if backend not in evaluator.BACKENDS:
+        return jsonify({'ok': False, 'error': f'Backend desconocido: {backend}'}), 400
+    payload, status = pipeline.compile_branches(prefix, suffixes, backend, _budget())
+    return _json_response(payload, status)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Métricas en formato de texto de Prometheus
+    return app.response_class(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/compile/cache', methods=['GET'])
+def compile_cache_stats():
+    # Contadores de la caché de compilación (aciertos, fallos, expulsiones)
+    return jsonify(compile_cache.stats())
+
+
+@app.route('/live/<channel_id>/events', methods=['GET'])
+def live_events(channel_id):
+    """Stream SSE del canal en vivo (ver compiler.live).
+
+    Eventos `stage` ({stage, version, ...secciones}) a medida que cada
+    etapa de una compilación termina y `done` ({version, status, ok,
+    validation, ...}) al final; un comentario cada LIVE_KEEPALIVE_SECONDS
+    mantiene viva la conexión.
+    """
+    channel = live_channels.get(channel_id, create=True)
+
+    def events():
+        for item in channel.subscribe(app.config['LIVE_KEEPALIVE_SECONDS']):
+            if item is None:
+                yield ': keepalive\n\n'
+            else:
+                event, _, data = item
+                yield live.sse(event, _json_body(data)[0].decode('utf-8'))
+    return app.response_class(stream_with_context(events()), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/live/<channel_id>/compile', methods=['POST'])
+def live_compile(channel_id):
+    """Compila una versión del código para el canal en vivo.
+
+    Cuerpo: {version (entero creciente), code} más las opciones de /compile.
+    Las etapas se publican en el stream del canal; la respuesta sólo dice
+    qué pasó con la versión: 'done', 'stale' (ya había una más nueva) o
+    'superseded' (cancelada por una más nueva).
+    """
+    data = request.json
+    version = data.get('version')
+    if type(version) is not int:
+        return jsonify({'ok': False, 'error': '`version` debe ser un entero'}), 400
+    try:
+        options = pipeline.read_options(data)
+    except ValueError as e:
+        return jsonify({'ok': False, 'error': str(e)}), 400
+    channel = live_channels.get(channel_id, create=True)
+    outcome = live.compile_live(channel, version, data.get('code', ''), dict(options, store=artifact_store), _budget())
+    LIVE_COMPILES.inc(outcome)
+    return jsonify({'ok': True, 'version': version, 'state': outcome})
+
+
+@app.route('/session', methods=['POST'])
+def session_create():
+    """Abre una sesión persistente (ver compiler.session).
+
+    Con `code` en el cuerpo lo aplica como primera entrada. Responde 201 con
+    el id en `session`, o 503 si ya hay demasiadas sesiones abiertas.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        sess = sessions.create()
+    except session.SessionLimitExceeded as e:
+        return jsonify({'ok': False, 'error': str(e), 'budget': e.to_dict()}), 503
+    code = data.get('code')
+    if not code:
+        return jsonify({'ok': True, 'session': sess.id, 'statements': 0}), 201
+    with sess.lock:
+        payload, status = sess.run(code, _budget())
+    return _json_response(payload, 201 if status == 200 else status)
+
+
+@app.route('/session/<session_id>', methods=['POST'])
+def session_run(session_id):
+    """Aplica `code` (sólo las sentencias nuevas) a la sesión.
+
+    La respuesta es como la de /compile para esas sentencias: `result`,
+    `semantic` y `validation`; una entrada con errores no cambia la sesión.
+    404 si la sesión no existe o expiró.
+    """
+    sess = sessions.get(session_id)
+    if sess is None:
+        return jsonify({'ok': False, 'error': 'Sesión desconocida o expirada'}), 404
+    code = request.json.get('code', '')
+    if not isinstance(code, str):
+        return jsonify({'ok': False, 'error': '`code` debe ser un string'}), 400
+    with sess.lock:
+        payload, status = sess.run(code, _budget())
+    return _json_response(payload, status)
+
+
+@app.route('/session/<session_id>', methods=['GET'])
+def session_info(session_id):
+    # resumen de la sesión: sentencias, variables y memoria estimada
+    sess = sessions.get(session_id)
+    if sess is None:
+        return jsonify({'ok': False, 'error': 'Sesión desconocida o expirada'}), 404
+    return jsonify(dict(sess.info(), ok=True))
+
+
+@app.route('/session/<session_id>', methods=['DELETE'])
+def session_close(session_id):
+    if not sessions.close(session_id):
+        return jsonify({'ok': False, 'error': 'Sesión desconocida o expirada'}), 404
+    return jsonify({'ok': True, 'session': session_id})
+
+
+def _budget():
+    # presupuesto de una compilación según la configuración (ver compiler.limits)
+    return limits.Budget(**limits.from_config(app.config))
+
+
+def _compile_document(data, options, budget=None, prof=None):
+    """Modo incremental de /compile.
+
+    El cliente identifica su documento con `doc` (un string o un entero).
+    Puede enviar el texto completo (`code`), que abre o reinicia el documento,
+    o una edición `edit: {start, end, text}` sobre la versión `version`; en ese
+    caso sólo se re-lexea y re-parsea la región afectada. Si la versión no
+    coincide se responde 409 con la versión actual y el cliente debe reenviar
+    `code`. El lexeo y el parseo del documento respetan `budget`: si se agota
+    (también si la edición lo dejaría por encima del tamaño máximo) se
+    responde 400 con el límite y la edición no se aplica.
+    La evaluación reutiliza los resultados de la anterior del mismo documento
+    (ver compiler.depgraph). `options` son las de pipeline.read_options.
+    Con `prof` (compiler.profiling.Profile) sus contadores se completan y la
+    respuesta enlaza el perfil.
+    """
+    counters = prof.counters if prof is not None else None
+    doc_id = data['doc']
+    if not isinstance(doc_id, (str, int)):
+        return jsonify({'ok': False, 'error': '`doc` debe ser un string o un entero'}), 400
+    edit = data.get('edit')
+    if edit is None:
+        code = data.get('code', '')
         try:
-            parse_text_centered = parse_root.to_text_centered() if parse_root and hasattr(parse_root, 'to_text_centered') else None
-        except Exception:
-            parse_text_centered = None
-
-        return jsonify({
-            'ok': True,
-            'tokens': [t._asdict() for t in tokens],
-            'lex': lex_display,
-            'ast': ast_node.to_dict() if ast_node else None,
-            'parse_text': parse_text,
-            'parse_text_centered': parse_text_centered,
-            'result': result,
-            'semantic': semantic_res,
-            'validation': validation
-        })
-    except Exception as e:
-        # Error inesperado: devolver traza para depuración en el frontend
-        return jsonify({'ok': False, 'error': str(e), 'trace': traceback.format_exc()}), 400
+            # el tamaño, los tokens, la profundidad y el tiempo se acotan al
+            # abrirlo, como en el pipeline
+            doc = documents.open(doc_id, code, budget)
+        except limits.BudgetExceeded as e:
+            return _document_response(_document_budget_error(e), doc_id, None, prof)
+    else:
+        doc = documents.get(doc_id)
+        if doc is None:
+            return jsonify({'ok': False, 'error': 'Documento desconocido', 'version': None}), 409
+    with doc.lock:
+        if edit is not None:
+            try:
+                doc.apply_edit(data.get('version'), edit['start'], edit['end'], edit.get('text', ''), budget)
+            except incremental.VersionMismatch as e:
+                return jsonify({'ok': False, 'error': str(e), 'version': e.expected}), 409
+            except limits.BudgetExceeded as e:
+                # la edición no se aplicó: el documento sigue en su versión
+                return _document_response(_document_budget_error(e), doc_id, doc.version, prof)
+            except (KeyError, TypeError, ValueError) as e:
+                return jsonify({'ok': False, 'error': f'Edición inválida: {e}'}), 400
+        code = doc.text
+        version = doc.version
+        # documento válido: reutilizar tokens/AST/parse-tree; si no, el
+        # pipeline completo reproduce el error con su posición exacta
+        front = (doc.tokens(), doc.program(), doc.parse_root()) if doc.error is None else None
+    payload, status = pipeline.compile_source(code, front=front, budget=budget, render_cache=doc.render_cache,
+                                             reactive=doc.reactive, counters=counters, **options)
+    return _document_response((payload, status), doc_id, version, prof)
+
+
+def _document_budget_error(e):
+    # presupuesto agotado al lexear/parsear el documento: el tamaño y los
+    # tokens son de la fase léxica, el resto de la sintáctica
+    phase = 'lexical' if e.limit in ('source_bytes', 'tokens') else 'syntactic'
+    return pipeline.budget_error(e, phase)
+
+
+def _document_response(result, doc_id, version, prof):
+    payload, status = result
+    payload['doc'] = doc_id
+    payload['version'] = version
+    if prof is not None:
+        payload['profile'] = _profile_link(prof)
+    return _json_response(payload, status)
+
+
+def _json_body(payload, status=200):
+    """Serializa una respuesta a bytes JSON; devuelve (body, status).
+
+    Un AST muy anidado supera la recursión del codificador estándar; en ese
+    caso se usa el codificador iterativo de compiler.jsonenc (misma salida).
+    Un entero con más dígitos de los que Python convierte a texto
+    (sys.get_int_max_str_digits()) no se puede serializar: la respuesta pasa
+    a ser el error {'ok': False, 'error'} con status 400, como cualquier otro
+    error de compilación.
+    """
+    start = time.perf_counter()
+    try:
+        text = _dumps(payload)
+    except ValueError as e:
+        metrics.ERRORS.inc('serialize')
+        text = app.json.dumps(_serialize_error(e))
+        status = 400
+    body = text.encode('utf-8')
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - start, 'serialize')
+    return body, status
+
+
+def _dumps(payload):
+    try:
+        return app.json.dumps(payload)
+    except RecursionError:
+        return jsonenc.dumps(payload, sort_keys=app.json.sort_keys, ensure_ascii=app.json.ensure_ascii)
+
+
+def _serialize_error(e):
+    return {'ok': False, 'error': f'No se puede serializar la respuesta: {e}'}
+
+
+def _serializable(payload):
+    # `payload` si se puede serializar; si no, el error que devolvería _json_body
+    try:
+        _dumps(payload)
+    except ValueError as e:
+        return _serialize_error(e)
+    return payload
+
+
+def _json_response(payload, status=200, headers=None):
+    # respuesta JSON con _json_body (status 400 si no se puede serializar)
+    body, status = _json_body(payload, status)
+    return app.response_class(body, status=status, mimetype=app.json.mimetype, headers=headers)
 
 
 if __name__ == '__main__':
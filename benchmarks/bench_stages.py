@@ -0,0 +1,241 @@
+"""Benchmarks por etapa del pipeline (lexers, parser, semántico, evaluador, renders).
+
+Mide cada etapa por separado sobre los programas de generators.WORKLOADS en
+varios tamaños: el mejor tiempo de `repeat` ejecuciones y el pico de memoria
+(tracemalloc, en una ejecución aparte para no distorsionar los tiempos).
+
+Uso como script (desde la raíz del repositorio):
+
+    python benchmarks/bench_stages.py --save benchmarks/baseline.json
+    python benchmarks/bench_stages.py --compare benchmarks/baseline.json
+
+Con --compare termina con código 1 si alguna etapa es más lenta (o usa más
+memoria) que en la línea base por encima de --threshold. La línea base
+depende de la máquina, por eso no se versiona.
+
+Con pytest (hay que indicar el archivo explícitamente):
+
+    BENCH_BASELINE=benchmarks/baseline.json python -m pytest benchmarks/bench_stages.py
+
+ejecuta los mismos casos que la línea base y falla si alguno empeora; sin
+línea base el test se omite.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from compiler import evaluator, lexer, parser, render, semantic  # noqa: E402
+
+from generators import WORKLOADS  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+# duración mínima de cada muestra de tiempo (ver measure)
+MIN_SAMPLE_TIME = 0.02
+# diferencias menores que esto se consideran ruido aunque superen el umbral
+MIN_TIME_DELTA = 0.0005
+MIN_MEMORY_DELTA = 64 * 1024
+# el texto de los renders completos del parse-tree crece cuadráticamente con
+# la profundidad: sólo se miden hasta este número de tokens
+RENDER_MAX_TOKENS = 2500
+# límites del render acotado (compiler.render), que se mide en todos los tamaños
+RENDER_LIMITS = {'max_depth': 12, 'max_chain': 6, 'max_width': 200}
+
+
+def stages(code):
+    """Etapas a medir para `code`: lista de (nombre, función sin argumentos).
+
+    Cada etapa recibe la salida (ya calculada) de las anteriores, así se mide
+    sólo su propio trabajo.
+    """
+    tokens = lexer.lex(code)
+    columns = lexer.scan_columns(code)
+    program, root = parser.parse(tokens)
+    out = [
+        ('lex', lambda: lexer.lex(code)),
+        ('scan', lambda: lexer.scan(code)),
+        ('scan_columns', lambda: lexer.scan_columns(code)),
+        ('parse', lambda: parser.parse(tokens)),
+        ('parse_ast_only', lambda: parser.parse(tokens, build_tree=False)),
+        ('parse_columns', lambda: parser.parse(columns, build_tree=False)),
+        ('semantic', lambda: semantic.analyze(program)),
+        ('evaluate_tree', lambda: evaluator.evaluate(program, 'tree')),
+        ('evaluate_vm', lambda: evaluator.evaluate(program, 'vm')),
+        ('to_dict', lambda: program.to_dict()),
+        ('render_bounded', lambda: render.Renderer(**RENDER_LIMITS).to_text(root)),
+    ]
+    if len(tokens) <= RENDER_MAX_TOKENS:
+        out.append(('to_text', lambda: root.to_text()))
+        out.append(('to_text_centered', lambda: root.to_text_centered()))
+    return out
+
+
+def measure(fn, repeat):
+    """Devuelve (mejor tiempo en segundos, pico de memoria en bytes).
+
+    Como timeit: cada muestra ejecuta `fn` las veces necesarias para durar al
+    menos MIN_SAMPLE_TIME (las etapas cortas son muy ruidosas si se miden de
+    a una) y se toma la mejor de `repeat` muestras.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_TIME:
+            break
+        number *= 2 if elapsed * 10 >= MIN_SAMPLE_TIME else 10
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(cases, repeat=5, log=None):
+    """Ejecuta los benchmarks de `cases` (lista de (workload, tamaño)).
+
+    Devuelve el documento JSON de resultados: metadatos y, por cada clave
+    'workload:tamaño:etapa', {'seconds', 'peak_bytes'}.
+    """
+    results = {}
+    for workload, size in cases:
+        generate, _ = WORKLOADS[workload]
+        code = generate(size)
+        for stage, fn in stages(code):
+            seconds, peak = measure(fn, repeat)
+            key = f'{workload}:{size}:{stage}'
+            results[key] = {'seconds': seconds, 'peak_bytes': peak}
+            if log:
+                log(f'{key:45} {seconds * 1000:10.2f} ms {peak / 1024:12.1f} KiB')
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def default_cases(workloads=None, sizes=None, quick=False):
+    cases = []
+    for name in workloads or WORKLOADS:
+        if name not in WORKLOADS:
+            raise ValueError(f'Workload desconocido: {name} (disponibles: {", ".join(WORKLOADS)})')
+        default_sizes = WORKLOADS[name][1]
+        for size in sizes or (default_sizes[:2] if quick else default_sizes):
+            cases.append((name, size))
+    return cases
+
+
+def baseline_cases(baseline):
+    """Casos (workload, tamaño) presentes en una línea base."""
+    cases = []
+    for key in baseline['results']:
+        workload, size, _ = key.split(':')
+        if workload in WORKLOADS and (workload, int(size)) not in cases:
+            cases.append((workload, int(size)))
+    return cases
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Lista de regresiones de `current` respecto de `baseline`.
+
+    Cada regresión es un dict con key, metric ('seconds' o 'peak_bytes'),
+    baseline, current y ratio. Sólo cuenta si supera `threshold` (relativo)
+    y además la diferencia absoluta mínima (para ignorar el ruido).
+    """
+    regressions = []
+    for key, cur in current['results'].items():
+        base = baseline['results'].get(key)
+        if base is None:
+            continue
+        for metric, min_delta in (('seconds', MIN_TIME_DELTA), ('peak_bytes', MIN_MEMORY_DELTA)):
+            b, c = base[metric], cur[metric]
+            if c > b * (1 + threshold) and c - b > min_delta:
+                regressions.append({'key': key, 'metric': metric, 'baseline': b, 'current': c,
+                                    'ratio': c / b if b else float('inf')})
+    return regressions
+
+
+def format_regression(reg):
+    return f"{reg['key']} {reg['metric']}: {reg['baseline']:.6g} -> {reg['current']:.6g} (x{reg['ratio']:.2f})"
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(doc, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def test_stages_against_baseline():
+    # ejecutado por pytest sólo si se le pasa este archivo explícitamente
+    import pytest
+    path = os.environ.get('BENCH_BASELINE', DEFAULT_BASELINE)
+    if not os.path.exists(path):
+        pytest.skip(f'Sin línea base ({path}); crearla con: python benchmarks/bench_stages.py --save {path}')
+    baseline = load(path)
+    threshold = float(os.environ.get('BENCH_THRESHOLD', DEFAULT_THRESHOLD))
+    current = run(baseline_cases(baseline), baseline.get('repeat', 5))
+    regressions = compare(current, baseline, threshold)
+    assert not regressions, 'Regresiones:\n' + '\n'.join(map(format_regression, regressions))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Benchmarks por etapa del compilador.')
+    ap.add_argument('--workloads', help=f'lista separada por comas (por defecto: {",".join(WORKLOADS)})')
+    ap.add_argument('--sizes', help='tamaños separados por comas (por defecto, los de cada workload)')
+    ap.add_argument('--quick', action='store_true', help='sólo los dos tamaños más chicos de cada workload')
+    ap.add_argument('--repeat', type=int, default=5, help='ejecuciones por medición (se toma la mejor)')
+    ap.add_argument('--save', metavar='PATH', help='guardar los resultados como línea base JSON')
+    ap.add_argument('--compare', metavar='PATH', help='comparar con una línea base (mismos casos que ella)')
+    ap.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                    help='empeoramiento relativo tolerado (0.25 = 25%%)')
+    args = ap.parse_args(argv)
+
+    baseline = load(args.compare) if args.compare else None
+    if baseline is not None and not (args.workloads or args.sizes or args.quick):
+        cases = baseline_cases(baseline)
+    else:
+        cases = default_cases(args.workloads.split(',') if args.workloads else None,
+                              [int(s) for s in args.sizes.split(',')] if args.sizes else None,
+                              args.quick)
+    current = run(cases, args.repeat, log=print)
+    if args.save:
+        save(current, args.save)
+        print(f'Línea base guardada en {args.save}')
+    if baseline is not None:
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regresión(es) por encima del {args.threshold:.0%}:')
+            for reg in regressions:
+                print('  ' + format_regression(reg))
+            return 1
+        print('Sin regresiones')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
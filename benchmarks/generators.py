@@ -0,0 +1,73 @@
+"""Generadores de programas sintéticos para los benchmarks.
+
+Cada generador recibe un tamaño `n` (y una semilla) y devuelve el código
+fuente de un programa válido (sin errores semánticos ni divisiones por
+cero), de modo que todas las etapas del pipeline se pueden medir sobre él:
+
+- statements: n sentencias cortas, mezcla de asignaciones y expresiones
+- deep_nesting: una expresión con n niveles de paréntesis anidados
+- wide_expression: una única expresión con n operandos encadenados
+- many_variables: n variables distintas, cada una usando las anteriores
+- float_literals: n sentencias con muchos literales reales
+"""
+import random
+
+OPS = '+-*'
+
+
+def statements(n, seed=0):
+    r = random.Random(seed)
+    lines = ['x0 = 1;']
+    for i in range(1, n):
+        a = r.randint(0, i - 1) if i > 1 else 0
+        if r.random() < 0.8:
+            lines.append(f'x{i} = x{a} {r.choice(OPS)} {r.randint(1, 9)} * {r.randint(1, 9)};')
+        else:
+            lines.append(f'(x{a} + {r.randint(1, 9)}) / {r.randint(1, 9)};')
+    return '\n'.join(lines)
+
+
+def deep_nesting(n, seed=0):
+    r = random.Random(seed)
+    ops = [r.choice(OPS) for _ in range(n)]
+    return 'y = ' + '(' * n + '1' + ''.join(f' {op} 2)' for op in ops) + ';'
+
+
+def wide_expression(n, seed=0):
+    r = random.Random(seed)
+    parts = ['a']
+    for _ in range(1, n):
+        parts.append(r.choice(OPS))
+        parts.append(str(r.randint(1, 9)) if r.random() < 0.5 else 'a')
+    return 'a = 3;\n' + ' '.join(parts) + ';'
+
+
+def many_variables(n, seed=0):
+    r = random.Random(seed)
+    lines = []
+    for i in range(n):
+        if i < 2:
+            lines.append(f'var_{i} = {i + 1};')
+        else:
+            lines.append(f'var_{i} = (var_{r.randrange(i)} + var_{r.randrange(i)}) / 2 + {r.randint(1, 9)};')
+    lines.append(f'var_{n - 1} * 2;')
+    return '\n'.join(lines)
+
+
+def float_literals(n, seed=0):
+    r = random.Random(seed)
+    lines = []
+    for i in range(n):
+        terms = ' + '.join(f'{r.randint(0, 999)}.{r.randint(0, 999999):06d}' for _ in range(4))
+        lines.append(f'f{i % 50} = {terms} / {r.randint(1, 99)}.5;')
+    return '\n'.join(lines)
+
+
+# nombre -> (generador, tamaños por defecto)
+WORKLOADS = {
+    'statements': (statements, (100, 1000, 10000)),
+    'deep_nesting': (deep_nesting, (100, 1000, 5000)),
+    'wide_expression': (wide_expression, (100, 1000, 10000)),
+    'many_variables': (many_variables, (100, 1000, 10000)),
+    'float_literals': (float_literals, (100, 1000, 5000)),
+}
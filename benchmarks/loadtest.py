@@ -0,0 +1,687 @@
+"""Prueba de carga de POST /compile con percentiles de latencia.
+
+Reproduce una mezcla configurable de programas (válidos, con errores de
+sintaxis, semánticos o de ejecución, y programas grandes) contra la
+aplicación y reporta el throughput, la latencia p50/p95/p99 (total y por
+escenario y por separado para aciertos y fallos de la caché de /compile),
+los códigos de estado, la tasa de errores y la memoria del servidor a lo
+largo de la prueba. Sirve para dimensionar despliegues y para
+detectar regresiones de latencia antes de publicar.
+
+Destinos (--target):
+
+- client: el cliente de pruebas de Flask en este mismo proceso (sin red)
+- serve: levanta app.py en un servidor HTTP local (puerto libre) en este
+  proceso y le envía las peticiones por loopback
+- una URL (http://host:puerto): un servidor ya en marcha; su memoria sólo se
+  mide si se indica --pid (se lee /proc/<pid>/statm)
+
+Modos de carga:
+
+- --concurrency N (por defecto): N clientes que envían una petición tras
+  otra (carga cerrada)
+- --rate R: R peticiones por segundo a intervalos fijos, atendidas por
+  --concurrency clientes (carga abierta). La latencia se cuenta desde el
+  instante en que la petición debía salir, así que si el servidor no da
+  abasto la espera en cola aparece en los percentiles.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/loadtest.py --duration 30 --concurrency 8
+    python benchmarks/loadtest.py --rate 50 --mix valid=80,syntax=10,large=10
+    python benchmarks/loadtest.py --target serve --save benchmarks/load_baseline.json
+    python benchmarks/loadtest.py --compare benchmarks/load_baseline.json
+
+Caché de /compile: por defecto cada petición lleva un código distinto (se
+antepone una asignación numerada al programa), así que todas las respuestas
+se compilan y la latencia es la del pipeline. Con --repeat se reenvían los
+mismos `--variants` programas y las repeticiones aciertan en la caché.
+
+Con --compare termina con código 1 si algún percentil empeora (o el
+throughput baja) por encima de --threshold. Como en bench_stages.py, la
+línea base depende de la máquina y no se versiona; con pytest:
+
+    LOAD_BASELINE=benchmarks/load_baseline.json python -m pytest benchmarks/loadtest.py
+"""
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'load_baseline.json')
+DEFAULT_THRESHOLD = 0.25
+# diferencias de latencia menores que esto se consideran ruido
+MIN_LATENCY_DELTA = 0.002
+# muestras por encima de un percentil necesarias para compararlo (ver min_samples)
+MIN_TAIL_SAMPLES = 5
+DEFAULT_MIX = 'valid=60,syntax=10,semantic=10,runtime=10,large=10'
+PERCENTILES = (50, 95, 99)
+
+
+# --- Escenarios ---
+#
+# Cada escenario genera un programa a partir de una semilla. Se arma un
+# conjunto de `variants` programas por escenario; con --repeat las
+# repeticiones aciertan en la caché de /compile (ver unique_bodies).
+
+def program(seed, n):
+    """Programa válido de unas `n` sentencias: asignaciones que leen variables
+    ya asignadas y alguna expresión suelta."""
+    r = random.Random(seed)
+    lines = ['x0 = 1;']
+    defined = 1
+    for _ in range(1, n):
+        a = r.randrange(defined)
+        if r.random() < 0.8:
+            lines.append(f'x{defined} = x{a} {r.choice("+-*")} {r.randint(1, 9)} * {r.randint(1, 9)};')
+            defined += 1
+        else:
+            lines.append(f'(x{a} + {r.randint(1, 9)}) / {r.randint(1, 9)};')
+    return '\n'.join(lines)
+
+
+def valid(seed, size):
+    return program(seed, random.Random(seed).randint(5, 50))
+
+
+def syntax_error(seed, size):
+    # sentencia incompleta al final: el parser llega al ';' esperando un operando
+    return valid(seed, size) + f'\nerr_{seed} = (1 + ;'
+
+
+def semantic_error(seed, size):
+    # lectura de una variable nunca asignada
+    return valid(seed, size) + f'\nresult_{seed} = undefined_{seed} + 1;'
+
+
+def runtime_error(seed, size):
+    return valid(seed, size) + f'\nzero_{seed} = x0 / (x0 - x0);'
+
+
+def large(seed, size):
+    return program(seed, size)
+
+
+# nombre -> generador
+SCENARIOS = {
+    'valid': valid,
+    'syntax': syntax_error,
+    'semantic': semantic_error,
+    'runtime': runtime_error,
+    'large': large,
+}
+
+
+def parse_mix(text):
+    """'valid=60,syntax=10' -> {'valid': 60.0, 'syntax': 10.0} (pesos relativos)."""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f'Escenario desconocido: {name} (disponibles: {", ".join(SCENARIOS)})')
+        mix[name] = float(weight) if weight else 1.0
+    if not any(w > 0 for w in mix.values()):
+        raise ValueError('La mezcla no tiene ningún escenario con peso positivo')
+    return mix
+
+
+def build_programs(mix, variants=50, large_size=1000, seed=0):
+    """Programas de cada escenario de `mix`: {nombre: [código, ...]}."""
+    programs = {}
+    for name, weight in mix.items():
+        if weight > 0:
+            # los programas grandes son caros de generar y de enviar: menos variantes
+            n = max(1, variants // 10) if name == 'large' else variants
+            programs[name] = [SCENARIOS[name](seed + i, large_size) for i in range(n)]
+    return programs
+
+
+# marca dónde va la sentencia que hace único cada cuerpo (json.dumps la escapa)
+UNIQUE_MARK = '\x00'
+
+
+def body_template(code, extra):
+    """Cuerpo JSON de `code` partido en (antes, después) del lugar donde
+    unique_body inserta su sentencia."""
+    body = json.dumps(dict(extra, code=UNIQUE_MARK + code)).encode('utf-8')
+    head, _, tail = body.partition(json.dumps(UNIQUE_MARK)[1:-1].encode('ascii'))
+    return head, tail
+
+
+def unique_body(template, n):
+    """Cuerpo con la asignación `req_<n> = <n>;` antes del programa: un código
+    distinto por petición (no acierta en la caché) con el mismo resultado."""
+    head, tail = template
+    return b'%sreq_%d = %d;\\n%s' % (head, n, n, tail)
+
+
+# --- Destinos ---
+
+class FlaskClientTarget:
+    """POST /compile con el cliente de pruebas de Flask (un cliente por hilo)."""
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.post('/compile', data=body, content_type='application/json')
+        return resp.status_code, resp.headers.get('X-Cache')
+
+    def close(self):
+        pass
+
+
+class HTTPTarget:
+    """POST /compile por HTTP a `url` (una conexión persistente por hilo)."""
+    def __init__(self, url, timeout=60):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise ValueError(f'URL no soportada: {url} (se espera http://host:puerto)')
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path.rstrip('/') + '/compile'
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def post(self, body):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request('POST', self.path, body, {'Content-Type': 'application/json'})
+            resp = conn.getresponse()
+            resp.read()
+        except Exception:
+            # la próxima petición de este hilo abre otra conexión
+            conn.close()
+            self._local.conn = None
+            raise
+        return resp.status, resp.getheader('X-Cache')
+
+    def close(self):
+        pass
+
+
+class LocalServer:
+    """app.py servido en 127.0.0.1 (puerto libre) desde un hilo de este proceso."""
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            # sin una línea de log por petición
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.thread.join()
+
+
+def rss_bytes(pid=None):
+    """Memoria residente del proceso `pid` (por defecto éste), o None si no se puede leer."""
+    try:
+        with open(f'/proc/{pid or "self"}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if pid is None:
+        try:
+            import resource
+        except ImportError:
+            return None
+        # pico (no actual) de memoria residente: KiB en Linux, bytes en macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+
+# --- Estadísticas ---
+
+def percentile(sorted_values, p):
+    """Percentil `p` (0-100) por rango más cercano de una lista ordenada."""
+    if not sorted_values:
+        return None
+    k = math.ceil(p / 100 * len(sorted_values)) - 1
+    return sorted_values[min(max(k, 0), len(sorted_values) - 1)]
+
+
+def summarize(latencies):
+    values = sorted(latencies)
+    out = {'count': len(values)}
+    for p in PERCENTILES:
+        out[f'p{p}'] = percentile(values, p)
+    out['max'] = values[-1] if values else None
+    out['mean'] = sum(values) / len(values) if values else None
+    return out
+
+
+class Recorder:
+    """Resultados de las peticiones, compartidos por los hilos de carga.
+
+    Cada resultado es (escenario, instante de fin, latencia, estado, caché),
+    con estado el código HTTP o None si la petición falló sin respuesta, y
+    caché la cabecera X-Cache ('HIT', 'MISS' o None en las respuestas de
+    error, que no pasan por la caché).
+    """
+    def __init__(self):
+        self.results = []
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    def add(self, scenario, end, latency, status, cache=None):
+        with self._lock:
+            self.results.append((scenario, end, latency, status, cache))
+            if cache == 'HIT':
+                self.cache_hits += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.results)
+
+
+def is_error(status):
+    # sin respuesta o error del servidor; los 4xx (p.ej. límites) son
+    # respuestas esperables y se reportan aparte por código
+    return status is None or status >= 500
+
+
+# --- Ejecución ---
+
+def run(target, programs, mix, duration=10.0, concurrency=4, rate=None, requests=None,
+        sample_interval=1.0, memory_pid=None, seed=0, body_options=None, log=None, measure_memory=True,
+        repeat=False):
+    """Ejecuta la prueba y devuelve el documento JSON del reporte.
+
+    - target: objeto con post(body) -> (estado, X-Cache)
+    - programs / mix: los de build_programs y parse_mix
+    - duration: segundos (sin contar el arranque); requests: máximo de
+      peticiones (termina con lo primero que se cumpla)
+    - rate: peticiones por segundo (carga abierta) o None (carga cerrada)
+    - sample_interval: cada cuántos segundos se registra la línea de tiempo
+      (peticiones, errores, p95 del intervalo y memoria del servidor)
+    - memory_pid: proceso cuya memoria se mide (None: este proceso);
+      measure_memory=False no la mide (servidor remoto sin --pid)
+    - body_options: opciones extra del cuerpo de /compile (backend, sections...)
+    - repeat: reenviar los mismos cuerpos (aciertan en la caché) en lugar
+      de hacer único cada uno
+    """
+    names = [n for n in mix if n in programs]
+    weights = [mix[n] for n in names]
+    extra = dict(body_options or {})
+    # cuerpos ya serializados: el cliente no compite con el servidor por la CPU
+    if repeat:
+        bodies = {n: [json.dumps(dict(extra, code=code)).encode('utf-8') for code in programs[n]] for n in names}
+    else:
+        bodies = {n: [body_template(code, extra) for code in programs[n]] for n in names}
+    # número de la petición para unique_body (next() es atómico)
+    counter = itertools.count()
+    recorder = Recorder()
+    stop = threading.Event()
+    issued = [0]
+    issued_lock = threading.Lock()
+
+    def take():
+        # reserva una petición del total; False si ya no quedan
+        with issued_lock:
+            if stop.is_set() or (requests is not None and issued[0] >= requests):
+                return False
+            issued[0] += 1
+            return True
+
+    def send(r, scheduled):
+        name = r.choices(names, weights)[0]
+        body = r.choice(bodies[name])
+        if not repeat:
+            body = unique_body(body, next(counter))
+        try:
+            status, cache = target.post(body)
+        except Exception:
+            status, cache = None, None
+        end = time.perf_counter()
+        recorder.add(name, end, end - scheduled, status, cache)
+
+    def closed_worker(worker_seed):
+        r = random.Random(worker_seed)
+        while take():
+            send(r, time.perf_counter())
+
+    pending = queue.Queue()
+    # peticiones de la carga abierta que seguían en cola al terminar la prueba
+    dropped = [0]
+
+    def open_worker(worker_seed):
+        r = random.Random(worker_seed)
+        while True:
+            scheduled = pending.get()
+            if scheduled is None:
+                return
+            if stop.is_set():
+                with issued_lock:
+                    dropped[0] += 1
+                continue
+            send(r, scheduled)
+
+    def scheduler():
+        interval = 1.0 / rate
+        next_at = time.perf_counter()
+        while take():
+            delay = next_at - time.perf_counter()
+            if delay > 0 and stop.wait(delay):
+                break
+            pending.put(next_at)
+            next_at += interval
+        for _ in range(concurrency):
+            pending.put(None)
+
+    timeline = []
+    start = time.perf_counter()
+    def memory():
+        return rss_bytes(memory_pid) if measure_memory else None
+
+    base_rss = memory()
+    threads = [threading.Thread(target=open_worker if rate else closed_worker, args=(seed + i,), daemon=True)
+               for i in range(concurrency)]
+    if rate:
+        threads.append(threading.Thread(target=scheduler, daemon=True))
+    for t in threads:
+        t.start()
+
+    seen = [0]
+
+    def sample(now):
+        results = recorder.snapshot()
+        window = results[seen[0]:]
+        seen[0] = len(results)
+        point = {
+            'elapsed': now - start,
+            'requests': len(results),
+            'errors': sum(1 for res in results if is_error(res[3])),
+            'window_p95': percentile(sorted(res[2] for res in window), 95),
+            'rss_bytes': memory(),
+        }
+        timeline.append(point)
+        if log:
+            p95, rss = point['window_p95'], point['rss_bytes']
+            log(f"{point['elapsed']:7.1f}s {point['requests']:8d} req {point['errors']:6d} err  "
+                f"p95 {p95 * 1000 if p95 is not None else float('nan'):8.1f} ms  "
+                f"rss {rss / 2**20 if rss else float('nan'):8.1f} MiB")
+
+    deadline = start + duration
+    next_sample = start + sample_interval
+    while True:
+        alive = [t for t in threads if t.is_alive()]
+        now = time.perf_counter()
+        if not alive:
+            sample(now)
+            break
+        if now >= deadline:
+            stop.set()
+        if now >= next_sample:
+            sample(now)
+            next_sample += sample_interval
+        wake = next_sample if stop.is_set() else min(next_sample, deadline)
+        alive[0].join(max(0.0, wake - now))
+    elapsed = time.perf_counter() - start
+    return report(recorder, elapsed, timeline, base_rss, mix, rate, concurrency, dropped[0])
+
+
+def report(recorder, elapsed, timeline, base_rss, mix, rate, concurrency, dropped=0):
+    results = recorder.snapshot()
+    by_scenario = {}
+    for name, _, latency, status, _ in results:
+        by_scenario.setdefault(name, []).append((latency, status))
+    scenarios = {}
+    for name, items in sorted(by_scenario.items()):
+        statuses = {}
+        for _, status in items:
+            key = str(status) if status is not None else 'failed'
+            statuses[key] = statuses.get(key, 0) + 1
+        errors = sum(1 for _, status in items if is_error(status))
+        scenarios[name] = dict(summarize([lat for lat, _ in items]), statuses=statuses,
+                               errors=errors, error_rate=errors / len(items))
+    errors = sum(1 for res in results if is_error(res[3]))
+    # latencia de los aciertos y de los fallos de la caché por separado
+    cache = {}
+    for key, header in (('hit', 'HIT'), ('miss', 'MISS')):
+        latencies = [res[2] for res in results if res[4] == header]
+        if latencies:
+            cache[key] = summarize(latencies)
+    final_rss = timeline[-1]['rss_bytes'] if timeline else None
+    return {
+        'mode': 'open' if rate else 'closed',
+        'rate': rate,
+        'concurrency': concurrency,
+        'mix': mix,
+        'seconds': elapsed,
+        'requests': len(results),
+        'dropped': dropped,
+        'throughput': len(results) / elapsed if elapsed > 0 else 0.0,
+        'errors': errors,
+        'error_rate': errors / len(results) if results else 0.0,
+        'cache_hits': recorder.cache_hits,
+        'latency': summarize([res[2] for res in results]),
+        'scenarios': scenarios,
+        'cache': cache,
+        'memory': {
+            'start_bytes': base_rss,
+            'end_bytes': final_rss,
+            'growth_bytes': final_rss - base_rss if base_rss is not None and final_rss is not None else None,
+        },
+        'timeline': timeline,
+    }
+
+
+def format_report(doc):
+    lines = [f"{doc['requests']} peticiones en {doc['seconds']:.1f} s: {doc['throughput']:.1f} req/s, "
+             f"{doc['errors']} errores ({doc['error_rate']:.2%}), {doc['cache_hits']} aciertos de caché"]
+    if doc['dropped']:
+        lines.append(f"{doc['dropped']} peticiones programadas quedaron en cola al terminar (el servidor no da abasto)")
+    header = f"{'escenario':10} {'n':>7} " + ' '.join(f'{"p%d" % p:>9}' for p in PERCENTILES) + f" {'max':>9}  estados"
+    lines.append(header)
+
+    def row(name, s, statuses=''):
+        cells = ' '.join(f'{s[f"p{p}"] * 1000:7.1f}ms' for p in PERCENTILES)
+        return f"{name:10} {s['count']:7d} {cells} {s['max'] * 1000:7.1f}ms  {statuses}"
+
+    for name, s in doc['scenarios'].items():
+        lines.append(row(name, s, ' '.join(f'{k}:{v}' for k, v in sorted(s['statuses'].items()))))
+    if doc['requests']:
+        lines.append(row('total', doc['latency']))
+    for key, s in doc.get('cache', {}).items():
+        lines.append(row(f'caché:{key}', s))
+    mem = doc['memory']
+    if mem['growth_bytes'] is not None:
+        lines.append(f"memoria del servidor: {mem['start_bytes'] / 2**20:.1f} -> {mem['end_bytes'] / 2**20:.1f} MiB "
+                     f"({mem['growth_bytes'] / 2**20:+.1f} MiB)")
+    return '\n'.join(lines)
+
+
+# --- Línea base ---
+
+def min_samples(p):
+    """Muestras necesarias para comparar el percentil `p`: al menos
+    MIN_TAIL_SAMPLES por encima de él."""
+    return math.ceil(MIN_TAIL_SAMPLES * 100 / (100 - p))
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regresiones de `current` respecto de `baseline` (como en bench_stages.compare).
+
+    Compara los percentiles totales, por escenario y de aciertos/fallos de
+    la caché (los que tienen suficientes muestras) y el throughput; cada regresión es un dict con key,
+    baseline, current y ratio.
+    """
+    regressions = []
+    pairs = [('total', current['latency'], baseline['latency'])]
+    for name, cur in current['scenarios'].items():
+        if name in baseline['scenarios']:
+            pairs.append((name, cur, baseline['scenarios'][name]))
+    for key, cur in current.get('cache', {}).items():
+        if key in baseline.get('cache', {}):
+            pairs.append((f'cache:{key}', cur, baseline['cache'][key]))
+    for name, cur, base in pairs:
+        for p in PERCENTILES:
+            b, c = base.get(f'p{p}'), cur.get(f'p{p}')
+            # con pocas muestras por encima del percentil es sólo ruido
+            if b is None or c is None or min(base['count'], cur['count']) < min_samples(p):
+                continue
+            if c > b * (1 + threshold) and c - b > MIN_LATENCY_DELTA:
+                regressions.append({'key': f'{name}:p{p}', 'baseline': b, 'current': c,
+                                    'ratio': c / b if b else float('inf')})
+    # en carga abierta el throughput lo fija --rate: sólo cuenta en carga cerrada
+    b, c = baseline['throughput'], current['throughput']
+    if current['mode'] == 'closed' and c < b / (1 + threshold):
+        regressions.append({'key': 'throughput', 'baseline': b, 'current': c, 'ratio': c / b if b else 0.0})
+    return regressions
+
+
+def format_regression(reg):
+    return f"{reg['key']}: {reg['baseline']:.6g} -> {reg['current']:.6g} (x{reg['ratio']:.2f})"
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(doc, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def settings_of(baseline):
+    """Argumentos de la línea de comandos con los que se generó una línea base."""
+    return baseline.get('settings', {})
+
+
+def execute(args, log=None):
+    """Prepara el destino y los programas según `args` y ejecuta la prueba."""
+    mix = parse_mix(args.mix)
+    programs = build_programs(mix, args.variants, args.large_size, args.seed)
+    body_options = json.loads(args.options) if args.options else {}
+    server = None
+    if args.target in ('client', 'serve'):
+        from app import app
+        if args.target == 'client':
+            target = FlaskClientTarget(app)
+        else:
+            server = LocalServer(app)
+            target = HTTPTarget(server.url)
+    else:
+        target = HTTPTarget(args.target)
+    try:
+        doc = run(target, programs, mix, args.duration, args.concurrency, args.rate, args.requests,
+                  args.interval, args.pid, args.seed, body_options, log,
+                  measure_memory=args.pid is not None or server is not None or args.target == 'client',
+                  repeat=args.repeat)
+    finally:
+        target.close()
+        if server is not None:
+            server.close()
+    doc['settings'] = {k: getattr(args, k) for k in SETTINGS}
+    return doc
+
+
+# opciones que se guardan con la línea base y se reutilizan al comparar
+SETTINGS = ('target', 'mix', 'duration', 'concurrency', 'rate', 'requests', 'variants', 'large_size',
+            'seed', 'options', 'repeat')
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(description='Prueba de carga de POST /compile.')
+    ap.add_argument('--target', default='client',
+                    help="'client' (cliente de pruebas de Flask), 'serve' (servidor HTTP local) o una URL http://")
+    ap.add_argument('--pid', type=int, help='proceso del servidor cuya memoria se mide (con --target URL)')
+    ap.add_argument('--mix', default=DEFAULT_MIX, help=f'pesos por escenario (por defecto: {DEFAULT_MIX})')
+    ap.add_argument('--duration', type=float, default=10.0, help='segundos de prueba')
+    ap.add_argument('--requests', type=int, help='máximo de peticiones (termina antes si se alcanza)')
+    ap.add_argument('--concurrency', type=int, default=4, help='clientes simultáneos')
+    ap.add_argument('--rate', type=float, help='peticiones por segundo (carga abierta)')
+    ap.add_argument('--variants', type=int, default=50, help='programas distintos por escenario')
+    ap.add_argument('--large-size', type=int, default=1000, help='sentencias de los programas grandes')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--repeat', action='store_true',
+                    help='reenviar los mismos programas (aciertan en la caché); por defecto cada petición es única')
+    ap.add_argument('--options', help='JSON con opciones extra de /compile (p.ej. \'{"backend": "vm"}\')')
+    ap.add_argument('--interval', type=float, default=1.0, help='segundos entre muestras de la línea de tiempo')
+    ap.add_argument('--json', metavar='PATH', help='guardar el reporte completo en JSON')
+    ap.add_argument('--save', metavar='PATH', help='guardar el reporte como línea base')
+    ap.add_argument('--compare', metavar='PATH', help='comparar con una línea base (mismas opciones que ella)')
+    ap.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                    help='empeoramiento relativo tolerado (0.25 = 25%%)')
+    return ap
+
+
+def test_load_against_baseline():
+    # ejecutado por pytest sólo si se le pasa este archivo explícitamente
+    import pytest
+    path = os.environ.get('LOAD_BASELINE', DEFAULT_BASELINE)
+    if not os.path.exists(path):
+        pytest.skip(f'Sin línea base ({path}); crearla con: python benchmarks/loadtest.py --save {path}')
+    baseline = load(path)
+    args = build_parser().parse_args([])
+    for k, v in settings_of(baseline).items():
+        setattr(args, k, v)
+    threshold = float(os.environ.get('LOAD_THRESHOLD', DEFAULT_THRESHOLD))
+    regressions = compare(execute(args), baseline, threshold)
+    assert not regressions, 'Regresiones:\n' + '\n'.join(map(format_regression, regressions))
+
+
+def main(argv=None):
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    baseline = load(args.compare) if args.compare else None
+    if baseline is not None:
+        # mismas condiciones que la línea base (salvo las indicadas explícitamente)
+        defaults = ap.parse_args([])
+        for k, v in settings_of(baseline).items():
+            if getattr(args, k) == getattr(defaults, k):
+                setattr(args, k, v)
+    if args.concurrency < 1:
+        ap.error('--concurrency debe ser al menos 1')
+    try:
+        doc = execute(args, log=print)
+    except ValueError as e:
+        ap.error(str(e))
+    print(format_report(doc))
+    if args.json:
+        save(doc, args.json)
+    if args.save:
+        save(doc, args.save)
+        print(f'Línea base guardada en {args.save}')
+    if baseline is not None:
+        regressions = compare(doc, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regresión(es) por encima del {args.threshold:.0%}:')
+            for reg in regressions:
+                print('  ' + format_regression(reg))
+            return 1
+        print('Sin regresiones')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
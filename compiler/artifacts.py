@@ -0,0 +1,138 @@
+"""Almacén en disco de programas ya compilados (artefactos).
+
+Un artefacto guarda lo que produce el front-end para un código fuente:
+tokens, AST, parse-tree (si se construyó) y resultado del análisis
+semántico, en el formato de compiler.binenc comprimido con zlib. Se indexa
+por el hash SHA-256 del código, así que sobrevive a reinicios del proceso y
+lo comparten todos los procesos que usan el mismo directorio (p.ej. los de
+compiler.batch): después de un despliegue, el código que ya se compiló antes
+se carga en lugar de volver a lexearlo, parsearlo y analizarlo.
+
+Cada archivo empieza con el hash completo del código; si no coincide, está
+truncado o es de otra versión del formato, se trata como ausente (y se
+reescribe en la próxima compilación). Las escrituras son atómicas (archivo
+temporal + os.replace), así que varios procesos pueden escribir a la vez.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import zlib
+
+from compiler import binenc
+
+# nivel de compresión: el más rápido; los datos ya son compactos
+COMPRESS_LEVEL = 1
+SUFFIX = '.clab'
+
+
+class Artifact:
+    """Front-end de un programa cargado del almacén.
+
+    - tokens, program (Program o FlatProgram), parse_root (None si no se
+      guardó) y semantic (resultado de semantic.analyze)
+    """
+    __slots__ = ('tokens', 'program', 'parse_root', 'semantic')
+
+    def __init__(self, tokens, program, parse_root, semantic):
+        self.tokens = tokens
+        self.program = program
+        self.parse_root = parse_root
+        self.semantic = semantic
+
+
+class ArtifactStore:
+    """Artefactos en `directory`, uno por archivo (ver la descripción del módulo).
+
+    hits / misses / writes / errors cuentan las operaciones de este proceso
+    (errors: archivos ilegibles o que no se pudieron escribir).
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(code):
+        return hashlib.sha256(code.encode('utf-8')).digest()
+
+    def path(self, digest):
+        name = digest.hex()
+        return os.path.join(self.directory, name[:2], name[2:] + SUFFIX)
+
+    def _count(self, event):
+        with self._lock:
+            setattr(self, event, getattr(self, event) + 1)
+
+    def load(self, code, flat=False, tree=True):
+        """Artifact guardado para `code`, o None.
+
+        `flat` reconstruye el AST como FlatProgram; con `tree` sólo sirve un
+        artefacto que incluya el parse-tree.
+        """
+        digest = self.digest(code)
+        try:
+            with open(self.path(digest), 'rb') as f:
+                data = f.read()
+        except OSError:
+            self._count('misses')
+            return None
+        try:
+            if data[:len(digest)] != digest:
+                raise binenc.FormatError('El artefacto no corresponde al código')
+            dec = binenc.Decoder(zlib.decompress(data[len(digest):]))
+            tokens = dec.tokens()
+            program = dec.program(flat)
+            parse_root = dec.parse_tree() if dec.next_section() == binenc.TREE else None
+            semantic = dec.semantic()
+        except Exception:
+            # archivo dañado o de otra versión del formato: se reescribe en
+            # la próxima compilación
+            self._count('errors')
+            self._count('misses')
+            return None
+        if tree and parse_root is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return Artifact(tokens, program, parse_root, semantic)
+
+    def save(self, code, tokens, program, parse_root, semantic):
+        """Guarda el front-end de `code`; devuelve False si no se pudo escribir."""
+        enc = binenc.Encoder()
+        enc.tokens(tokens)
+        enc.program(program)
+        if parse_root is not None:
+            enc.parse_tree(parse_root)
+        enc.semantic(semantic)
+        digest = self.digest(code)
+        data = digest + zlib.compress(enc.getvalue(), COMPRESS_LEVEL)
+        path = self.path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            self._count('errors')
+            return False
+        self._count('writes')
+        return True
+
+    def stats(self):
+        """Resumen de contadores para diagnóstico."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'writes': self.writes, 'errors': self.errors}
+
+
+def open_store(directory):
+    """Función de conveniencia: ArtifactStore en `directory`, o None si está vacío."""
+    return ArtifactStore(directory) if directory else None
@@ -1,10 +1,29 @@
 class ASTNode:
     """Clase base para nodos del AST.
 
-    Cada nodo concreto debe implementar to_dict() para serializarse a JSON
-    cuando la API REST devuelve la representación del AST.
+    to_dict() serializa el nodo a JSON cuando la API REST devuelve la
+    representación del AST. Cada nodo concreto implementa _dict(stack), que
+    devuelve su diccionario con los hijos pendientes en None y apila, por cada
+    hijo, (contenedor, clave, hijo); to_dict() los completa con esa pila
+    explícita, así la profundidad del árbol no está limitada por la recursión.
+
+    Los nodos usan __slots__ (sin __dict__ por instancia): en programas de
+    millones de nodos el overhead por objeto domina el uso de memoria.
     """
+    __slots__ = ()
+
     def to_dict(self):
+        stack = []
+        pop = stack.pop
+        d = self._dict(stack)
+        while stack:
+            child = pop()
+            key = pop()
+            container = pop()
+            container[key] = child._dict(stack)
+        return d
+
+    def _dict(self, stack):
         raise NotImplementedError()
 
 
@@ -14,19 +33,23 @@ class Number(ASTNode):
     Atributos:
     - value: int o float
     """
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
-    def to_dict(self):
+    def _dict(self, stack):
         return {'type': 'Number', 'value': self.value}
 
 
 class Var(ASTNode):
     """Nodo que representa una referencia a una variable (identificador)."""
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
-    def to_dict(self):
+    def _dict(self, stack):
         return {'type': 'Var', 'name': self.name}
 
 
@@ -36,30 +59,56 @@ class BinOp(ASTNode):
     - left, right: sub-árboles (ASTNode)
     - op: token tipo como 'PLUS', 'MUL', etc. (se usa en evaluator para decidir)
     """
+    __slots__ = ('left', 'op', 'right')
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
         self.right = right
 
-    def to_dict(self):
-        return {'type': 'BinOp', 'op': self.op, 'left': self.left.to_dict(), 'right': self.right.to_dict()}
+    def _dict(self, stack):
+        d = {'type': 'BinOp', 'op': self.op, 'left': None, 'right': None}
+        stack += (d, 'right', self.right, d, 'left', self.left)
+        return d
 
 
 class Assign(ASTNode):
     """Nodo de asignación: name = value"""
+    __slots__ = ('name', 'value')
+
     def __init__(self, name, value):
         self.name = name
         self.value = value
 
-    def to_dict(self):
-        return {'type': 'Assign', 'name': self.name, 'value': self.value.to_dict()}
+    def _dict(self, stack):
+        d = {'type': 'Assign', 'name': self.name, 'value': None}
+        stack += (d, 'value', self.value)
+        return d
 
 
 class Program(ASTNode):
     """Nodo raíz que contiene una lista de sentencias del programa."""
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements
 
-    def to_dict(self):
-        return {'type': 'Program', 'statements': [s.to_dict() for s in self.statements]}
+    def _dict(self, stack):
+        statements = [None] * len(self.statements)
+        for i, s in enumerate(self.statements):
+            stack += (statements, i, s)
+        return {'type': 'Program', 'statements': statements}
 
+
+class ASTBuilder:
+    """Constructor de nodos que usa el parser (ver Parser(builder=...)).
+
+    Cada método recibe los datos del nodo y los hijos ya construidos (en
+    post-orden) y devuelve el nodo. Este builder crea los objetos de este
+    módulo; compiler.flatast.FlatBuilder construye en cambio un AST plano.
+    """
+    number = Number
+    var = Var
+    binop = BinOp
+    assign = Assign
+    program = Program
@@ -0,0 +1,157 @@
+"""Compilación por lotes repartida en un pool de procesos.
+
+Cada programa pasa por el mismo pipeline que /compile (compiler.pipeline);
+los programas se agrupan en bloques (`chunk_size`) que se envían a procesos
+de trabajo, así el lote no queda limitado por el GIL de un único proceso y el
+costo de comunicación se reparte entre varios programas.
+
+Los resultados se devuelven en el mismo orden que la entrada, uno por
+programa. Un error en un programa sólo afecta a ese programa: los errores de
+compilación ya los reporta el pipeline en su payload, y si un proceso de
+trabajo muere (p.ej. por falta de memoria) los programas afectados se
+reintentan de a uno para identificar al culpable.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from compiler import artifacts, binenc, limits, pipeline
+
+# programas por bloque cuando no se indica chunk_size: lo suficiente para
+# amortizar la comunicación, pero dejando ~4 bloques por proceso para repartir
+# bien la carga
+MAX_AUTO_CHUNK = 64
+
+
+def _compile_chunk(programs, options):
+    # cada programa recibe su propio presupuesto a partir de options['limits']
+    # (ver compiler.limits) y el almacén de artefactos es el de
+    # options['artifact_dir'] (ver compiler.artifacts)
+    options = dict(options)
+    budget_limits = options.pop('limits', None)
+    store = artifacts.open_store(options.pop('artifact_dir', None))
+    results = []
+    for code in programs:
+        budget = limits.Budget(**budget_limits) if budget_limits else None
+        results.append(pipeline.compile_source(code, budget=budget, store=store, **options)[0])
+    return results
+
+
+def _compile_chunk_in_worker(programs, options):
+    # se ejecuta en el proceso de trabajo, que sólo compila: ahí (y no en el
+    # proceso que llama, p.ej. el servidor) se pausa el GC durante el bloque,
+    # que crea muchos objetos sin ciclos (tokens, AST, artefactos; ver
+    # compiler.binenc.paused_gc)
+    with binenc.paused_gc():
+        return _compile_chunk(programs, options)
+
+
+def _crashed(e):
+    return {'ok': False, 'error': f'El proceso de compilación terminó inesperadamente: {e!r}'}
+
+
+class BatchCompiler:
+    """Pool de procesos reutilizable para compilar lotes de programas.
+
+    - workers: número de procesos (por defecto os.cpu_count())
+    - chunk_size: programas por bloque; None lo elige según el tamaño del lote
+    El pool se crea en el primer lote que lo necesita y se recrea si se rompe.
+    Con un solo proceso, o si el lote cabe en un bloque, se compila en el
+    proceso actual (sin costo de comunicación).
+    """
+    def __init__(self, workers=None, chunk_size=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _discard_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def _chunk_size(self, n):
+        if self.chunk_size:
+            return self.chunk_size
+        return max(1, min(MAX_AUTO_CHUNK, -(-n // (self.workers * 4))))
+
+    def compile(self, programs, **options):
+        """Compila cada código de `programs` con las opciones de compile_source.
+
+        `limits` (opcional) son los argumentos de compiler.limits.Budget: cada
+        programa tiene su propio presupuesto, con el deadline contado desde
+        que empieza a compilarse. `artifact_dir` (opcional) es el directorio
+        de un compiler.artifacts.ArtifactStore compartido por los procesos.
+        Devuelve una lista de payloads (como los de /compile) en el orden de
+        la entrada.
+        """
+        programs = list(programs)
+        size = self._chunk_size(len(programs))
+        if self.workers <= 1 or len(programs) <= size:
+            return _compile_chunk(programs, options)
+
+        results = [None] * len(programs)
+        failed = []
+        pool = self._get_pool()
+        futures = []
+        try:
+            for start in range(0, len(programs), size):
+                chunk = programs[start:start + size]
+                futures.append((start, pool.submit(_compile_chunk_in_worker, chunk, options)))
+        except RuntimeError:
+            # el pool se rompió mientras se enviaban bloques (BrokenProcessPool
+            # es un RuntimeError): los bloques no enviados se reintentan
+            sent = len(futures) * size
+            failed.extend(range(sent, len(programs)))
+        for start, future in futures:
+            try:
+                results[start:start + size] = future.result()
+            except Exception:
+                failed.extend(range(start, min(start + size, len(programs))))
+        if failed:
+            self._discard_pool(pool)
+            self._retry_each(programs, sorted(failed), options, results)
+        return results
+
+    def _retry_each(self, programs, indices, options, results):
+        """Recompila de a un programa, esperando cada uno.
+
+        Cuando un proceso muere, el pool rompe también los bloques de los
+        demás procesos; en serie sabemos exactamente qué programa lo provocó.
+        Sólo ocurre tras una caída, así que no importa perder el paralelismo.
+        """
+        for i in indices:
+            pool = self._get_pool()
+            try:
+                results[i] = pool.submit(_compile_chunk_in_worker, [programs[i]], options).result()[0]
+            except Exception as e:
+                results[i] = _crashed(e)
+                self._discard_pool(pool)
+
+
+def compile_batch(programs, workers=None, chunk_size=None, **options):
+    """Función de conveniencia: compila un lote con un pool temporal.
+
+    `options` son las de compiler.pipeline.compile_source (backend, optimize,
+    sections, flat, share) más `limits`: argumentos de compiler.limits.Budget que se
+    aplican a cada programa por separado, y `artifact_dir` (ver
+    BatchCompiler.compile). Para varios lotes conviene reutilizar un BatchCompiler.
+    """
+    batch = BatchCompiler(workers, chunk_size)
+    try:
+        return batch.compile(programs, **options)
+    finally:
+        batch.close()
@@ -0,0 +1,510 @@
+"""Formato binario compacto para tokens, AST y parse-tree.
+
+Alternativa a to_dict() + JSON para guardar y volver a cargar lo que produce
+el front-end (ver compiler.artifacts). Un documento binario es:
+
+    MAGIC, VERSION, tabla de nombres, tabla de constantes, secciones
+
+- nombres: strings sin duplicados (identificadores, tipos de token,
+  etiquetas del parse-tree, operadores, mensajes)
+- constantes: números sin duplicados (1, 1.0 y True son distintos); los
+  enteros de más de 64 bits se guardan como texto
+- cada sección empieza con un byte que la identifica (TOKENS, PROGRAM,
+  TREE, SEMANTIC) y guarda columnas de enteros que indexan las tablas
+
+Las columnas son arrays con el ancho justo para su mayor valor (1, 2, 4 u 8
+bytes por elemento, little-endian), así se escriben y leen con
+array.tobytes/frombytes sin un bucle por elemento. Los árboles se guardan en
+post-orden, como compiler.flatast: un código por nodo con su tipo y el
+índice de su dato; los hijos quedan implícitos (cada nodo toma de la pila
+los que le corresponden), así que la reconstrucción es un único recorrido.
+
+Todo lo que se escribe se vuelve a leer idéntico (tokens con sus posiciones,
+tipos de los literales, forma exacta de los árboles).
+"""
+import contextlib
+import gc
+import struct
+import sys
+import threading
+from array import array
+
+from compiler import ast, flatast, semantic
+from compiler.lexer import Token
+from compiler.parser import ParseNode
+
+MAGIC = b'CLAB'
+VERSION = 1
+
+# identificadores de sección
+TOKENS = b'T'
+PROGRAM = b'P'
+TREE = b'R'
+SEMANTIC = b'S'
+
+# tipos de constante
+_INT, _FLOAT, _BIGINT = range(3)
+# tipos de código del parse-tree: hoja string, hoja numérica, nodo
+_LEAF_NAME, _LEAF_CONST, _NODE = range(3)
+
+_WIDTHS = (('B', 0xFF), ('H', 0xFFFF), ('I', 0xFFFFFFFF), ('Q', 0xFFFFFFFFFFFFFFFF))
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+
+# pausas del GC en curso (de cualquier hilo) y si estaba activo antes de la
+# primera; ver paused_gc
+_gc_pauses = 0
+_gc_was_enabled = False
+_gc_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """Pausa el GC cíclico mientras dura el bloque `with`.
+
+    Codificar o reconstruir un árbol grande crea cientos de miles de objetos
+    de una vez, y cada tanto el GC recorrería todos los ya creados (que no
+    forman ciclos): eso duplica el tiempo total.
+
+    El GC es global al proceso, así que Encoder y Decoder no lo pausan por su
+    cuenta: lo decide el llamador. Conviene en procesos dedicados a compilar
+    (los de compiler.batch) o en scripts; no en un servidor con hilos, donde
+    los demás hilos tampoco recolectarían ciclos mientras dura la pausa. Las
+    pausas de varios hilos se cuentan y el GC se reactiva al terminar la
+    última, y sólo si estaba activo antes de la primera.
+    """
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if not _gc_pauses:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pauses -= 1
+            if not _gc_pauses and _gc_was_enabled:
+                gc.enable()
+
+
+class FormatError(ValueError):
+    """Los datos no son un documento binario válido (o están truncados)."""
+    pass
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def uint(self, n):
+        # entero sin signo de tamaño variable (7 bits por byte)
+        out = bytearray()
+        while n >= 0x80:
+            out.append((n & 0x7F) | 0x80)
+            n >>= 7
+        out.append(n)
+        self.parts.append(bytes(out))
+
+    def raw(self, data):
+        self.parts.append(data)
+
+    def column(self, values):
+        """Array de enteros >= 0 con el ancho justo para el mayor."""
+        if not isinstance(values, array):
+            values = array('Q', values)
+        top = max(values) if len(values) else 0
+        for typecode, limit in _WIDTHS:
+            if top <= limit:
+                break
+        if values.typecode != typecode:
+            values = array(typecode, values)
+        if _BIG_ENDIAN:
+            values = array(typecode, values)
+            values.byteswap()
+        self.uint(len(values))
+        self.parts.append(typecode.encode('ascii'))
+        self.parts.append(values.tobytes())
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def take(self, n):
+        end = self.pos + n
+        if end > len(self.data):
+            raise FormatError('Datos binarios truncados')
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def uint(self):
+        n = 0
+        shift = 0
+        data = self.data
+        while True:
+            if self.pos >= len(data):
+                raise FormatError('Datos binarios truncados')
+            b = data[self.pos]
+            self.pos += 1
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def column(self):
+        count = self.uint()
+        typecode = bytes(self.take(1)).decode('ascii', 'replace')
+        if typecode not in ('B', 'H', 'I', 'Q'):
+            raise FormatError(f'Tipo de columna desconocido: {typecode!r}')
+        values = array(typecode)
+        values.frombytes(self.take(count * values.itemsize))
+        if _BIG_ENDIAN:
+            values.byteswap()
+        return values
+
+
+class Encoder:
+    """Arma un documento binario sección por sección.
+
+    Los nombres y constantes de todas las secciones comparten las tablas
+    (p.ej. un identificador aparece una vez aunque esté en los tokens, el AST
+    y el parse-tree). getvalue() devuelve el documento completo.
+    """
+    def __init__(self):
+        self.names = []
+        self.consts = []
+        self._name_index = {}
+        self._const_index = {}
+        self._body = _Writer()
+
+    def name(self, text):
+        idx = self._name_index.get(text)
+        if idx is None:
+            if type(text) is not str:
+                raise TypeError(f'Se esperaba un string: {text!r}')
+            idx = self._name_index[text] = len(self.names)
+            self.names.append(text)
+        return idx
+
+    def const(self, value):
+        # distinguir 1 de 1.0 (y de True), y 0.0 de -0.0, al deduplicar
+        key = (float, value.hex()) if type(value) is float else (type(value), value)
+        idx = self._const_index.get(key)
+        if idx is None:
+            if type(value) not in (int, float):
+                raise TypeError(f'Se esperaba un número: {value!r}')
+            idx = self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return idx
+
+    def tokens(self, tokens):
+        """Sección TOKENS: lista de lexer.Token (o lexer.TokenBuffer)."""
+        body = self._body
+        name, const = self.name, self.const
+        get = self._name_index.get
+        types, values, lines, cols = zip(*tokens) if tokens else ((), (), (), ())
+        for t in set(types):
+            name(t)
+        # el valor de un token NUMBER es una constante; el de los demás, un
+        # nombre. `numbers` guarda las posiciones de los primeros (ver
+        # Decoder.tokens)
+        codes = []
+        numbers = []
+        for i, (t, v) in enumerate(zip(types, values)):
+            if t == 'NUMBER':
+                numbers.append(i)
+                codes.append(const(v))
+            else:
+                idx = get(v)
+                codes.append(idx if idx is not None else name(v))
+        # líneas como diferencia con la anterior (casi siempre 0 o 1)
+        deltas = [b - a for a, b in zip((1,) + lines, lines)]
+        if deltas and min(deltas) < 0:
+            raise ValueError('Los tokens deben estar ordenados por línea')
+        body.raw(TOKENS)
+        body.column(list(map(self._name_index.__getitem__, types)))
+        body.column(codes)
+        body.column(numbers)
+        body.column(deltas)
+        body.column(cols)
+
+    def program(self, program):
+        """Sección PROGRAM: un Program de compiler.ast o un FlatProgram."""
+        flat = program if isinstance(program, flatast.FlatProgram) else flatast.flatten(program)
+        names = [self.name(n) for n in flat.names]
+        consts = [self.const(c) for c in flat.consts]
+        # código de cada nodo: (índice en la tabla << 2) | tipo; en los BINOP
+        # el índice es el código del operador
+        tables = {flatast.NUMBER: consts, flatast.VAR: names, flatast.ASSIGN: names}
+        codes = [(tables[k][a] << 2) | k if k != flatast.BINOP else (a << 2) | k
+                 for k, a in zip(flat.kinds, flat.args)]
+        body = self._body
+        body.raw(PROGRAM)
+        # el post-orden de flatast deja las sentencias contiguas y en orden:
+        # alcanza con saber cuántas son
+        body.uint(len(flat.statements))
+        body.column(codes)
+
+    def parse_tree(self, root):
+        """Sección TREE: un ParseNode (valores hoja string o numéricos).
+
+        Se guarda en pre-orden (nodo y número de hijos antes que los hijos);
+        Decoder.parse_tree lo recorre al revés.
+        """
+        codes = []
+        counts = []
+        name, const = self.name, self.const
+        get = self._name_index.get
+        stack = [root]
+        pop, push = stack.pop, stack.extend
+        while stack:
+            node = pop()
+            if type(node) is ParseNode:
+                idx = get(node.label)
+                codes.append(((idx if idx is not None else name(node.label)) << 2) | _NODE)
+                counts.append(len(node.children))
+                push(reversed(node.children))
+            elif type(node) is str:
+                idx = get(node)
+                codes.append(((idx if idx is not None else name(node)) << 2) | _LEAF_NAME)
+            else:
+                codes.append((const(node) << 2) | _LEAF_CONST)
+        body = self._body
+        body.raw(TREE)
+        body.column(codes)
+        body.column(counts)
+
+    def semantic(self, result):
+        """Sección SEMANTIC: resultado de semantic.analyze."""
+        body = self._body
+        body.raw(SEMANTIC)
+        body.column([self.name(s) for s in result['symbols']])
+        body.column([self.name(e) for e in result['errors']])
+
+    def getvalue(self):
+        out = _Writer()
+        out.raw(MAGIC)
+        out.uint(VERSION)
+        encoded = [n.encode('utf-8') for n in self.names]
+        out.column([len(b) for b in encoded])
+        out.raw(b''.join(encoded))
+        kinds, small, floats, big = [], [], [], []
+        for c in self.consts:
+            if type(c) is float:
+                kinds.append(_FLOAT)
+                floats.append(c)
+            elif -(1 << 63) <= c < (1 << 63):
+                kinds.append(_INT)
+                # zigzag: enteros chicos (positivos o negativos) en pocos bytes
+                small.append((c << 1) ^ (c >> 63))
+            else:
+                kinds.append(_BIGINT)
+                big.append(str(c).encode('ascii'))
+        out.column(kinds)
+        out.column(small)
+        out.uint(len(floats))
+        out.raw(struct.pack(f'<{len(floats)}d', *floats))
+        out.column([len(b) for b in big])
+        out.raw(b''.join(big))
+        return out.getvalue() + self._body.getvalue()
+
+
+class Decoder:
+    """Lee un documento de Encoder; las secciones se leen en el mismo orden
+    en que se escribieron."""
+    def __init__(self, data):
+        r = self._reader = _Reader(data)
+        if bytes(r.take(len(MAGIC))) != MAGIC:
+            raise FormatError('No es un documento binario del compilador')
+        version = r.uint()
+        if version != VERSION:
+            raise FormatError(f'Versión de formato no soportada: {version}')
+        lengths = r.column()
+        blob = bytes(r.take(sum(lengths)))
+        names = []
+        pos = 0
+        try:
+            for n in lengths:
+                names.append(blob[pos:pos + n].decode('utf-8'))
+                pos += n
+        except UnicodeDecodeError as e:
+            raise FormatError(f'Nombre inválido: {e}')
+        self.names = names
+        kinds = r.column()
+        small = iter(r.column())
+        count = r.uint()
+        floats = iter(struct.unpack(f'<{count}d', r.take(8 * count)))
+        big_lengths = r.column()
+        big_blob = bytes(r.take(sum(big_lengths)))
+        big = []
+        pos = 0
+        for n in big_lengths:
+            big.append(int(big_blob[pos:pos + n]))
+            pos += n
+        big = iter(big)
+        consts = []
+        for k in kinds:
+            if k == _INT:
+                z = next(small)
+                consts.append((z >> 1) ^ -(z & 1))
+            elif k == _FLOAT:
+                consts.append(next(floats))
+            else:
+                consts.append(next(big))
+        self.consts = consts
+
+    def next_section(self):
+        """Identificador de la próxima sección (sin leerla), o None al final."""
+        r = self._reader
+        if r.pos >= len(r.data):
+            return None
+        return bytes(r.data[r.pos:r.pos + 1])
+
+    def _section(self, tag):
+        found = bytes(self._reader.take(1))
+        if found != tag:
+            raise FormatError(f'Se esperaba la sección {tag!r} y se encontró {found!r}')
+
+    def tokens(self):
+        """Lista de lexer.Token de una sección TOKENS."""
+        self._section(TOKENS)
+        r = self._reader
+        names = self.names
+        types = [names[i] for i in r.column()]
+        values = r.column()
+        # tabla común: nombres seguidos de constantes
+        offset = len(names)
+        values = array('Q', values)
+        for i in r.column():
+            values[i] += offset
+        pool = names + self.consts
+        line = 1
+        lines = []
+        for d in r.column():
+            line += d
+            lines.append(line)
+        cols = r.column()
+        new = tuple.__new__
+        return [new(Token, t) for t in zip(types, map(pool.__getitem__, values), lines, cols)]
+
+    def program(self, flat=False):
+        """Program de compiler.ast (o FlatProgram con flat=True) de una sección PROGRAM."""
+        self._section(PROGRAM)
+        r = self._reader
+        n_statements = r.uint()
+        codes = r.column()
+        names, consts = self.names, self.consts
+        if flat:
+            return self._flat_program(codes, n_statements)
+        nodes = []
+        push, pop = nodes.append, nodes.pop
+        Number, Var, BinOp, Assign = ast.Number, ast.Var, ast.BinOp, ast.Assign
+        ops = flatast.OPS
+        for code in codes:
+            k = code & 3
+            a = code >> 2
+            if k == flatast.VAR:
+                push(Var(names[a]))
+            elif k == flatast.NUMBER:
+                push(Number(consts[a]))
+            elif k == flatast.BINOP:
+                right = pop()
+                nodes[-1] = BinOp(nodes[-1], ops[a], right)
+            else:
+                nodes[-1] = Assign(names[a], nodes[-1])
+        if len(nodes) != n_statements:
+            raise FormatError('Sección PROGRAM inconsistente')
+        return ast.Program(nodes)
+
+    def _flat_program(self, codes, n_statements):
+        b = flatast.FlatBuilder()
+        b.names, b.consts = self.names, self.consts
+        kinds, args, lefts, rights = b.kinds, b.args, b.lefts, b.rights
+        roots = []
+        i = 0
+        for code in codes:
+            k = code & 3
+            kinds.append(k)
+            args.append(code >> 2)
+            if k == flatast.BINOP:
+                rights.append(roots.pop())
+                lefts.append(roots.pop())
+            elif k == flatast.ASSIGN:
+                rights.append(-1)
+                lefts.append(roots.pop())
+            else:
+                lefts.append(-1)
+                rights.append(-1)
+            roots.append(i)
+            i += 1
+        if len(roots) != n_statements:
+            raise FormatError('Sección PROGRAM inconsistente')
+        return b.program(roots)
+
+    def parse_tree(self):
+        """ParseNode raíz de una sección TREE."""
+        self._section(TREE)
+        r = self._reader
+        codes = r.column()
+        counts = r.column()
+        names, consts = self.names, self.consts
+        # el pre-orden leído al revés deja cada nodo después de sus hijos,
+        # con el primer hijo en el tope de la pila
+        done = []
+        push = done.append
+        k_index = len(counts)
+        for code in reversed(codes):
+            tag = code & 3
+            if tag == _NODE:
+                k_index -= 1
+                k = counts[k_index]
+                if k:
+                    children = done[:-k - 1:-1]
+                    del done[-k:]
+                else:
+                    children = []
+                push(ParseNode(names[code >> 2], children))
+            elif tag == _LEAF_NAME:
+                push(names[code >> 2])
+            else:
+                push(consts[code >> 2])
+        if len(done) != 1 or k_index:
+            raise FormatError('Sección TREE inconsistente')
+        return done[0]
+
+    def semantic(self):
+        """Resultado de semantic.analyze de una sección SEMANTIC."""
+        self._section(SEMANTIC)
+        r = self._reader
+        analyzer = semantic.Analyzer()
+        analyzer.symbols = dict.fromkeys(self.names[i] for i in r.column())
+        analyzer.errors = [self.names[i] for i in r.column()]
+        return analyzer.result()
+
+
+# convenience
+
+def dumps_tokens(tokens):
+    enc = Encoder()
+    enc.tokens(tokens)
+    return enc.getvalue()
+
+
+def loads_tokens(data):
+    return Decoder(data).tokens()
+
+
+def dumps_program(program):
+    enc = Encoder()
+    enc.program(program)
+    return enc.getvalue()
+
+
+def loads_program(data, flat=False):
+    return Decoder(data).program(flat)
@@ -0,0 +1,245 @@
+"""Backend de bytecode: compila el AST a instrucciones planas y las ejecuta
+en una máquina de pila.
+
+Cada instrucción es un único entero: los 3 bits bajos son el código de
+operación y el resto el argumento (índice en la tabla de constantes o slot
+de variable). Los nombres de variables se resuelven a slots en tiempo de
+compilación, de modo que la VM no consulta diccionarios ni compara strings.
+"""
+from compiler import ast, flatast
+from compiler.limits import CHECK_INTERVAL
+
+# Códigos de operación (caben en 3 bits)
+LOAD_CONST = 0   # apila consts[arg]
+LOAD_VAR = 1     # apila slots[arg]
+STORE_VAR = 2    # slots[arg] = tope (sin desapilar: la asignación devuelve su valor)
+ADD = 3
+SUB = 4
+MUL = 5
+DIV = 6
+EMIT = 7         # desapila el tope y lo agrega a los resultados
+
+OP_BITS = 3
+OP_MASK = (1 << OP_BITS) - 1
+
+BINOP_CODES = {'PLUS': ADD, 'MINUS': SUB, 'MUL': MUL, 'DIV': DIV}
+
+OPNAMES = ['LOAD_CONST', 'LOAD_VAR', 'STORE_VAR', 'ADD', 'SUB', 'MUL', 'DIV', 'EMIT']
+
+
+class Code:
+    """Resultado de compilar un AST.
+
+    - instructions: lista de enteros (op | arg << OP_BITS)
+    - consts: tabla de constantes (literales numéricos sin duplicados)
+    - names: nombre de la variable asociada a cada slot
+    - stored: slots que alguna sentencia asigna (se vuelcan al env al terminar)
+    - is_program: True si proviene de un Program (resultado = lista)
+    """
+    def __init__(self, instructions, consts, names, stored, is_program):
+        self.instructions = instructions
+        self.consts = consts
+        self.names = names
+        self.stored = stored
+        self.is_program = is_program
+
+    def disassemble(self):
+        """Listado legible de las instrucciones (útil para depurar)."""
+        out = []
+        for i, w in enumerate(self.instructions):
+            op, arg = w & OP_MASK, w >> OP_BITS
+            if op == LOAD_CONST:
+                out.append(f'{i:4} {OPNAMES[op]} {self.consts[arg]!r}')
+            elif op in (LOAD_VAR, STORE_VAR):
+                out.append(f'{i:4} {OPNAMES[op]} {self.names[arg]}')
+            else:
+                out.append(f'{i:4} {OPNAMES[op]}')
+        return '\n'.join(out)
+
+
+class Compiler:
+    """Traduce un AST (Program o expresión) a un objeto Code.
+
+    El recorrido es post-orden con pila explícita: los hijos se emiten antes
+    que el operador, que es justo el orden que necesita la máquina de pila.
+    """
+    def __init__(self):
+        self.instructions = []
+        self.consts = []
+        self.names = []
+        self._const_index = {}
+        self._slot_index = {}
+        self._stored = set()
+
+    def const(self, value):
+        # distinguir 1 de 1.0 (y de True) al deduplicar
+        key = (type(value), value)
+        idx = self._const_index.get(key)
+        if idx is None:
+            idx = self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return idx
+
+    def slot(self, name):
+        idx = self._slot_index.get(name)
+        if idx is None:
+            idx = self._slot_index[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def compile(self, node):
+        if isinstance(node, flatast.FlatProgram):
+            return self.compile_flat(node)
+        if isinstance(node, ast.Program):
+            for s in node.statements:
+                self.emit_expr(s)
+                self.instructions.append(EMIT)
+            return Code(self.instructions, self.consts, self.names, sorted(self._stored), True)
+        self.emit_expr(node)
+        return Code(self.instructions, self.consts, self.names, sorted(self._stored), False)
+
+    def emit_expr(self, node):
+        emit = self.instructions.append
+        const_index = self._const_index
+        slot_index = self._slot_index
+        BinOp, Var, Number = ast.BinOp, ast.Var, ast.Number
+        # pila de trabajo con nodos pendientes e instrucciones ya codificadas:
+        # un BinOp/Assign apila primero su propia instrucción (un int) y luego
+        # sus hijos, así la instrucción se emite cuando los hijos ya salieron.
+        stack = [node]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            n = pop()
+            t = type(n)
+            if t is int:
+                emit(n)
+            elif t is BinOp:
+                push(BINOP_CODES[n.op])
+                push(n.right)
+                push(n.left)
+            elif t is Var:
+                idx = slot_index.get(n.name)
+                if idx is None:
+                    idx = self.slot(n.name)
+                emit(LOAD_VAR | idx << OP_BITS)
+            elif t is Number:
+                value = n.value
+                idx = const_index.get((type(value), value))
+                if idx is None:
+                    idx = self.const(value)
+                emit(LOAD_CONST | idx << OP_BITS)
+            elif isinstance(n, ast.Assign):
+                slot = self.slot(n.name)
+                self._stored.add(slot)
+                push(STORE_VAR | slot << OP_BITS)
+                push(n.value)
+            else:
+                raise RuntimeError('Unknown node')
+
+    def compile_flat(self, flat):
+        """Compila un FlatProgram: sus nodos ya están en post-orden, así que
+        basta emitir una instrucción por nodo (y EMIT tras cada sentencia)."""
+        emit = self.instructions.append
+        consts, names = flat.consts, flat.names
+        # traducir índices del FlatProgram a los de este Code
+        const_map = [self.const(v) for v in consts]
+        slot_map = [self.slot(n) for n in names]
+        ops = [BINOP_CODES[op] for op in flatast.OPS]
+        roots = iter(flat.statements)
+        root = next(roots, -1)
+        i = 0
+        for k, a in zip(flat.kinds, flat.args):
+            if k == flatast.VAR:
+                emit(LOAD_VAR | slot_map[a] << OP_BITS)
+            elif k == flatast.NUMBER:
+                emit(LOAD_CONST | const_map[a] << OP_BITS)
+            elif k == flatast.BINOP:
+                emit(ops[a])
+            else:
+                self._stored.add(slot_map[a])
+                emit(STORE_VAR | slot_map[a] << OP_BITS)
+            if i == root:
+                emit(EMIT)
+                root = next(roots, -1)
+            i += 1
+        return Code(self.instructions, self.consts, self.names, sorted(self._stored), True)
+
+
+def compile_ast(node):
+    """Compila un AST (o un FlatProgram) a bytecode (ver Compiler)."""
+    return Compiler().compile(node)
+
+
+def run(code, env=None, budget=None):
+    """Ejecuta un objeto Code en la máquina de pila.
+
+    - Las variables no asignadas valen 0 (igual que Evaluator).
+    - Si se pasa `env` (dict nombre -> valor) se usa como estado inicial y se
+      actualiza con los valores finales de las variables asignadas.
+    - Con `budget` (compiler.limits.Budget) cada instrucción es un paso, los
+      enteros calculados no pueden superar su ancho máximo y se respeta su
+      deadline.
+    - Devuelve la lista de resultados por sentencia (Program) o el valor de la
+      expresión.
+    """
+    consts = code.consts
+    names = code.names
+    if env:
+        slots = [env.get(name, 0) for name in names]
+    else:
+        slots = [0] * len(names)
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    results = []
+    emit = results.append
+    instructions = code.instructions
+    # el código es lineal: los pasos se conocen de antemano. Con presupuesto
+    # se ejecuta por tramos y entre tramo y tramo se mira el reloj; sin él,
+    # en un único tramo
+    if budget is not None:
+        budget.check_steps(len(instructions))
+        chunk = CHECK_INTERVAL
+        max_bits = budget.max_int_bits
+    else:
+        chunk = len(instructions) or 1
+        max_bits = None
+    for start in range(0, len(instructions), chunk):
+        if budget is not None:
+            budget.check_time()
+        # no hay saltos en el lenguaje: el código es lineal y basta un for
+        for w in instructions[start:start + chunk] if chunk < len(instructions) else instructions:
+            op = w & OP_MASK
+            if op == LOAD_VAR:
+                push(slots[w >> OP_BITS])
+            elif op == LOAD_CONST:
+                push(consts[w >> OP_BITS])
+            elif op == ADD:
+                r = pop()
+                v = stack[-1] = stack[-1] + r
+                if max_bits and type(v) is int and v.bit_length() > max_bits:
+                    budget.check_int(v)
+            elif op == MUL:
+                r = pop()
+                v = stack[-1] = stack[-1] * r
+                if max_bits and type(v) is int and v.bit_length() > max_bits:
+                    budget.check_int(v)
+            elif op == SUB:
+                r = pop()
+                v = stack[-1] = stack[-1] - r
+                if max_bits and type(v) is int and v.bit_length() > max_bits:
+                    budget.check_int(v)
+            elif op == DIV:
+                r = pop()
+                stack[-1] = stack[-1] / r
+            elif op == STORE_VAR:
+                slots[w >> OP_BITS] = stack[-1]
+            else:
+                emit(pop())
+    if env is not None:
+        for i in code.stored:
+            env[names[i]] = slots[i]
+    if code.is_program:
+        return results
+    return stack[-1]
@@ -0,0 +1,87 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Costo fijo estimado por entrada (clave, nodo del OrderedDict, referencias)
+# que se suma al tamaño del cuerpo para contabilizar el presupuesto de bytes.
+ENTRY_OVERHEAD = 128
+
+
+def make_key(code, *options):
+    """Calcula la clave de caché a partir del código fuente.
+
+    La clave es el hash SHA-256 del código; las opciones adicionales (si las
+    hay) se incluyen para que respuestas distintas del mismo código no choquen.
+    """
+    h = hashlib.sha256(code.encode('utf-8'))
+    for opt in options:
+        h.update(b'\0')
+        h.update(repr(opt).encode('utf-8'))
+    return h.digest()
+
+
+class CompileCache:
+    """Caché LRU de respuestas ya serializadas, acotada por bytes.
+
+    - Las entradas se indexan por una clave de contenido (ver make_key) y
+      guardan el cuerpo JSON final (bytes) listo para devolver al cliente.
+    - Cuando el total supera max_bytes se expulsan las entradas menos usadas.
+    - Todas las operaciones están protegidas por un lock (Flask puede servir
+      peticiones en varios hilos).
+    - max_bytes = 0 desactiva la caché.
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Devuelve el cuerpo guardado para key (o None) y lo marca como reciente."""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        """Guarda body bajo key, expulsando entradas LRU si hace falta."""
+        cost = len(body) + len(key) + ENTRY_OVERHEAD
+        if cost > self.max_bytes:
+            # no cabe (o caché desactivada): no se guarda
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old) + len(key) + ENTRY_OVERHEAD
+            self._entries[key] = body
+            self._size += cost
+            while self._size > self.max_bytes:
+                k, b = self._entries.popitem(last=False)
+                self._size -= len(b) + len(k) + ENTRY_OVERHEAD
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Resumen de contadores para diagnóstico."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,245 @@
+"""Grafo de dependencias (def-uso) entre sentencias y re-evaluación selectiva.
+
+Como semantic.Analyzer, se recorren las sentencias en orden llevando la
+tabla de símbolos; aquí cada nombre apunta además a la sentencia que lo
+asignó por última vez. Así cada lectura de una variable queda unida a su
+definición: la sentencia j define `x` y la sentencia i > j la usa si no hay
+otra asignación de `x` entre ambas. Las lecturas sin definición (-1) son
+exactamente los usos antes de asignar que reporta semantic.analyze.
+
+ReactiveEvaluator usa el grafo como una planilla de cálculo: conserva los
+valores de la evaluación anterior y, ante un programa nuevo, sólo evalúa las
+sentencias nuevas o modificadas y, a partir de ellas, las que leen un valor
+que cambió. Una sentencia recalculada cuyo valor no cambia no propaga nada.
+Armar el grafo sigue siendo lineal en el número de sentencias (una consulta
+de diccionario por sentencia que no cambió), pero la evaluación es
+proporcional a las sentencias afectadas.
+"""
+import heapq
+import math
+import threading
+
+from compiler import ast
+from compiler.evaluator import Evaluator
+
+
+def statement_info(stmt):
+    """(clave, lecturas, escritura) de una sentencia.
+
+    - clave: tupla con el recorrido en post-orden de la sentencia (marcador y
+      dato de cada nodo); dos sentencias con la misma clave producen el mismo
+      valor a partir de las mismas lecturas (1 y 1.0 tienen claves distintas)
+    - lecturas: nombres leídos, sin repetir, en orden de aparición
+    - escritura: nombre asignado, o None si la sentencia es una expresión
+    """
+    key = []
+    reads = {}
+    write = None
+    # pila explícita: nodos pendientes y marcadores ya listos para la clave
+    stack = [stmt]
+    while stack:
+        n = stack.pop()
+        if type(n) is tuple:
+            key += n
+        elif isinstance(n, ast.Number):
+            key += ('F' if isinstance(n.value, float) else 'I', n.value)
+        elif isinstance(n, ast.Var):
+            key += ('V', n.name)
+            reads[n.name] = None
+        elif isinstance(n, ast.BinOp):
+            stack.append(('B', n.op))
+            stack.append(n.right)
+            stack.append(n.left)
+        elif isinstance(n, ast.Assign):
+            write = n.name
+            stack.append(('=', n.name))
+            stack.append(n.value)
+        else:
+            raise RuntimeError('Unknown node')
+    return tuple(key), tuple(reads), write
+
+
+class DepGraph:
+    """Grafo def-uso de una lista de sentencias.
+
+    - keys, reads, writes: los de statement_info para cada sentencia
+    - deps[i]: por cada nombre de reads[i], índice de la sentencia que lo
+      define (la última asignación anterior a i) o -1 si no fue asignado
+    - users[j]: sentencias que leen la definición de la sentencia j
+    `info` es una lista opcional con el statement_info de cada sentencia ya
+    calculado.
+    """
+    def __init__(self, statements, info=None):
+        if info is None:
+            info = [statement_info(s) for s in statements]
+        self.keys = [k for k, _, _ in info]
+        self.reads = [r for _, r, _ in info]
+        self.writes = [w for _, _, w in info]
+        self.deps = []
+        self.users = [[] for _ in info]
+        # nombre -> sentencia que lo asignó por última vez
+        symbols = {}
+        users = self.users
+        for i, (_, reads, write) in enumerate(info):
+            deps = tuple(symbols.get(name, -1) for name in reads)
+            for d in deps:
+                if d >= 0:
+                    users[d].append(i)
+            self.deps.append(deps)
+            if write is not None:
+                symbols[write] = i
+
+    def __len__(self):
+        return len(self.deps)
+
+    def undefined(self):
+        """(sentencia, nombre) de cada lectura sin asignación previa."""
+        return [(i, name) for i, (reads, deps) in enumerate(zip(self.reads, self.deps))
+                for name, d in zip(reads, deps) if d < 0]
+
+    def dependents(self, indices):
+        """Sentencias afectadas (transitivamente) por las de `indices`, incluidas, en orden."""
+        seen = set(indices)
+        stack = list(seen)
+        while stack:
+            for u in self.users[stack.pop()]:
+                if u not in seen:
+                    seen.add(u)
+                    stack.append(u)
+        return sorted(seen)
+
+    def to_dict(self):
+        """Representación JSON: por sentencia, lo que asigna y de qué sentencias lee."""
+        return [{'writes': w, 'reads': dict(zip(r, d))} for w, r, d in zip(self.writes, self.reads, self.deps)]
+
+
+def _same(a, b):
+    # igualdad de resultados: 1 y 1.0, o 0.0 y -0.0, no son el mismo valor
+    if type(a) is not type(b) or a != b:
+        return False
+    return type(a) is not float or math.copysign(1.0, a) == math.copysign(1.0, b)
+
+
+class ReactiveEvaluator:
+    """Evaluador que reutiliza los resultados de la evaluación anterior.
+
+    Cada llamada a evaluate(program) devuelve lo mismo que
+    evaluator.evaluate(program) (la lista de valores de las sentencias) pero
+    sólo evalúa las sentencias que lo necesitan (ver la descripción del
+    módulo). Las sentencias se emparejan con las del programa anterior por su
+    clave, en orden, así que insertar, borrar o mover sentencias sólo afecta
+    a las que leen una definición distinta.
+
+    - evaluated / reused: sentencias evaluadas y reutilizadas en la última llamada
+    Si una evaluación falla (error de ejecución o presupuesto agotado) se
+    descarta el estado y la próxima llamada evalúa el programa completo.
+    """
+    def __init__(self):
+        self.graph = None
+        self.values = []
+        self._statements = []
+        self.evaluated = 0
+        self.reused = 0
+        # statement_info por id de sentencia: las sentencias que no cambian
+        # (p.ej. las de compiler.incremental) no se vuelven a recorrer
+        self._info = {}
+        self._lock = threading.Lock()
+
+    def evaluate(self, program, budget=None):
+        """Valores de las sentencias de `program` (un ast.Program).
+
+        `budget` (compiler.limits.Budget) se aplica a las sentencias evaluadas.
+        """
+        with self._lock:
+            try:
+                return self._evaluate(program.statements, budget)
+            except BaseException:
+                self.graph = None
+                self.values = []
+                self._statements = []
+                self._info = {}
+                raise
+
+    def _evaluate(self, statements, budget):
+        info_cache = self._info
+        used = {}
+        info = []
+        for stmt in statements:
+            entry = info_cache.get(id(stmt))
+            if entry is None or entry[0] is not stmt:
+                entry = (stmt, statement_info(stmt))
+            used[id(stmt)] = entry
+            info.append(entry[1])
+        self._info = used
+        graph = DepGraph(statements, info)
+
+        # emparejar cada sentencia con una del programa anterior: primero la
+        # misma sentencia (mismo objeto), si no una de igual clave (la primera
+        # libre, en orden)
+        old_graph, old_values, old_statements = self.graph, self.values, self._statements
+        match = [-1] * len(statements)
+        if old_graph is not None:
+            by_id = {id(stmt): j for j, stmt in enumerate(old_statements)}
+            free = [True] * len(old_statements)
+            for i, stmt in enumerate(statements):
+                j = by_id.get(id(stmt), -1)
+                if j >= 0 and free[j]:
+                    match[i] = j
+                    free[j] = False
+            by_key = {}
+            for j in range(len(old_statements) - 1, -1, -1):
+                if free[j]:
+                    by_key.setdefault(old_graph.keys[j], []).append(j)
+            if by_key:
+                for i, key in enumerate(graph.keys):
+                    if match[i] < 0:
+                        candidates = by_key.get(key)
+                        if candidates:
+                            match[i] = candidates.pop()
+
+        # valor heredado de cada sentencia; las que no tienen pareja o leen
+        # otras definiciones que su pareja se evalúan de nuevo
+        values = [None] * len(statements)
+        dirty = []
+        for i, m in enumerate(match):
+            if m >= 0:
+                values[i] = old_values[m]
+                old_deps = old_graph.deps[m]
+                if all((d < 0 and od < 0) or (d >= 0 and od >= 0 and match[d] == od)
+                       for d, od in zip(graph.deps[i], old_deps)):
+                    continue
+            dirty.append(i)
+
+        # recalcular en orden de sentencia: las dependencias de una sentencia
+        # son anteriores, así que ya tienen su valor final al llegar a ella
+        ev = Evaluator(budget)
+        pending = set(dirty)
+        heapq.heapify(dirty)
+        evaluated = 0
+        while dirty:
+            i = heapq.heappop(dirty)
+            ev.env = {name: values[d] for name, d in zip(graph.reads[i], graph.deps[i]) if d >= 0}
+            value = ev.eval(statements[i])
+            evaluated += 1
+            changed = match[i] < 0 or not _same(value, values[i])
+            values[i] = value
+            if changed:
+                for u in graph.users[i]:
+                    if u not in pending:
+                        pending.add(u)
+                        heapq.heappush(dirty, u)
+
+        self.graph = graph
+        self.values = values
+        self._statements = list(statements)
+        self.evaluated = evaluated
+        self.reused = len(statements) - evaluated
+        return list(values)
+
+    def stats(self):
+        return {'evaluated': self.evaluated, 'reused': self.reused}
+
+
+def build_graph(program_node):
+    """Función de conveniencia: DepGraph de un Program."""
+    return DepGraph(program_node.statements)
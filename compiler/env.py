@@ -0,0 +1,110 @@
+"""Entornos copy-on-write para evaluar variantes de un programa.
+
+Muchas variantes de un programa comparten un prefijo largo de asignaciones y
+sólo difieren en las últimas líneas. Con un dict como entorno, cada variante
+tendría que copiarlo o volver a evaluar el prefijo. Un Env es un mapeo de
+nombre -> valor hecho de capas: las capas de abajo están congeladas y se
+comparten, y sólo la capa propia recibe escrituras. fork() congela la capa
+propia y devuelve un Env independiente que comparte todas las capas, así
+que bifurcar cuesta O(1) y cada rama ocupa sólo lo que asigna.
+
+Sirve como `env` de evaluator.Evaluator y de bytecode.run, y como tabla de
+símbolos de semantic.Analyzer (ver Evaluator.fork y Analyzer.fork).
+compiler.pipeline.compile_branches lo usa para evaluar un prefijo una vez y
+cada continuación sobre una bifurcación de su estado: O(prefijo + suma de
+las continuaciones) en tiempo y memoria, en lugar de N veces el prefijo.
+"""
+
+# capas congeladas a partir de las cuales fork() las funde en una sola: acota
+# el costo de una búsqueda en cadenas largas de bifurcaciones
+MAX_LAYERS = 16
+
+_MISSING = object()
+
+
+class Env:
+    """Mapeo nombre -> valor con bifurcación copy-on-write.
+
+    Admite get, [], `in`, asignación e iteración como un dict (sin borrar
+    claves). `changes()` devuelve sólo lo asignado desde el último fork().
+    """
+    __slots__ = ('_local', '_layers')
+
+    def __init__(self, data=None):
+        self._local = dict(data) if data else {}
+        # capas congeladas, de la más nueva a la más vieja
+        self._layers = ()
+
+    def get(self, name, default=None):
+        local = self._local
+        if name in local:
+            return local[name]
+        for layer in self._layers:
+            if name in layer:
+                return layer[name]
+        return default
+
+    def __getitem__(self, name):
+        value = self.get(name, _MISSING)
+        if value is _MISSING:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        self._local[name] = value
+
+    def __contains__(self, name):
+        return name in self._local or any(name in layer for layer in self._layers)
+
+    def __bool__(self):
+        return bool(self._local) or any(self._layers)
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def items(self):
+        return self.to_dict().items()
+
+    def to_dict(self):
+        """Copia plana (un dict) del contenido."""
+        merged = {}
+        for layer in reversed(self._layers):
+            merged.update(layer)
+        merged.update(self._local)
+        return merged
+
+    def changes(self):
+        """Lo asignado en este Env desde que se creó o bifurcó."""
+        return dict(self._local)
+
+    def fork(self):
+        """Env independiente con el mismo contenido, en O(1).
+
+        La capa propia pasa a ser una capa congelada compartida; los dos
+        Env siguen escribiendo cada uno en una capa nueva.
+        """
+        if self._local:
+            layers = (self._local,) + self._layers
+            if len(layers) > MAX_LAYERS:
+                merged = {}
+                for layer in reversed(layers):
+                    merged.update(layer)
+                layers = (merged,)
+            self._layers = layers
+            self._local = {}
+        child = Env()
+        child._layers = self._layers
+        return child
+
+
+def fork(mapping):
+    """Función de conveniencia: (base, rama) a partir de un dict o un Env.
+
+    `base` es `mapping` si ya era un Env o un Env con su contenido; `rama`,
+    una bifurcación de `base`.
+    """
+    base = mapping if isinstance(mapping, Env) else Env(mapping)
+    return base, base.fork()
@@ -1,4 +1,5 @@
-from compiler import ast
+from compiler import ast, bytecode, env as envs, flatast
+from compiler.limits import NEVER
 
 
 class Evaluator:
@@ -8,51 +9,169 @@ class Evaluator:
     - Evalúa Program, Assign, Number, Var y BinOp.
     - Var devuelve 0 por defecto si la variable no existe (comportamiento simple
       para evitar excepciones en demos).
+    - Con `budget` (compiler.limits.Budget) se respetan su máximo de pasos
+      (`steps` cuenta los nodos y operadores procesados), el ancho máximo de
+      los enteros calculados y su deadline.
+    - `env` es el entorno inicial: un dict o un compiler.env.Env (ver fork).
     """
-    def __init__(self):
+    def __init__(self, budget=None, env=None):
         # entorno de ejecución: nombre -> valor
-        self.env = {}
+        self.env = env if env is not None else {}
+        self.budget = budget
+        self.steps = 0
+        self._check_steps_at = budget.check_steps(0) if budget is not None else NEVER
+        self._max_int_bits = budget.max_int_bits if budget is not None else None
+
+    def fork(self, budget=None):
+        """Evaluator nuevo que parte del entorno actual sin copiarlo.
+
+        El entorno pasa a ser un compiler.env.Env (copy-on-write): lo que
+        asigne cada uno después no lo ve el otro.
+        """
+        self.env, env = envs.fork(self.env)
+        return Evaluator(budget, env)
 
     def eval(self, node):
+        """Evalúa `node` y devuelve su valor (lista de resultados para Program).
+
+        El recorrido es post-orden con pila explícita, de modo que la
+        profundidad del árbol no está limitada por la recursión de Python:
+        `todo` tiene nodos pendientes y marcadores (el op de un BinOp, o
+        (nombre,) para guardar una asignación) y `values` los resultados ya
+        calculados.
+        """
         # Program: evaluar cada sentencia y retornar lista de resultados
         if isinstance(node, ast.Program):
-            results = []
-            for s in node.statements:
-                results.append(self.eval(s))
-            return results
-
-        # Assign: evaluar RHS y guardar en el entorno
-        if isinstance(node, ast.Assign):
-            value = self.eval(node.value)
-            self.env[node.name] = value
-            return value
-
-        # Number: literal numérico
-        if isinstance(node, ast.Number):
-            return node.value
-
-        # Var: recuperar valor de la variable (0 por defecto)
-        if isinstance(node, ast.Var):
-            return self.env.get(node.name, 0)
-
-        # BinOp: evaluar subexpresiones y aplicar operador
-        if isinstance(node, ast.BinOp):
-            l = self.eval(node.left)
-            r = self.eval(node.right)
-            if node.op == 'PLUS':
-                return l + r
-            if node.op == 'MINUS':
-                return l - r
-            if node.op == 'MUL':
-                return l * r
-            if node.op == 'DIV':
-                return l / r
-
-        # Nodo desconocido -> error en tiempo de ejecución
-        raise RuntimeError('Unknown node')
-
-
-def evaluate(ast_node):
-    """Función de conveniencia que crea un Evaluator y evalúa el AST dado."""
-    ev = Evaluator()
-    return ev.eval(ast_node)
+            return [self.eval(s) for s in node.statements]
+        if isinstance(node, flatast.FlatProgram):
+            return self.eval_flat(node)
+
+        env = self.env
+        max_bits = self._max_int_bits
+        steps = self.steps
+        check_at = self._check_steps_at
+        values = []
+        todo = [node]
+        while todo:
+            n = todo.pop()
+            steps += 1
+            if steps >= check_at:
+                self.steps = steps
+                check_at = self._check_steps_at = self.budget.check_steps(steps)
+
+            # marcador de operador: aplicar a los dos últimos valores
+            if type(n) is str:
+                r = values.pop()
+                l = values[-1]
+                if n == 'PLUS':
+                    v = l + r
+                elif n == 'MINUS':
+                    v = l - r
+                elif n == 'MUL':
+                    v = l * r
+                elif n == 'DIV':
+                    v = l / r
+                else:
+                    raise RuntimeError('Unknown node')
+                values[-1] = v
+                if max_bits and type(v) is int and v.bit_length() > max_bits:
+                    self.budget.check_int(v)
+
+            # marcador de asignación: guardar el valor (que queda como resultado)
+            elif type(n) is tuple:
+                env[n[0]] = values[-1]
+
+            # Number: literal numérico
+            elif isinstance(n, ast.Number):
+                values.append(n.value)
+
+            # Var: recuperar valor de la variable (0 por defecto)
+            elif isinstance(n, ast.Var):
+                values.append(env.get(n.name, 0))
+
+            # BinOp: evaluar subexpresiones y luego aplicar operador
+            elif isinstance(n, ast.BinOp):
+                todo.append(n.op)
+                todo.append(n.right)
+                todo.append(n.left)
+
+            # Assign: evaluar RHS y guardar en el entorno
+            elif isinstance(n, ast.Assign):
+                todo.append((n.name,))
+                todo.append(n.value)
+
+            # Nodo desconocido -> error en tiempo de ejecución
+            else:
+                raise RuntimeError('Unknown node')
+        self.steps = steps
+        return values.pop()
+
+    def eval_flat(self, flat):
+        """Evalúa un FlatProgram con un único recorrido lineal de sus arrays.
+
+        Los nodos están en post-orden, así que al llegar a un nodo los valores
+        de sus hijos ya están en `values` (indexado por número de nodo).
+        """
+        env = self.env
+        consts, names = flat.consts, flat.names
+        max_bits = self._max_int_bits
+        # cada nodo es un paso: el punto de control se compara con el índice
+        base = self.steps
+        check_at = self._check_steps_at - base
+        values = [None] * len(flat.kinds)
+        i = 0
+        for k, a, l, r in zip(flat.kinds, flat.args, flat.lefts, flat.rights):
+            if i >= check_at:
+                check_at = self.budget.check_steps(base + i) - base
+            if k == flatast.VAR:
+                values[i] = env.get(names[a], 0)
+            elif k == flatast.NUMBER:
+                values[i] = consts[a]
+            elif k == flatast.BINOP:
+                if a == 0:
+                    v = values[l] + values[r]
+                elif a == 1:
+                    v = values[l] - values[r]
+                elif a == 2:
+                    v = values[l] * values[r]
+                else:
+                    v = values[l] / values[r]
+                values[i] = v
+                if max_bits and type(v) is int and v.bit_length() > max_bits:
+                    self.budget.check_int(v)
+            else:
+                value = values[i] = values[l]
+                env[names[a]] = value
+            i += 1
+        self.steps = base + i
+        self._check_steps_at = check_at + base
+        return [values[s] for s in flat.statements]
+
+
+BACKENDS = ('tree', 'vm')
+
+
+def evaluate(ast_node, backend='tree', budget=None, stats=None):
+    """Función de conveniencia que evalúa el AST dado.
+
+    - backend='tree': recorre el AST con un Evaluator (intérprete por árbol).
+    - backend='vm': compila a bytecode y lo ejecuta en la máquina de pila de
+      compiler.bytecode; produce los mismos resultados con menos overhead.
+    `ast_node` puede ser también un FlatProgram (compiler.flatast).
+    `budget` (compiler.limits.Budget) limita pasos, enteros y tiempo.
+    Si `stats` es un dict, se le agrega 'eval_steps': nodos visitados por el
+    Evaluator o instrucciones del bytecode.
+    """
+    if backend == 'vm':
+        code = bytecode.compile_ast(ast_node)
+        if stats is not None:
+            stats['eval_steps'] = len(code.instructions)
+        return bytecode.run(code, budget=budget)
+    if backend != 'tree':
+        raise ValueError(f'Backend de evaluación desconocido: {backend!r}')
+    ev = Evaluator(budget)
+    try:
+        return ev.eval(ast_node)
+    finally:
+        if stats is not None:
+            stats['eval_steps'] = ev.steps
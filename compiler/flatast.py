@@ -0,0 +1,168 @@
+"""AST plano (struct-of-arrays) para programas muy grandes.
+
+En lugar de un objeto por nodo, un FlatProgram guarda los nodos en arrays
+tipados paralelos, indexados por número de nodo:
+
+- kinds: tipo de nodo (NUMBER, VAR, BINOP, ASSIGN)
+- args: índice en `consts` (NUMBER), en `names` (VAR, ASSIGN) o código de
+  operador (BINOP, índice en OPS)
+- lefts: hijo izquierdo (BINOP) o valor asignado (ASSIGN); -1 si no hay
+- rights: hijo derecho (BINOP); -1 si no hay
+- statements: nodo raíz de cada sentencia
+
+Los literales se guardan sin duplicados en `consts` (una lista: los enteros
+de Python no tienen tamaño fijo) y los nombres en `names`.
+
+Los nodos están en post-orden (cada hijo antes que su padre y las sentencias
+en orden), que es justo el orden en que el parser los construye. Así la
+evaluación, el análisis semántico, to_dict() y la compilación a bytecode son
+un único recorrido lineal de los arrays, sin recursión ni pilas.
+"""
+from array import array
+
+from compiler import ast
+
+NUMBER = 0
+VAR = 1
+BINOP = 2
+ASSIGN = 3
+
+OPS = ('PLUS', 'MINUS', 'MUL', 'DIV')
+OP_CODES = {op: i for i, op in enumerate(OPS)}
+
+
+class FlatProgram:
+    """Program en forma de arrays (ver la descripción del módulo)."""
+    __slots__ = ('kinds', 'args', 'lefts', 'rights', 'consts', 'names', 'statements')
+
+    def __init__(self, kinds, args, lefts, rights, consts, names, statements):
+        self.kinds = kinds
+        self.args = args
+        self.lefts = lefts
+        self.rights = rights
+        self.consts = consts
+        self.names = names
+        self.statements = statements
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def nbytes(self):
+        """Bytes ocupados por los arrays de nodos (sin consts/names)."""
+        return sum(a.itemsize * len(a) for a in (self.kinds, self.args, self.lefts, self.rights, self.statements))
+
+    def to_dict(self):
+        """Mismo diccionario que Program.to_dict() del AST de objetos."""
+        consts, names = self.consts, self.names
+        out = []
+        for k, a, l, r in zip(self.kinds, self.args, self.lefts, self.rights):
+            if k == VAR:
+                out.append({'type': 'Var', 'name': names[a]})
+            elif k == NUMBER:
+                out.append({'type': 'Number', 'value': consts[a]})
+            elif k == BINOP:
+                out.append({'type': 'BinOp', 'op': OPS[a], 'left': out[l], 'right': out[r]})
+            else:
+                out.append({'type': 'Assign', 'name': names[a], 'value': out[l]})
+        return {'type': 'Program', 'statements': [out[s] for s in self.statements]}
+
+    def to_program(self):
+        """Convierte a un Program de compiler.ast (p.ej. para el optimizador)."""
+        consts, names = self.consts, self.names
+        nodes = []
+        for k, a, l, r in zip(self.kinds, self.args, self.lefts, self.rights):
+            if k == VAR:
+                nodes.append(ast.Var(names[a]))
+            elif k == NUMBER:
+                nodes.append(ast.Number(consts[a]))
+            elif k == BINOP:
+                nodes.append(ast.BinOp(nodes[l], OPS[a], nodes[r]))
+            else:
+                nodes.append(ast.Assign(names[a], nodes[l]))
+        return ast.Program([nodes[s] for s in self.statements])
+
+
+class FlatBuilder:
+    """Builder para Parser(builder=...) que construye un FlatProgram.
+
+    Los métodos devuelven el índice del nodo creado; program() cierra el
+    programa. Un builder construye un único programa.
+    """
+    def __init__(self):
+        self.kinds = array('b')
+        self.args = array('i')
+        self.lefts = array('i')
+        self.rights = array('i')
+        self.consts = []
+        self.names = []
+        self._const_index = {}
+        self._name_index = {}
+
+    def _add(self, kind, arg, left=-1, right=-1):
+        self.kinds.append(kind)
+        self.args.append(arg)
+        self.lefts.append(left)
+        self.rights.append(right)
+        return len(self.kinds) - 1
+
+    def _name(self, name):
+        idx = self._name_index.get(name)
+        if idx is None:
+            idx = self._name_index[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def number(self, value):
+        # distinguir 1 de 1.0 (y de True), y 0.0 de -0.0, al deduplicar
+        key = (float, value.hex()) if type(value) is float else (type(value), value)
+        idx = self._const_index.get(key)
+        if idx is None:
+            idx = self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return self._add(NUMBER, idx)
+
+    def var(self, name):
+        return self._add(VAR, self._name(name))
+
+    def binop(self, left, op, right):
+        return self._add(BINOP, OP_CODES[op], left, right)
+
+    def assign(self, name, value):
+        return self._add(ASSIGN, self._name(name), value)
+
+    def program(self, statements):
+        return FlatProgram(self.kinds, self.args, self.lefts, self.rights,
+                           self.consts, self.names, array('i', statements))
+
+
+def flatten(program_node):
+    """Convierte un Program de compiler.ast en un FlatProgram.
+
+    Recorrido post-orden con pila explícita (un BinOp se apila de nuevo,
+    marcado, detrás de sus hijos).
+    """
+    b = FlatBuilder()
+    statements = []
+    for s in program_node.statements:
+        done = []
+        stack = [(s, False)]
+        while stack:
+            n, expanded = stack.pop()
+            if isinstance(n, ast.Number):
+                done.append(b.number(n.value))
+            elif isinstance(n, ast.Var):
+                done.append(b.var(n.name))
+            elif not expanded:
+                stack.append((n, True))
+                if isinstance(n, ast.BinOp):
+                    stack.append((n.right, False))
+                    stack.append((n.left, False))
+                else:
+                    stack.append((n.value, False))
+            elif isinstance(n, ast.BinOp):
+                right = done.pop()
+                done.append(b.binop(done.pop(), n.op, right))
+            else:
+                done.append(b.assign(n.name, done.pop()))
+        statements.append(done.pop())
+    return b.program(statements)
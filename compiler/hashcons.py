@@ -0,0 +1,325 @@
+"""AST compartido (hash-consing) y evaluación con memoización.
+
+El parser crea un nodo nuevo por cada aparición de una subexpresión, así que
+un programa generado que repite `(a*b+c)` diez mil veces tiene diez mil
+subárboles idénticos y el Evaluator los calcula todos. HashConsBuilder (un
+builder para Parser(builder=...)) devuelve en cambio un único nodo canónico
+por cada subárbol estructuralmente igual: el programa queda como un DAG con
+un nodo por subexpresión distinta.
+
+Sobre ese DAG:
+- MemoEvaluator guarda el valor de cada nodo compartido y lo reutiliza
+  hasta que se asigna alguna de las variables que lee
+- analyze() y to_dict() producen exactamente lo mismo que semantic.analyze
+  y ASTNode.to_dict, pero recorren una sola vez cada subárbol compartido
+  (to_dict reutiliza el mismo dict para todas sus apariciones)
+
+Las asignaciones no se comparten (cada una es una sentencia distinta). El
+optimizador no modifica los nodos que recibe, así que también sirve sobre el
+DAG; share() vuelve a compartir su resultado.
+"""
+from compiler import ast
+from compiler.evaluator import Evaluator
+
+# variables leídas de más por un nodo para memoizarlo: acota el trabajo de
+# invalidar en cada asignación
+MAX_MEMO_READS = 64
+
+_EMPTY = frozenset()
+
+
+class HashConsBuilder:
+    """Builder que devuelve un nodo canónico por cada subárbol distinto.
+
+    Dos Number son el mismo nodo sólo si su valor tiene el mismo tipo y los
+    mismos bits (1 y 1.0, o 0.0 y -0.0, siguen siendo nodos distintos); dos
+    BinOp, si tienen el mismo operador y los mismos hijos canónicos.
+
+    - occurrences: nodos pedidos (el tamaño del árbol equivalente)
+    - unique(): nodos distintos creados
+    - shared(): ids de los BinOp que aparecen más de una vez
+    """
+    def __init__(self):
+        self.occurrences = 0
+        self._numbers = {}
+        self._vars = {}
+        # (op, id(left), id(right)) -> BinOp; las tablas mantienen vivos los
+        # nodos, así que sus ids no se reutilizan
+        self._binops = {}
+        self._uses = {}
+
+    def number(self, value):
+        self.occurrences += 1
+        key = (float, value.hex()) if type(value) is float else (type(value), value)
+        node = self._numbers.get(key)
+        if node is None:
+            node = self._numbers[key] = ast.Number(value)
+        return node
+
+    def var(self, name):
+        self.occurrences += 1
+        node = self._vars.get(name)
+        if node is None:
+            node = self._vars[name] = ast.Var(name)
+        return node
+
+    def binop(self, left, op, right):
+        self.occurrences += 1
+        key = (op, id(left), id(right))
+        node = self._binops.get(key)
+        if node is None:
+            node = self._binops[key] = ast.BinOp(left, op, right)
+            self._uses[id(node)] = 1
+        else:
+            self._uses[id(node)] += 1
+        return node
+
+    def assign(self, name, value):
+        self.occurrences += 1
+        return ast.Assign(name, value)
+
+    program = ast.Program
+
+    def unique(self):
+        return len(self._numbers) + len(self._vars) + len(self._binops)
+
+    def shared(self):
+        return frozenset(key for key, uses in self._uses.items() if uses > 1)
+
+
+class MemoEvaluator(Evaluator):
+    """Evaluator que memoiza los BinOp compartidos (ids en `shared`).
+
+    El valor de un nodo compartido se guarda después de calcularlo junto con
+    las variables que lee; una asignación a cualquiera de ellas lo descarta.
+    Mientras tanto cada aparición del nodo cuesta un paso. Los nodos que leen
+    más de `max_reads` variables no se memoizan.
+
+    - hits: apariciones resueltas con un valor guardado
+    - stored: valores guardados
+    """
+    def __init__(self, shared, budget=None, max_reads=MAX_MEMO_READS):
+        super().__init__(budget)
+        self.shared = shared
+        self.max_reads = max_reads
+        self.hits = 0
+        self.stored = 0
+        # id del nodo -> valor vigente
+        self._memo = {}
+        # id del nodo -> variables que lee (None: demasiadas)
+        self._reads = {}
+        # variable -> ids de los valores guardados que la leen
+        self._watchers = {}
+
+    def _reads_of(self, node):
+        # variables que lee un BinOp compartido ya evaluado: sus hijos son
+        # hojas o BinOp compartidos (aparecen al menos tantas veces como él)
+        reads = _EMPTY
+        for child in (node.left, node.right):
+            if isinstance(child, ast.Var):
+                child_reads = frozenset((child.name,))
+            elif isinstance(child, ast.BinOp):
+                child_reads = self._reads.get(id(child))
+                if child_reads is None:
+                    return None
+            else:
+                continue
+            reads = reads | child_reads
+        return reads if len(reads) <= self.max_reads else None
+
+    def eval(self, node):
+        """Como Evaluator.eval, pero reutilizando los valores memoizados.
+
+        Además de los marcadores de Evaluator.eval, `todo` lleva (None, nodo)
+        para guardar el valor de un nodo compartido una vez calculado.
+        """
+        if isinstance(node, ast.Program):
+            return [self.eval(s) for s in node.statements]
+
+        env = self.env
+        shared, memo, watchers = self.shared, self._memo, self._watchers
+        max_bits = self._max_int_bits
+        steps = self.steps
+        check_at = self._check_steps_at
+        values = []
+        todo = [node]
+        while todo:
+            n = todo.pop()
+            steps += 1
+            if steps >= check_at:
+                self.steps = steps
+                check_at = self._check_steps_at = self.budget.check_steps(steps)
+
+            if type(n) is str:
+                r = values.pop()
+                l = values[-1]
+                if n == 'PLUS':
+                    v = l + r
+                elif n == 'MINUS':
+                    v = l - r
+                elif n == 'MUL':
+                    v = l * r
+                elif n == 'DIV':
+                    v = l / r
+                else:
+                    raise RuntimeError('Unknown node')
+                values[-1] = v
+                if max_bits and type(v) is int and v.bit_length() > max_bits:
+                    self.budget.check_int(v)
+
+            elif type(n) is tuple:
+                name = n[0]
+                if name is None:
+                    # nodo compartido recién calculado: guardar su valor
+                    shared_node = n[1]
+                    key = id(shared_node)
+                    reads = self._reads[key] = self._reads_of(shared_node)
+                    if reads is not None:
+                        memo[key] = values[-1]
+                        self.stored += 1
+                        for var in reads:
+                            watchers.setdefault(var, set()).add(key)
+                else:
+                    env[name] = values[-1]
+                    # los valores que leían la variable dejan de valer
+                    for key in watchers.pop(name, ()):
+                        memo.pop(key, None)
+
+            elif isinstance(n, ast.Number):
+                values.append(n.value)
+
+            elif isinstance(n, ast.Var):
+                values.append(env.get(n.name, 0))
+
+            elif isinstance(n, ast.BinOp):
+                if id(n) in shared:
+                    key = id(n)
+                    if key in memo:
+                        values.append(memo[key])
+                        self.hits += 1
+                        continue
+                    todo.append((None, n))
+                todo.append(n.op)
+                todo.append(n.right)
+                todo.append(n.left)
+
+            elif isinstance(n, ast.Assign):
+                todo.append((n.name,))
+                todo.append(n.value)
+
+            else:
+                raise RuntimeError('Unknown node')
+        self.steps = steps
+        return values.pop()
+
+
+def analyze(program_node, shared=None):
+    """Como semantic.analyze, sin volver a recorrer subárboles ya analizados.
+
+    Como los símbolos sólo se agregan, un subárbol que no tuvo errores
+    tampoco los tiene en sus apariciones siguientes y se salta. `shared`
+    limita qué BinOp se recuerdan (por defecto, todos).
+    """
+    symbols = {}
+    errors = []
+    clean = set()
+    for statement in program_node.statements:
+        stack = [statement]
+        while stack:
+            n = stack.pop()
+            if type(n) is tuple:
+                if n[0] is None:
+                    # marcador (None, nodo, errores antes): fin del subárbol
+                    if len(errors) == n[2]:
+                        clean.add(id(n[1]))
+                else:
+                    symbols[n[0]] = None
+            elif isinstance(n, ast.Assign):
+                stack.append((n.name,))
+                stack.append(n.value)
+            elif isinstance(n, ast.BinOp):
+                key = id(n)
+                if key in clean:
+                    continue
+                if shared is None or key in shared:
+                    stack.append((None, n, len(errors)))
+                stack.append(n.right)
+                stack.append(n.left)
+            elif isinstance(n, ast.Var):
+                if n.name not in symbols:
+                    errors.append(f"Variable '{n.name}' usada antes de asignar")
+    ok = len(errors) == 0
+    message = 'Sin errores semánticos' if ok else f'{len(errors)} error(es) semántico(s)'
+    return {'symbols': symbols, 'errors': errors, 'ok': ok, 'message': message}
+
+
+def to_dict(node):
+    """Como ASTNode.to_dict, con un único dict por nodo compartido.
+
+    El resultado se serializa a JSON igual que el del árbol; sólo ocupa en
+    memoria un dict por subexpresión distinta.
+    """
+    stack = []
+    pop = stack.pop
+    dicts = {}
+    d = node._dict(stack)
+    while stack:
+        child = pop()
+        key = pop()
+        container = pop()
+        child_dict = dicts.get(id(child))
+        if child_dict is None:
+            child_dict = dicts[id(child)] = child._dict(stack)
+        container[key] = child_dict
+    return d
+
+
+def share(program_node, builder=None):
+    """Reconstruye `program_node` (un Program) compartiendo sus subárboles.
+
+    Devuelve (programa, builder); `builder` (por defecto uno nuevo) permite
+    compartir nodos con otros programas.
+    """
+    builder = builder if builder is not None else HashConsBuilder()
+    statements = []
+    for statement in program_node.statements:
+        # post-orden con pila explícita: marcadores como en Evaluator.eval
+        values = []
+        todo = [statement]
+        while todo:
+            n = todo.pop()
+            if type(n) is str:
+                right = values.pop()
+                values[-1] = builder.binop(values[-1], n, right)
+            elif type(n) is tuple:
+                values[-1] = builder.assign(n[0], values[-1])
+            elif isinstance(n, ast.Number):
+                values.append(builder.number(n.value))
+            elif isinstance(n, ast.Var):
+                values.append(builder.var(n.name))
+            elif isinstance(n, ast.BinOp):
+                todo.append(n.op)
+                todo.append(n.right)
+                todo.append(n.left)
+            elif isinstance(n, ast.Assign):
+                todo.append((n.name,))
+                todo.append(n.value)
+            else:
+                raise RuntimeError('Unknown node')
+        statements.append(values.pop())
+    return builder.program(statements), builder
+
+
+def evaluate(program_node, builder, budget=None, stats=None):
+    """Función de conveniencia: evalúa con un MemoEvaluator.
+
+    `builder` es el HashConsBuilder que construyó `program_node`. Si `stats`
+    es un dict, se le agregan 'eval_steps' y 'memo_hits'.
+    """
+    ev = MemoEvaluator(builder.shared(), budget)
+    try:
+        return ev.eval(program_node)
+    finally:
+        if stats is not None:
+            stats['eval_steps'] = ev.steps
+            stats['memo_hits'] = ev.hits
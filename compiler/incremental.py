@@ -0,0 +1,304 @@
+"""Re-lexeo y re-parseo incremental de un documento editado en la UI.
+
+El documento se guarda como una secuencia de segmentos, uno por sentencia.
+Cada segmento abarca desde el primer token de su sentencia hasta el primer
+token de la siguiente (el espacio/saltos de línea intermedios quedan al final
+del segmento) y conserva sus tokens, su AST y su nodo del parse-tree. Las
+posiciones (línea, columna) de los tokens se guardan relativas al inicio del
+segmento, así un segmento no cambia cuando se edita texto anterior a él.
+
+Al aplicar una edición sólo se re-lexea y re-parsea la región dañada:
+desde la sentencia anterior a la editada (que podría extenderse si la edición
+agrega un operador al principio de la siguiente) hasta el primer segmento
+posterior al final de la edición. La región se parsea junto con ese segmento
+siguiente: si el parseo no vuelve a cortar exactamente donde empieza (p.ej. la
+edición dejó una expresión o un paréntesis abierto, o dos tokens se fusionan
+en la frontera) la región se amplía (duplicando cada vez cuántos segmentos
+agrega, para que un error real no cueste un re-parseo por segmento) y se repite.
+
+Con un presupuesto (compiler.limits.Budget) el lexeo y el parseo de cada
+región respetan sus límites de profundidad y tiempo, y el documento completo
+los de tamaño, tokens y nodos del AST (los mismos que el pipeline comprueba
+al lexear y parsear todo el código): una edición que lo dejaría por encima de
+alguno se rechaza antes de aplicarla. BudgetExceeded se propaga y el
+documento queda como estaba.
+"""
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+from compiler import ast, depgraph
+from compiler.lexer import Token, lex
+from compiler.limits import BudgetExceeded
+from compiler.parser import ParseNode, Parser
+
+
+class VersionMismatch(Exception):
+    """La edición se hizo sobre una versión del documento distinta a la actual."""
+    def __init__(self, expected, got):
+        super().__init__(f'Versión {got} no coincide con la actual ({expected})')
+        self.expected = expected
+        self.got = got
+
+
+class Segment:
+    """Una sentencia del documento con su texto, tokens relativos, AST,
+    parse-tree y número de nodos de su AST."""
+    __slots__ = ('text', 'tokens', 'ast', 'pt', 'nodes', 'newlines', 'tail')
+
+    def __init__(self, text, tokens, ast_node, pt, nodes):
+        self.text = text
+        self.tokens = tokens
+        self.ast = ast_node
+        self.pt = pt
+        self.nodes = nodes
+        self.newlines = text.count('\n')
+        # caracteres después del último salto de línea (para calcular columnas)
+        self.tail = len(text) - text.rfind('\n') - 1
+
+
+def _build_segments(text, budget=None):
+    """Lexea y parsea `text` completo y lo divide en segmentos.
+
+    Devuelve (lead, segments) donde lead es el texto previo al primer token.
+    Propaga las excepciones del lexer/parser.
+    """
+    tokens = lex(text, budget=budget)
+    line_starts = [0]
+    line_starts.extend(m.end() for m in re.finditer('\n', text))
+
+    def offset(tok):
+        return line_starts[tok.line - 1] + tok.col - 1
+
+    p = Parser(tokens, budget=budget)
+    bounds = []
+    while p.peek() is not None:
+        first, nodes = p.pos, p.nodes
+        s_ast, s_pt = p.parse_statement()
+        bounds.append((first, p.pos, s_ast, s_pt, p.nodes - nodes))
+
+    lead = text[:offset(tokens[0])] if tokens else text
+    segments = []
+    for i, (first, last, s_ast, s_pt, nodes) in enumerate(bounds):
+        start = offset(tokens[first])
+        end = offset(tokens[bounds[i + 1][0]]) if i + 1 < len(bounds) else len(text)
+        first_tok = tokens[first]
+        base_line, base_col = first_tok.line, first_tok.col
+        rel = []
+        for tok in tokens[first:last]:
+            if tok.line == base_line:
+                rel.append(Token(tok.type, tok.value, 1, tok.col - base_col + 1))
+            else:
+                rel.append(Token(tok.type, tok.value, tok.line - base_line + 1, tok.col))
+        segments.append(Segment(text[start:end], rel, s_ast, s_pt, nodes))
+    return lead, segments
+
+
+def _check_totals(segments, budget):
+    # tokens y nodos del AST del documento completo (más el Program), como
+    # si se lexeara y parseara todo el código
+    if budget is not None:
+        budget.check_tokens(sum(len(seg.tokens) for seg in segments))
+        budget.check_nodes(sum(seg.nodes for seg in segments) + 1)
+
+
+class Document:
+    """Documento editable con re-lexeo/re-parseo incremental.
+
+    - version: se incrementa con cada edición aplicada
+    - error: excepción del último lexeo/parseo si el documento no es válido;
+      en ese caso no hay segmentos y la próxima edición lo reconstruye entero
+    - render_cache: medición de los subárboles del último render centrado
+      (compiler.render); las sentencias que no cambian no se vuelven a medir
+    - reactive: compiler.depgraph.ReactiveEvaluator con los resultados de la
+      última evaluación; sólo se re-evalúan las sentencias afectadas
+
+    `budget` (compiler.limits.Budget) acota el código inicial como en
+    apply_edit.
+    """
+    def __init__(self, code='', budget=None):
+        self.version = 0
+        self.lock = threading.Lock()
+        self.render_cache = {}
+        self.reactive = depgraph.ReactiveEvaluator()
+        if budget is not None:
+            budget.check_source_bytes(len(code.encode('utf-8')))
+        self.reset(code, budget)
+
+    def reset(self, code, budget=None):
+        """Reconstruye el documento completo a partir de `code`.
+
+        Con `budget` propaga BudgetExceeded sin modificar el documento.
+        """
+        error = None
+        try:
+            lead, segments = _build_segments(code, budget)
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            # documento inválido: guardar sólo el texto
+            error = e
+            lead, segments = '', []
+        _check_totals(segments, budget)
+        self.error = error
+        self._text = code if error is not None else None
+        self.lead, self.segments = lead, segments
+        self.starts = []
+        pos = len(self.lead)
+        for seg in self.segments:
+            self.starts.append(pos)
+            pos += len(seg.text)
+        self.length = pos if self.error is None else len(code)
+
+    @property
+    def text(self):
+        if self.error is not None:
+            return self._text
+        return self.lead + ''.join(seg.text for seg in self.segments)
+
+    def apply_edit(self, version, start, end, text, budget=None):
+        """Reemplaza el rango [start, end) por `text` y devuelve la nueva versión.
+
+        Lanza VersionMismatch si `version` no es la versión actual (el cliente
+        debe reenviar el documento completo), TypeError si `text` no es un
+        string y ValueError si el rango es inválido. Con `budget`
+        (compiler.limits.Budget) lanza BudgetExceeded si el documento editado
+        supera el tamaño, los tokens o los nodos máximos, o si la región
+        re-lexeada y re-parseada supera la profundidad o el deadline; en ese
+        caso el documento no cambia.
+        """
+        if version != self.version:
+            raise VersionMismatch(self.version, version)
+        if not isinstance(text, str):
+            raise TypeError('El texto de la edición debe ser un string')
+        if not (0 <= start <= end <= self.length):
+            raise ValueError(f'Rango de edición inválido: [{start}, {end})')
+        if budget is not None:
+            old = self.text
+            budget.check_source_bytes(len(old.encode('utf-8')) - len(old[start:end].encode('utf-8'))
+                                      + len(text.encode('utf-8')))
+        if self.error is not None:
+            old = self._text
+            self.reset(old[:start] + text + old[end:], budget)
+        else:
+            self._splice(start, end, text, budget)
+        self.version += 1
+        return self.version
+
+    def _splice(self, start, end, text, budget):
+        segments, starts = self.segments, self.starts
+        n = len(segments)
+        delta = len(text) - (end - start)
+        # k: primer segmento a re-parsear (el anterior al que contiene start)
+        k = max(bisect_right(starts, start) - 2, 0)
+        # j: primer segmento que empieza estrictamente después del final de la edición
+        j = bisect_right(starts, end)
+        region_start = starts[k] if k > 0 else 0
+        grow = 1
+
+        while True:
+            if k == 0:
+                old_region = self.lead + ''.join(seg.text for seg in segments[:j])
+            else:
+                old_region = ''.join(seg.text for seg in segments[k:j])
+            region = old_region[:start - region_start] + text + old_region[end - region_start:]
+            try:
+                if j < n:
+                    # parsear también el segmento siguiente: debe reaparecer
+                    # intacto, empezando justo al final de la región
+                    nxt = segments[j].text
+                    lead, new_segments = _build_segments(region + nxt, budget)
+                    if not new_segments or new_segments.pop().text != nxt:
+                        j, grow = min(j + grow, n), grow * 2
+                        continue
+                else:
+                    lead, new_segments = _build_segments(region, budget)
+            except BudgetExceeded:
+                raise
+            except Exception as e:
+                if j < n:
+                    # posiblemente una expresión que continúa en el siguiente segmento
+                    j, grow = min(j + grow, n), grow * 2
+                    continue
+                # el error es real: guardar el texto completo como inválido
+                full = self.text
+                self.error = e
+                self._text = full[:start] + text + full[end:]
+                self.lead, self.segments, self.starts = '', [], []
+                self.length = len(self._text)
+                return
+            break
+
+        _check_totals(segments[:k] + new_segments + segments[j:], budget)
+        if k == 0:
+            self.lead = lead
+            pos = len(lead)
+        else:
+            pos = region_start
+            if lead:
+                # no debería ocurrir (la región empieza en un token intacto),
+                # pero el espacio inicial pertenece al segmento anterior
+                prev = segments[k - 1]
+                segments[k - 1] = Segment(prev.text + lead, prev.tokens, prev.ast, prev.pt, prev.nodes)
+                pos += len(lead)
+        new_starts = []
+        for seg in new_segments:
+            new_starts.append(pos)
+            pos += len(seg.text)
+        self.segments = segments[:k] + new_segments + segments[j:]
+        self.starts = starts[:k] + new_starts + [s + delta for s in starts[j:]]
+        self.length += delta
+
+    def tokens(self):
+        """Lista de tokens con posiciones absolutas (como la de lexer.lex)."""
+        out = []
+        line = self.lead.count('\n') + 1
+        col = len(self.lead) - self.lead.rfind('\n')
+        for seg in self.segments:
+            for tok in seg.tokens:
+                if tok.line == 1:
+                    out.append(Token(tok.type, tok.value, line, col + tok.col - 1))
+                else:
+                    out.append(Token(tok.type, tok.value, line + tok.line - 1, tok.col))
+            if seg.newlines:
+                line += seg.newlines
+                col = seg.tail + 1
+            else:
+                col += seg.tail
+        return out
+
+    def program(self):
+        return ast.Program([seg.ast for seg in self.segments])
+
+    def parse_root(self):
+        return ParseNode('S', [seg.pt for seg in self.segments])
+
+
+class DocumentStore:
+    """Conjunto acotado de documentos abiertos (LRU por número de documentos)."""
+    def __init__(self, max_docs=256):
+        self.max_docs = max_docs
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, doc_id):
+        with self._lock:
+            doc = self._docs.get(doc_id)
+            if doc is not None:
+                self._docs.move_to_end(doc_id)
+            return doc
+
+    def open(self, doc_id, code, budget=None):
+        """Crea (o reemplaza) el documento doc_id con el texto completo `code`.
+
+        Si `budget` se agota al construirlo propaga BudgetExceeded y no
+        guarda nada.
+        """
+        doc = Document(code, budget)
+        with self._lock:
+            self._docs[doc_id] = doc
+            self._docs.move_to_end(doc_id)
+            while len(self._docs) > self.max_docs:
+                self._docs.popitem(last=False)
+        return doc
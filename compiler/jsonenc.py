@@ -0,0 +1,86 @@
+"""Codificador JSON iterativo.
+
+json.dumps recorre los contenedores recursivamente y lanza RecursionError con
+estructuras muy anidadas (p.ej. el 'ast' de una expresión con miles de
+paréntesis). Este módulo produce exactamente la misma salida que json.dumps
+con los separadores por defecto, pero con una pila explícita, de modo que la
+profundidad sólo está limitada por la memoria. Es más lento: app.py lo usa
+sólo como alternativa cuando json.dumps falla.
+"""
+import json
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+
+class _Raw(str):
+    """Fragmento de salida ya codificado (se distingue de un str a codificar)."""
+    __slots__ = ()
+
+
+_OPEN_LIST = _Raw('[')
+_CLOSE_LIST = _Raw(']')
+_OPEN_DICT = _Raw('{')
+_CLOSE_DICT = _Raw('}')
+_ITEM_SEP = _Raw(', ')
+
+
+def dumps(obj, sort_keys=False, ensure_ascii=True):
+    """Serializa `obj` (dict, list, tuple, str, números, bool, None) a JSON.
+
+    Las claves de los diccionarios se convierten a string como en json.dumps;
+    cualquier otro tipo lanza TypeError.
+    """
+    encode_str = encode_basestring_ascii if ensure_ascii else encode_basestring
+    out = []
+    write = out.append
+    # pila de valores pendientes y fragmentos _Raw (en orden inverso)
+    stack = [obj]
+    pop = stack.pop
+    push = stack.append
+    while stack:
+        o = pop()
+        t = type(o)
+        if t is _Raw:
+            write(o)
+        elif t is str:
+            write(encode_str(o))
+        elif o is None or t is bool or t is int or t is float:
+            write(json.dumps(o))
+        elif t is list or t is tuple:
+            if not o:
+                write('[]')
+                continue
+            write(_OPEN_LIST)
+            push(_CLOSE_LIST)
+            for i in range(len(o) - 1, -1, -1):
+                push(o[i])
+                if i:
+                    push(_ITEM_SEP)
+        elif t is dict:
+            if not o:
+                write('{}')
+                continue
+            items = sorted(o.items()) if sort_keys else list(o.items())
+            write(_OPEN_DICT)
+            push(_CLOSE_DICT)
+            for i in range(len(items) - 1, -1, -1):
+                key, value = items[i]
+                push(value)
+                push(_Raw(_key(key, encode_str) + ': '))
+                if i:
+                    push(_ITEM_SEP)
+        elif isinstance(o, str):
+            write(encode_str(o))
+        elif isinstance(o, (int, float)):
+            write(json.dumps(o))
+        else:
+            raise TypeError(f'Object of type {t.__name__} is not JSON serializable')
+    return ''.join(out)
+
+
+def _key(key, encode_str):
+    # mismas conversiones de claves que json.dumps
+    if isinstance(key, str):
+        return encode_str(key)
+    if key is None or isinstance(key, (bool, int, float)):
+        return encode_str(json.dumps(key))
+    raise TypeError(f'keys must be str, int, float, bool or None, not {type(key).__name__}')
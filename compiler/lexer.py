@@ -1,6 +1,9 @@
 import re
+from array import array
 from collections import namedtuple
 
+from compiler.limits import NEVER
+
 # Token es una tupla simple que representa un token lexemizado:
 # - type: tipo del token (p.ej. 'NUMBER', 'ID', 'PLUS')
 # - value: valor literal (número convertido a int/float, o string)
@@ -29,18 +32,26 @@ TOKEN_SPEC = [
 TOK_REGEX = '|'.join('(?P<%s>%s)' % pair for pair in TOKEN_SPEC)
 
 
-def lex(code):
+def lex(code, line_num=1, budget=None, col_num=1):
     """Convierte el texto de entrada en una lista de tokens.
 
     - Recorre el código con re.finditer usando TOK_REGEX.
     - Convierte literales numéricos a int/float.
     - Mantiene el seguimiento de número de línea y columna para reportes.
+      `line_num` es el número de la primera línea de `code` (útil cuando se
+      lexea un fragmento que empieza al principio de una línea posterior) y
+      `col_num` la columna donde empieza esa primera línea (un fragmento que
+      empieza a mitad de línea).
     - Lanza RuntimeError en caso de encontrar un carácter inesperado.
+    - Con `budget` (compiler.limits.Budget) se respeta su máximo de tokens y
+      su deadline.
     """
     tokens = []
-    line_num = 1
-    line_start = 0
+    line_start = 1 - col_num
+    check_at = budget.check_tokens(0) if budget is not None else NEVER
     for mo in re.finditer(TOK_REGEX, code):
+        if len(tokens) >= check_at:
+            check_at = budget.check_tokens(len(tokens))
         kind = mo.lastgroup
         value = mo.group()
         col = mo.start() - line_start + 1
@@ -67,4 +78,348 @@ def lex(code):
         else:
             # Operadores y símbolos simples
             tokens.append(Token(kind, value, line_num, col))
+    if budget is not None:
+        budget.check_tokens(len(tokens))
+    return tokens
+
+
+# --- Scanner escrito a mano (alternativa a lex) ---
+#
+# Clases de carácter para el despacho de scan(): CHAR_CLASS[byte] dice qué
+# hacer con cada carácter ASCII. Los que no son ninguna de estas clases son
+# errores léxicos (como MISMATCH en TOKEN_SPEC).
+C_OTHER, C_SPACE, C_NEWLINE, C_DIGIT, C_ALPHA, C_SINGLE = range(6)
+
+# tokens de un único carácter: carácter -> tipo
+SINGLE_CHARS = {'=': 'ASSIGN', '+': 'PLUS', '-': 'MINUS', '*': 'MUL', '/': 'DIV',
+                '(': 'LPAREN', ')': 'RPAREN', ';': 'SEMI'}
+
+_DIGITS = b'0123456789'
+_LETTERS = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_'
+
+CHAR_CLASS = [C_OTHER] * 256
+for _c in b' \t':
+    CHAR_CLASS[_c] = C_SPACE
+CHAR_CLASS[ord('\n')] = C_NEWLINE
+for _c in _DIGITS:
+    CHAR_CLASS[_c] = C_DIGIT
+for _c in _LETTERS:
+    CHAR_CLASS[_c] = C_ALPHA
+for _ch in SINGLE_CHARS:
+    CHAR_CLASS[ord(_ch)] = C_SINGLE
+# tipo de token por byte (sólo para C_SINGLE)
+_SINGLE_TYPE = [None] * 256
+for _ch, _t in SINGLE_CHARS.items():
+    _SINGLE_TYPE[ord(_ch)] = _t
+# caracteres que continúan un identificador / un número
+_IS_WORD = [False] * 256
+for _c in _DIGITS + _LETTERS:
+    _IS_WORD[_c] = True
+_IS_DIGIT = [False] * 256
+for _c in _DIGITS:
+    _IS_DIGIT[_c] = True
+_DOT = ord('.')
+
+
+def scan(code, line_num=1, budget=None):
+    """Scanner de una pasada equivalente a lex() (misma lista de tokens).
+
+    En lugar de la alternancia de expresiones regulares recorre los bytes del
+    código una sola vez: la clase de cada carácter (CHAR_CLASS) decide la
+    acción, identificadores y números se consumen en bucles cerrados sobre
+    tablas y los espacios se saltan sin crear nada.
+
+    Acepta str, bytes, bytearray o memoryview (UTF-8). Las reglas de lex()
+    para identificadores y números admiten letras y dígitos Unicode: si el
+    código no es ASCII se delega en lex() para dar exactamente el mismo
+    resultado. Los errores también son los mismos (RuntimeError con línea y
+    columna); `budget` como en lex().
+    """
+    if isinstance(code, str):
+        if not code.isascii():
+            return lex(code, line_num, budget)
+        text = code
+        data = code.encode('ascii')
+    else:
+        data = bytes(code)
+        if not data.isascii():
+            return lex(data.decode('utf-8'), line_num, budget)
+        text = data.decode('ascii')
+
+    n = len(data)
+    tokens = []
+    append = tokens.append
+    # crear la tupla directamente evita el __new__ de Python del namedtuple
+    new = tuple.__new__
+    char_class = CHAR_CLASS
+    single_type = _SINGLE_TYPE
+    is_word = _IS_WORD
+    is_digit = _IS_DIGIT
+    check_at = budget.check_tokens(0) if budget is not None else NEVER
+    pos = 0
+    line_start = 0
+    while pos < n:
+        if len(tokens) >= check_at:
+            check_at = budget.check_tokens(len(tokens))
+        c = data[pos]
+        k = char_class[c]
+        if k == C_SPACE:
+            pos += 1
+            while pos < n and char_class[data[pos]] == C_SPACE:
+                pos += 1
+        elif k == C_ALPHA:
+            end = pos + 1
+            while end < n and is_word[data[end]]:
+                end += 1
+            append(new(Token, ('ID', text[pos:end], line_num, pos - line_start + 1)))
+            pos = end
+        elif k == C_SINGLE:
+            append(new(Token, (single_type[c], text[pos], line_num, pos - line_start + 1)))
+            pos += 1
+        elif k == C_DIGIT:
+            end = pos + 1
+            while end < n and is_digit[data[end]]:
+                end += 1
+            # parte decimal sólo si al punto le sigue un dígito (como en TOKEN_SPEC)
+            if end + 1 < n and data[end] == _DOT and is_digit[data[end + 1]]:
+                end += 2
+                while end < n and is_digit[data[end]]:
+                    end += 1
+                value = float(text[pos:end])
+            else:
+                value = int(text[pos:end])
+            append(new(Token, ('NUMBER', value, line_num, pos - line_start + 1)))
+            pos = end
+        elif k == C_NEWLINE:
+            pos += 1
+            line_num += 1
+            line_start = pos
+        else:
+            raise RuntimeError(f'Unexpected character {text[pos]!r} at line {line_num} col {pos - line_start + 1}')
+    if budget is not None:
+        budget.check_tokens(len(tokens))
     return tokens
+
+
+# --- Tokens en columnas (alternativa a la lista de Token) ---
+#
+# Código de cada tipo de token; 0 queda para el fin de la entrada (el parser
+# agrega un EOF al final de la columna de tipos y así nunca mira más allá).
+KINDS = ('EOF', 'NUMBER', 'ID', 'ASSIGN', 'PLUS', 'MINUS', 'MUL', 'DIV', 'LPAREN', 'RPAREN', 'SEMI')
+KIND_CODES = {kind: i for i, kind in enumerate(KINDS)}
+EOF = 0
+NUMBER = KIND_CODES['NUMBER']
+ID = KIND_CODES['ID']
+# texto de los tokens de un carácter, por código
+_PUNCT_TEXT = [None] * len(KINDS)
+for _ch, _t in SINGLE_CHARS.items():
+    _PUNCT_TEXT[KIND_CODES[_t]] = _ch
+# código de token por byte (sólo para C_SINGLE)
+_SINGLE_CODE = [0] * 256
+for _ch, _t in SINGLE_CHARS.items():
+    _SINGLE_CODE[ord(_ch)] = KIND_CODES[_t]
+
+
+class SymbolTable:
+    """Nombres internados: cada identificador distinto se guarda una vez y se
+    referencia por su número (orden de primera aparición)."""
+    __slots__ = ('names', '_index')
+
+    def __init__(self):
+        self.names = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, sid):
+        return self.names[sid]
+
+    def intern(self, name):
+        sid = self._index.get(name)
+        if sid is None:
+            sid = self._index[name] = len(self.names)
+            self.names.append(name)
+        return sid
+
+
+class TokenBuffer:
+    """Secuencia de tokens guardada en columnas tipadas.
+
+    - kinds: código de tipo de cada token (índice en KINDS)
+    - args: número de símbolo en `symbols` (ID) o índice en `consts` (NUMBER);
+      0 para los demás tokens
+    - lines, cols: posición de cada token
+    - symbols: SymbolTable con los identificadores
+    - consts: literales numéricos (una lista: los enteros de Python no
+      tienen tamaño fijo), sin duplicados
+
+    Se comporta como la lista de Token de lex(): len(), índices e iteración
+    devuelven Token (así siguen funcionando _asdict(), token_label y demás).
+    El parser lee las columnas directamente.
+    """
+    __slots__ = ('kinds', 'args', 'lines', 'cols', 'symbols', 'consts', '_const_index')
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.args = array('i')
+        self.lines = array('i')
+        self.cols = array('i')
+        self.symbols = SymbolTable()
+        self.consts = []
+        self._const_index = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def const(self, value):
+        """Índice de `value` en consts (lo agrega si no estaba)."""
+        # distinguir 1 de 1.0, y 0.0 de -0.0, al deduplicar
+        key = (float, value.hex()) if type(value) is float else (type(value), value)
+        idx = self._const_index.get(key)
+        if idx is None:
+            idx = self._const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return idx
+
+    def append(self, kind, value, line, col):
+        """Agrega un token con tipo `kind` (nombre, como en Token.type)."""
+        code = KIND_CODES[kind]
+        if code == ID:
+            arg = self.symbols.intern(value)
+        elif code == NUMBER:
+            arg = self.const(value)
+        else:
+            arg = 0
+        self.kinds.append(code)
+        self.args.append(arg)
+        self.lines.append(line)
+        self.cols.append(col)
+
+    def value(self, i):
+        """Valor del token i (como Token.value)."""
+        code = self.kinds[i]
+        if code == ID:
+            return self.symbols.names[self.args[i]]
+        if code == NUMBER:
+            return self.consts[self.args[i]]
+        return _PUNCT_TEXT[code]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        return tuple.__new__(Token, (KINDS[self.kinds[i]], self.value(i), self.lines[i], self.cols[i]))
+
+    def __iter__(self):
+        names, consts = self.symbols.names, self.consts
+        new = tuple.__new__
+        for code, arg, line, col in zip(self.kinds, self.args, self.lines, self.cols):
+            if code == ID:
+                value = names[arg]
+            elif code == NUMBER:
+                value = consts[arg]
+            else:
+                value = _PUNCT_TEXT[code]
+            yield new(Token, (KINDS[code], value, line, col))
+
+    def to_list(self):
+        """Lista de Token equivalente (la salida de lex())."""
+        return list(self)
+
+    def nbytes(self):
+        """Bytes ocupados por las columnas (sin símbolos ni constantes)."""
+        return sum(a.itemsize * len(a) for a in (self.kinds, self.args, self.lines, self.cols))
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """TokenBuffer con los tokens de una lista de Token."""
+        buf = cls()
+        for tok in tokens:
+            buf.append(*tok)
+        return buf
+
+
+def scan_columns(code, line_num=1, budget=None):
+    """Como scan(), pero devuelve un TokenBuffer en lugar de una lista.
+
+    Mismo recorrido por clases de carácter; cada token se escribe en las
+    columnas sin crear tuplas y los identificadores se internan a medida
+    que aparecen. El código no ASCII pasa por lex() y se convierte.
+    """
+    if isinstance(code, str):
+        if not code.isascii():
+            return TokenBuffer.from_tokens(lex(code, line_num, budget))
+        text = code
+        data = code.encode('ascii')
+    else:
+        data = bytes(code)
+        if not data.isascii():
+            return TokenBuffer.from_tokens(lex(data.decode('utf-8'), line_num, budget))
+        text = data.decode('ascii')
+
+    buf = TokenBuffer()
+    kinds = buf.kinds
+    add_kind, add_arg, add_line, add_col = kinds.append, buf.args.append, buf.lines.append, buf.cols.append
+    intern = buf.symbols.intern
+    const = buf.const
+    n = len(data)
+    char_class = CHAR_CLASS
+    single_code = _SINGLE_CODE
+    is_word = _IS_WORD
+    is_digit = _IS_DIGIT
+    check_at = budget.check_tokens(0) if budget is not None else NEVER
+    pos = 0
+    line_start = 0
+    while pos < n:
+        if len(kinds) >= check_at:
+            check_at = budget.check_tokens(len(kinds))
+        c = data[pos]
+        k = char_class[c]
+        if k == C_SPACE:
+            pos += 1
+            while pos < n and char_class[data[pos]] == C_SPACE:
+                pos += 1
+            continue
+        if k == C_ALPHA:
+            end = pos + 1
+            while end < n and is_word[data[end]]:
+                end += 1
+            add_kind(ID)
+            add_arg(intern(text[pos:end]))
+        elif k == C_SINGLE:
+            end = pos + 1
+            add_kind(single_code[c])
+            add_arg(0)
+        elif k == C_DIGIT:
+            end = pos + 1
+            while end < n and is_digit[data[end]]:
+                end += 1
+            if end + 1 < n and data[end] == _DOT and is_digit[data[end + 1]]:
+                end += 2
+                while end < n and is_digit[data[end]]:
+                    end += 1
+                value = float(text[pos:end])
+            else:
+                value = int(text[pos:end])
+            add_kind(NUMBER)
+            add_arg(const(value))
+        elif k == C_NEWLINE:
+            pos += 1
+            line_num += 1
+            line_start = pos
+            continue
+        else:
+            raise RuntimeError(f'Unexpected character {text[pos]!r} at line {line_num} col {pos - line_start + 1}')
+        add_line(line_num)
+        add_col(pos - line_start + 1)
+        pos = end
+    if budget is not None:
+        budget.check_tokens(len(kinds))
+    return buf
+
+
+# lexers disponibles (mismos tokens): el de expresiones regulares, el scanner
+# y el scanner que devuelve un TokenBuffer
+LEXERS = {'regex': lex, 'scan': scan, 'columnar': scan_columns}
@@ -0,0 +1,167 @@
+"""Presupuestos de recursos de una compilación: tamaño, tiempo y pasos.
+
+Un Budget acompaña a una compilación (p.ej. una petición a /compile) y acota
+lo que puede consumir: bytes del código, tokens, profundidad y nodos del AST,
+pasos de evaluación, bits de los enteros y tiempo total (deadline). Las
+etapas del pipeline lo consultan mientras trabajan y, si se agota, lanzan
+BudgetExceeded; compiler.pipeline lo convierte en un error estructurado en
+`validation` en lugar de dejar la petición ocupando el proceso.
+
+Los contadores que crecen de a uno (tokens, nodos, pasos) se comprueban en
+puntos de control: check_tokens(n) y compañía devuelven el valor del
+contador en el que hay que volver a llamarlas, como mucho CHECK_INTERVAL
+unidades más adelante. Así el costo en los bucles es una comparación de
+enteros. El reloj y la cancelación (cancel(), desde otro hilo) se consultan
+en esos mismos puntos de control.
+
+Todos los límites son opcionales: None o 0 significa sin límite.
+"""
+import math
+import sys
+import threading
+import time
+
+# dígitos de los enteros que Python convierte a texto (0: sin límite; la
+# función no existe antes de 3.11) y bits del entero más ancho que todavía
+# se puede serializar: es el valor por defecto de MAX_INT_BITS, así un
+# resultado que no se podría devolver en JSON agota el presupuesto
+MAX_STR_DIGITS = getattr(sys, 'get_int_max_str_digits', lambda: 0)()
+MAX_TEXT_INT_BITS = int(MAX_STR_DIGITS * math.log2(10)) - 1 if MAX_STR_DIGITS else 65536
+
+# unidades (tokens, nodos, pasos) entre dos puntos de control
+CHECK_INTERVAL = 4096
+# punto de control que nunca se alcanza (sin presupuesto)
+NEVER = sys.maxsize
+
+# límite -> clave de configuración de la aplicación (ver from_config)
+CONFIG_KEYS = {
+    'max_source_bytes': 'MAX_SOURCE_BYTES',
+    'max_tokens': 'MAX_TOKENS',
+    'max_depth': 'MAX_AST_DEPTH',
+    'max_nodes': 'MAX_AST_NODES',
+    'max_steps': 'MAX_EVAL_STEPS',
+    'max_int_bits': 'MAX_INT_BITS',
+    'deadline': 'COMPILE_DEADLINE',
+}
+
+_MESSAGES = {
+    'source_bytes': 'El código supera el tamaño máximo ({value} > {maximum} bytes)',
+    'tokens': 'El código supera el máximo de tokens ({value} > {maximum})',
+    'depth': 'El AST supera la profundidad máxima ({value} > {maximum})',
+    'nodes': 'El AST supera el máximo de nodos ({value} > {maximum})',
+    'steps': 'La evaluación supera el máximo de pasos ({value} > {maximum})',
+    'int_bits': 'Un entero supera el tamaño máximo ({value} > {maximum} bits)',
+    'deadline': 'La compilación superó el tiempo máximo ({value} s > {maximum} s)',
+    'cancelled': 'Compilación cancelada',
+}
+
+
+class BudgetExceeded(Exception):
+    """Se agotó un límite del presupuesto.
+
+    - limit: 'source_bytes', 'tokens', 'depth', 'nodes', 'steps', 'int_bits',
+      'deadline' o 'cancelled'
+    - value: lo consumido al detectarlo; maximum: el límite configurado
+    """
+    def __init__(self, limit, value=None, maximum=None):
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+        super().__init__(_MESSAGES[limit].format(value=value, maximum=maximum))
+
+    def to_dict(self):
+        return {'limit': self.limit, 'value': self.value, 'max': self.maximum}
+
+
+class Budget:
+    """Límites de una compilación y reloj desde su creación.
+
+    El deadline (segundos) se cuenta desde que se crea el Budget, así que
+    conviene crearlo al recibir la petición. Un Budget es de un solo uso.
+    """
+    def __init__(self, max_source_bytes=None, max_tokens=None, max_depth=None, max_nodes=None,
+                 max_steps=None, max_int_bits=None, deadline=None):
+        self.max_source_bytes = max_source_bytes or None
+        self.max_tokens = max_tokens or None
+        self.max_depth = max_depth or None
+        self.max_nodes = max_nodes or None
+        self.max_steps = max_steps or None
+        self.max_int_bits = max_int_bits or None
+        self.deadline = deadline or None
+        self.started = time.monotonic()
+        self.expires = self.started + deadline if deadline else None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Cancela la compilación: falla en su próximo punto de control."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def check_time(self):
+        """Lanza BudgetExceeded si se canceló o venció el deadline."""
+        if self._cancelled.is_set():
+            raise BudgetExceeded('cancelled')
+        if self.expires is not None and time.monotonic() > self.expires:
+            raise BudgetExceeded('deadline', round(self.elapsed(), 3), self.deadline)
+
+    def _checkpoint(self, limit, count, maximum):
+        self.check_time()
+        if maximum is None:
+            return count + CHECK_INTERVAL
+        if count > maximum:
+            raise BudgetExceeded(limit, count, maximum)
+        return min(count + CHECK_INTERVAL, maximum + 1)
+
+    def check_source_bytes(self, size):
+        if self.max_source_bytes is not None and size > self.max_source_bytes:
+            raise BudgetExceeded('source_bytes', size, self.max_source_bytes)
+        self.check_time()
+
+    def check_tokens(self, count):
+        """Punto de control de tokens; devuelve el siguiente."""
+        return self._checkpoint('tokens', count, self.max_tokens)
+
+    def check_nodes(self, count):
+        """Punto de control de nodos del AST; devuelve el siguiente."""
+        return self._checkpoint('nodes', count, self.max_nodes)
+
+    def check_steps(self, count):
+        """Punto de control de pasos de evaluación; devuelve el siguiente."""
+        return self._checkpoint('steps', count, self.max_steps)
+
+    def check_depth(self, depth):
+        if self.max_depth is not None and depth > self.max_depth:
+            raise BudgetExceeded('depth', depth, self.max_depth)
+
+    def check_int(self, value):
+        """Lanza BudgetExceeded si `value` es un entero más ancho que max_int_bits."""
+        if self.max_int_bits is not None and type(value) is int and value.bit_length() > self.max_int_bits:
+            raise BudgetExceeded('int_bits', value.bit_length(), self.max_int_bits)
+
+    def limits(self):
+        """Los límites configurados (None = sin límite)."""
+        return {name: getattr(self, name) for name in CONFIG_KEYS}
+
+
+def check_text(value):
+    """Lanza ValueError si `value` es un entero con más dígitos de los que
+    Python convierte a texto (no se podría devolver en JSON)."""
+    # con menos de 3 bits por dígito (log2(10) > 3) nunca se llega al límite
+    if MAX_STR_DIGITS and type(value) is int and value.bit_length() > 3 * MAX_STR_DIGITS:
+        try:
+            str(value)
+        except ValueError:
+            raise ValueError(f'El resultado tiene más de {MAX_STR_DIGITS} dígitos: no se puede convertir a texto') from None
+
+
+def from_config(config):
+    """Argumentos de Budget a partir de la configuración de la aplicación
+    (MAX_SOURCE_BYTES, MAX_TOKENS, ... ver CONFIG_KEYS); se pasan tal cual a
+    Budget(**limits) o a procesos de trabajo (compiler.batch)."""
+    return {name: config.get(key) for name, key in CONFIG_KEYS.items()}
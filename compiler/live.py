@@ -0,0 +1,166 @@
+"""Canal de compilación en vivo (Server-Sent Events + POST).
+
+Mientras el usuario escribe, la página abre un único stream SSE por canal
+(GET /live/<canal>/events) y envía cada versión del código con un POST
+(/live/<canal>/compile) que lleva un número de versión creciente. Cada
+etapa del pipeline (tokens, AST, semántico, render, resultado) se publica
+en el stream apenas está lista, etiquetada con su versión.
+
+Cuando llega una versión nueva, la compilación en curso de la anterior se
+cancela (su Budget falla en el próximo punto de control y el emisor de
+etapas deja de publicar) y los eventos de versiones viejas que aún no se
+enviaron se descartan. Un POST con una versión que ya fue superada se
+ignora sin compilar.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+from compiler import limits, pipeline
+
+# eventos pendientes por canal: si el cliente no los lee, se pierden los
+# más viejos
+MAX_QUEUED_EVENTS = 64
+# segundos sin eventos tras los que el stream envía un comentario para
+# mantener viva la conexión
+KEEPALIVE_SECONDS = 15
+
+
+def sse(event, data):
+    """Un evento en formato text/event-stream (`data` es texto JSON)."""
+    return f'event: {event}\ndata: {data}\n\n'
+
+
+class Channel:
+    """Canal de un cliente: versión más reciente, compilación en curso y
+    eventos pendientes de enviar.
+
+    Los eventos son tuplas (nombre, versión, datos). Sólo un stream lee el
+    canal a la vez: abrir otro (p.ej. al reconectar) termina el anterior.
+    """
+    def __init__(self, channel_id, max_queued=MAX_QUEUED_EVENTS):
+        self.id = channel_id
+        self.version = None
+        self.cancelled = 0
+        self._budget = None
+        self._events = deque(maxlen=max_queued)
+        self._subscriber = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def submit(self, version, budget):
+        """Registra `version` como la más reciente y cancela la anterior.
+
+        Devuelve False (sin cambiar nada) si `version` no es más nueva que
+        la última recibida.
+        """
+        with self._cond:
+            if self.version is not None and version <= self.version:
+                return False
+            self.version = version
+            if self._budget is not None:
+                self._budget.cancel()
+                self.cancelled += 1
+            self._budget = budget
+            # eventos de versiones superadas que el cliente ya no necesita
+            stale = [e for e in self._events if e[1] is not None and e[1] < version]
+            for e in stale:
+                self._events.remove(e)
+            return True
+
+    def is_current(self, version):
+        return self.version == version
+
+    def finish(self, budget):
+        """Marca como terminada la compilación con `budget`."""
+        with self._cond:
+            if self._budget is budget:
+                self._budget = None
+
+    def publish(self, event, version, data):
+        with self._cond:
+            self._events.append((event, version, data))
+            self._cond.notify_all()
+
+    def emitter(self, version):
+        """Función emit(stage, sections) para compile_source: publica cada
+        etapa de `version` o, si ya fue superada, cancela la compilación."""
+        def emit(stage, sections):
+            if not self.is_current(version):
+                raise limits.BudgetExceeded('cancelled')
+            self.publish('stage', version, dict(sections, stage=stage, version=version))
+        return emit
+
+    def subscribe(self, keepalive=KEEPALIVE_SECONDS):
+        """Generador de eventos (nombre, versión, datos) para un stream.
+
+        Produce None cada `keepalive` segundos sin eventos y termina cuando
+        se cierra el canal o se abre otro stream.
+        """
+        with self._cond:
+            self._subscriber += 1
+            me = self._subscriber
+            self._cond.notify_all()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._events or self._closed or self._subscriber != me, keepalive)
+                if self._closed or self._subscriber != me:
+                    return
+                item = self._events.popleft() if self._events else None
+            yield item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            if self._budget is not None:
+                self._budget.cancel()
+            self._cond.notify_all()
+
+
+class ChannelStore:
+    """Canales abiertos (LRU acotado por número de canales)."""
+    def __init__(self, max_channels=256):
+        self.max_channels = max_channels
+        self._channels = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, channel_id, create=False):
+        """El canal `channel_id` (creándolo si `create`), o None."""
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            if channel is None:
+                if not create:
+                    return None
+                channel = self._channels[channel_id] = Channel(channel_id)
+                while len(self._channels) > self.max_channels:
+                    self._channels.popitem(last=False)[1].close()
+            self._channels.move_to_end(channel_id)
+            return channel
+
+    def __len__(self):
+        with self._lock:
+            return len(self._channels)
+
+
+def compile_live(channel, version, code, options, budget):
+    """Compila la `version` de `code` en `channel` publicando cada etapa.
+
+    Al terminar publica 'done' con lo que queda de la respuesta (ok, error,
+    budget, validation, optimizer) y el status. Devuelve 'done', 'stale' (ya
+    había una versión más nueva: no se compiló) o 'superseded' (una versión
+    nueva la canceló a mitad de camino; no publica 'done').
+    `budget` es obligatorio: es lo que permite cancelar la compilación.
+    """
+    if not channel.submit(version, budget):
+        return 'stale'
+    start = time.perf_counter()
+    try:
+        payload, status = pipeline.compile_source(code, budget=budget, emit=channel.emitter(version), **options)
+    finally:
+        channel.finish(budget)
+    if budget.cancelled or not channel.is_current(version):
+        return 'superseded'
+    done = {k: v for k, v in payload.items() if k not in pipeline.SECTIONS or k == 'validation'}
+    done.update(status=status, version=version, seconds=time.perf_counter() - start)
+    channel.publish('done', version, done)
+    return 'done'
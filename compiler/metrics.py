@@ -0,0 +1,180 @@
+"""Métricas del compilador en formato de texto de Prometheus.
+
+Contadores e histogramas mínimos (sin dependencias) pensados para quedar
+siempre activos: registrar una observación es una búsqueda binaria en los
+límites de los buckets y un par de sumas bajo un lock.
+
+El pipeline (compiler.pipeline) registra en las métricas de este módulo la
+duración de cada etapa, el tamaño de la entrada y los errores por fase; app.py
+agrega la latencia por endpoint, la serialización y la caché. REGISTRY.render()
+produce el texto que sirve /metrics.
+
+Las métricas viven en memoria del proceso: lo que se compila en los procesos
+de compiler.batch no se refleja aquí.
+"""
+import threading
+from bisect import bisect_left
+
+# límites de los buckets de latencia (segundos) y de tamaño (bytes, tokens, nodos)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(4 ** i for i in range(2, 13))  # 16 .. 16M
+
+
+def _format_value(v):
+    if isinstance(v, float):
+        if v == float('inf'):
+            return '+Inf'
+        return repr(v)
+    return str(v)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Contador monótono, opcionalmente con etiquetas (una serie por valor)."""
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, v in items:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_format_value(v)}'
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos (como los de Prometheus)."""
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # etiquetas -> [conteo por bucket (no acumulado) ..., +Inf, suma]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0]
+            series[i] += 1
+            series[-1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), series):
+                cumulative += n
+                le = f'le="{_format_value(float(bound))}"'
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(series[-1])}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Callback:
+    """Métrica cuyo valor se lee al renderizar (p.ej. contadores de la caché).
+
+    `fn` devuelve un número o un dict {valores de etiquetas (tupla): número}.
+    """
+    def __init__(self, name, help, kind, fn, labelnames=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        value = self.fn()
+        if not isinstance(value, dict):
+            value = {(): value}
+        for labels, v in sorted(value.items()):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_format_value(v)}'
+
+
+class Registry:
+    """Conjunto de métricas que se exponen juntas."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Métrica duplicada: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, buckets, labelnames=()):
+        return self.register(Histogram(name, help, buckets, labelnames))
+
+    def callback(self, name, help, kind, fn, labelnames=()):
+        return self.register(Callback(name, help, kind, fn, labelnames))
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self):
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.append(f'# HELP {m.name} {m.help}')
+            lines.append(f'# TYPE {m.name} {m.kind}')
+            lines.extend(m.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'compiler_stage_seconds', 'Duración de cada etapa del pipeline de compilación',
+    LATENCY_BUCKETS, ('stage',))
+INPUT_BYTES = REGISTRY.histogram(
+    'compiler_input_bytes', 'Tamaño del código fuente compilado (bytes UTF-8)', SIZE_BUCKETS)
+INPUT_TOKENS = REGISTRY.histogram(
+    'compiler_input_tokens', 'Número de tokens del código compilado', SIZE_BUCKETS)
+AST_NODES = REGISTRY.histogram(
+    'compiler_ast_nodes', 'Número de nodos del AST de los programas parseados', SIZE_BUCKETS)
+ERRORS = REGISTRY.counter(
+    'compiler_errors_total', 'Compilaciones con error, por fase (lexical, syntactic, semantic, runtime, render, serialize)',
+    ('phase',))
+BUDGET_EXCEEDED = REGISTRY.counter(
+    'compiler_budget_exceeded_total', 'Compilaciones cortadas por un límite de recursos (ver compiler.limits); las canceladas no se cuentan',
+    ('limit',))
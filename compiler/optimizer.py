@@ -0,0 +1,188 @@
+"""Optimizador del AST: plegado de constantes, simplificación algebraica y
+propagación de constantes entre sentencias de un Program.
+
+Se ejecuta (opcionalmente) entre semantic.analyze y evaluator.evaluate. Nunca
+modifica el árbol de entrada: devuelve un Program nuevo que reutiliza los
+subárboles que no cambian.
+
+Las reglas sólo se aplican cuando no cambian el resultado observable:
+- no se pliega una división por cero (el error debe ocurrir al evaluar);
+- x + 0, x - 0 y x * 0 sólo si x es entera (con floats, -0.0 + 0 da 0.0);
+- x * 1 para cualquier x, y x / 1 sólo si x es float (con enteros / produce float).
+Para decidirlo se infiere el "tipo" de cada expresión: 'int', 'float' o None
+(desconocido).
+"""
+from compiler import ast
+
+_FOLD = {
+    'PLUS': lambda l, r: l + r,
+    'MINUS': lambda l, r: l - r,
+    'MUL': lambda l, r: l * r,
+    'DIV': lambda l, r: l / r,
+}
+
+
+def _kind_of(value):
+    return 'float' if isinstance(value, float) else 'int'
+
+
+def _is_literal(node, value):
+    # literal con el mismo valor *y* tipo (1 no es 1.0)
+    return isinstance(node, ast.Number) and type(node.value) is type(value) and node.value == value
+
+
+def count_nodes(node):
+    """Cuenta los nodos de un AST (recorrido con pila explícita)."""
+    count = 0
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        count += 1
+        if isinstance(n, ast.Program):
+            stack.extend(n.statements)
+        elif isinstance(n, ast.Assign):
+            stack.append(n.value)
+        elif isinstance(n, ast.BinOp):
+            stack.append(n.right)
+            stack.append(n.left)
+    return count
+
+
+class Optimizer:
+    """Reescribe un Program aplicando las reglas descritas en el módulo.
+
+    - consts: variables cuyo valor actual es una constante conocida
+    - kinds: tipo inferido del valor actual de cada variable asignada
+    - folded / simplified / propagated: contadores de reglas aplicadas
+    - budget: compiler.limits.Budget opcional; los enteros plegados no pueden
+      superar su ancho máximo (como al evaluar)
+    """
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.consts = {}
+        self.kinds = {}
+        self.folded = 0
+        self.simplified = 0
+        self.propagated = 0
+
+    def optimize_program(self, program):
+        statements = []
+        for s in program.statements:
+            if isinstance(s, ast.Assign):
+                value, kind = self.optimize_expr(s.value)
+                if isinstance(value, ast.Number):
+                    self.consts[s.name] = value.value
+                else:
+                    self.consts.pop(s.name, None)
+                self.kinds[s.name] = kind
+                statements.append(s if value is s.value else ast.Assign(s.name, value))
+            else:
+                value, _ = self.optimize_expr(s)
+                statements.append(value)
+        return ast.Program(statements)
+
+    def optimize_expr(self, node):
+        """Optimiza una expresión; devuelve (nuevo_nodo, tipo).
+
+        Recorrido post-orden con pila explícita: `done` guarda los resultados
+        (nodo, tipo) de los hijos ya procesados.
+        """
+        done = []
+        stack = [(node, False)]
+        while stack:
+            n, expanded = stack.pop()
+            if isinstance(n, ast.Number):
+                done.append((n, _kind_of(n.value)))
+            elif isinstance(n, ast.Var):
+                if n.name in self.consts:
+                    self.propagated += 1
+                    value = self.consts[n.name]
+                    done.append((ast.Number(value), _kind_of(value)))
+                else:
+                    # variable nunca asignada: el evaluador usa 0 (int)
+                    done.append((n, self.kinds.get(n.name, 'int')))
+            elif isinstance(n, ast.BinOp):
+                if not expanded:
+                    stack.append((n, True))
+                    stack.append((n.right, False))
+                    stack.append((n.left, False))
+                    continue
+                right, rkind = done.pop()
+                left, lkind = done.pop()
+                done.append(self.rewrite(n, left, lkind, right, rkind))
+            else:
+                raise RuntimeError('Unknown node')
+        return done.pop()
+
+    def rewrite(self, node, left, lkind, right, rkind):
+        op = node.op
+        # plegado de constantes
+        if isinstance(left, ast.Number) and isinstance(right, ast.Number):
+            if not (op == 'DIV' and right.value == 0):
+                self.folded += 1
+                value = _FOLD[op](left.value, right.value)
+                if self.budget is not None:
+                    self.budget.check_int(value)
+                return ast.Number(value), _kind_of(value)
+
+        if op == 'DIV':
+            kind = 'float'
+        elif lkind == 'int' and rkind == 'int':
+            kind = 'int'
+        elif lkind == 'float' or rkind == 'float':
+            kind = 'float'
+        else:
+            kind = None
+
+        # identidades algebraicas
+        if op == 'MUL':
+            if _is_literal(right, 1):
+                self.simplified += 1
+                return left, lkind
+            if _is_literal(left, 1):
+                self.simplified += 1
+                return right, rkind
+            if (_is_literal(right, 0) and lkind == 'int') or (_is_literal(left, 0) and rkind == 'int'):
+                self.simplified += 1
+                return ast.Number(0), 'int'
+        elif op == 'PLUS':
+            if _is_literal(right, 0) and lkind == 'int':
+                self.simplified += 1
+                return left, lkind
+            if _is_literal(left, 0) and rkind == 'int':
+                self.simplified += 1
+                return right, rkind
+        elif op == 'MINUS':
+            if _is_literal(right, 0) and lkind == 'int':
+                self.simplified += 1
+                return left, lkind
+        elif op == 'DIV':
+            if _is_literal(right, 1) and lkind == 'float':
+                self.simplified += 1
+                return left, lkind
+
+        if left is node.left and right is node.right:
+            return node, kind
+        return ast.BinOp(left, op, right), kind
+
+
+def optimize(program_node, budget=None):
+    """Optimiza un Program y devuelve un diccionario con:
+      - program: Program optimizado (el original no se modifica)
+      - nodes_before / nodes_after / removed: tamaño del árbol antes y después
+      - folded / simplified / propagated: reglas aplicadas
+    `budget` (compiler.limits.Budget) limita el ancho de los enteros plegados.
+    """
+    opt = Optimizer(budget)
+    program = opt.optimize_program(program_node)
+    before = count_nodes(program_node)
+    after = count_nodes(program)
+    return {
+        'program': program,
+        'nodes_before': before,
+        'nodes_after': after,
+        'removed': before - after,
+        'folded': opt.folded,
+        'simplified': opt.simplified,
+        'propagated': opt.propagated,
+    }
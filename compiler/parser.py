@@ -1,4 +1,7 @@
-from compiler import ast
+from operator import itemgetter
+
+from compiler import ast, lexer, render
+from compiler.limits import CHECK_INTERVAL, NEVER
 
 
 class ParseNode:
@@ -9,11 +12,13 @@ class ParseNode:
     Las funciones to_text y to_text_centered producen representaciones ASCII
     del árbol para mostrar en la interfaz.
     """
+    __slots__ = ('label', 'children')
+
     def __init__(self, label, children=None):
         self.label = label
         self.children = children or []
 
-    def to_text(self, indent=0):
+    def to_text(self, indent=0, budget=None):
         """Representación ASCII vertical con líneas y conectores.
 
         Produce algo tipo:
@@ -22,126 +27,151 @@ class ParseNode:
         │  └─ a
         └─ E
            ├─ ...
+
+        Recorrido en pre-orden con pila explícita (sin límite de profundidad).
+        Con `budget` (compiler.limits.Budget) se respeta su deadline. Cada
+        línea repite el prefijo de su nivel, así que el texto crece con el
+        cuadrado de la profundidad: con 100k niveles de paréntesis no entra
+        en memoria. Para árboles así de profundos conviene el render acotado
+        (compiler.render.Renderer con max_depth).
         """
-        # produce ASCII tree with connectors
-        def _lines(node, prefix='', is_last=True):
-            label = str(node.label)
+        lines = [str(self.label)]
+        # pila de (hijo, prefijo, es_último); los hijos se apilan en orden
+        # inverso para visitarlos de izquierda a derecha
+        stack = []
+        n = len(self.children)
+        for i in range(n - 1, -1, -1):
+            stack.append((self.children[i], '', i == n - 1))
+        while stack:
+            if budget is not None and len(lines) % CHECK_INTERVAL == 0:
+                budget.check_time()
+            node, prefix, is_last = stack.pop()
             connector = '└─ ' if is_last else '├─ '
-            lines = [prefix + connector + label]
+            if not isinstance(node, ParseNode):
+                # leaf value
+                lines.append(prefix + connector + str(node))
+                continue
+            lines.append(prefix + connector + str(node.label))
             # prepare new prefix for children
-            if is_last:
-                new_prefix = prefix + '   '
-            else:
-                new_prefix = prefix + '│  '
-            for i, c in enumerate(node.children):
-                last = (i == len(node.children) - 1)
-                if isinstance(c, ParseNode):
-                    lines.extend(_lines(c, new_prefix, last))
-                else:
-                    # leaf value
-                    conn = '└─ ' if last else '├─ '
-                    lines.append(new_prefix + conn + str(c))
-            return lines
-
-        # root has no prefix and should not show connector before root label
-        root_lines = [str(self.label)]
-        for i, c in enumerate(self.children):
-            last = (i == len(self.children) - 1)
-            if isinstance(c, ParseNode):
-                root_lines.extend(_lines(c, '', last))
-            else:
-                conn = '└─ ' if last else '├─ '
-                root_lines.append(conn + str(c))
-        return '\n'.join(root_lines)
+            new_prefix = prefix + ('   ' if is_last else '│  ')
+            n = len(node.children)
+            for i in range(n - 1, -1, -1):
+                stack.append((node.children[i], new_prefix, i == n - 1))
+        return '\n'.join(lines)
 
-    def to_text_centered(self):
+    def to_text_centered(self, budget=None):
         """Construye una representación ASCII con padres centrados sobre los hijos.
 
         Esta vista es útil para mostrar el árbol sintáctico más 'gráfico' en el UI.
-        El algoritmo recursivo calcula anchos y posiciones para alinear etiquetas.
+        Delega en compiler.render.Renderer, que la arma en tiempo lineal (y
+        permite acotar profundidad y ancho). Con `budget` se respeta su deadline.
         """
-        # returns a centered ASCII-art representation where parent is centered above children
-        def build(n):
-            label = str(n.label)
-            # leaf
-            if not n.children:
-                w = len(label)
-                mid = w // 2
-                return [label], w, mid
-            # build children
-            blocks = []
-            for c in n.children:
-                if isinstance(c, ParseNode):
-                    lines, w, mid = build(c)
-                else:
-                    txt = str(c)
-                    lines, w, mid = [txt], len(txt), len(txt)//2
-                blocks.append((lines, w, mid))
-            # spacing between blocks
-            gap = 3
-            total_w = sum(b[1] for b in blocks) + gap * (len(blocks) - 1)
-            # position children sequentially
-            child_positions = []
-            cur = 0
-            for lines, w, mid in blocks:
-                child_positions.append(cur + mid)
-                cur += w + gap
-            # center parent label
-            parent_mid = total_w // 2
-            # compute first line with parent centered
-            first = ' ' * max(0, parent_mid - (len(label) // 2)) + label
-            # ensure length at least total_w
-            if len(first) < total_w:
-                first = first + ' ' * (total_w - len(first))
-            # second line: vertical bar under parent
-            second = list(' ' * total_w)
-            second[parent_mid] = '|'
-            second = ''.join(second)
-            # third line: horizontal connectors from parent to each child position
-            third = list(' ' * total_w)
-            # draw horizontal line from parent_mid to each child pos
-            for pos in child_positions:
-                if pos == parent_mid:
-                    third[pos] = '+'
-                    continue
-                start = min(pos, parent_mid)
-                end = max(pos, parent_mid)
-                for i in range(start, end + 1):
-                    third[i] = '-' if third[i] == ' ' else third[i]
-                third[pos] = '+'
-            third = ''.join(third)
-            # now merge children lines
-            max_h = max(len(b[0]) for b in blocks)
-            child_lines = []
-            for i in range(max_h):
-                line = []
-                for idx, (lines, w, mid) in enumerate(blocks):
-                    if i < len(lines):
-                        chunk = lines[i]
-                    else:
-                        chunk = ' ' * w
-                    # pad chunk to width w
-                    if len(chunk) < w:
-                        chunk = chunk + ' ' * (w - len(chunk))
-                    line.append(chunk)
-                    if idx != len(blocks) - 1:
-                        line.append(' ' * gap)
-                child_lines.append(''.join(line))
-            # assemble all
-            out = [first.rstrip(), second.rstrip(), third.rstrip()]
-            out.extend(l.rstrip() for l in child_lines)
-            return out, max(total_w, len(first)), parent_mid
-
-        lines, _, _ = build(self)
-        return '\n'.join(lines)
+        return render.Renderer(budget=budget).to_text(self)
+
 
 class ParserError(Exception):
     pass
 
+# códigos de tipo de token que usa el parser (ver lexer.KINDS)
+_EOF = lexer.EOF
+_NUMBER = lexer.KIND_CODES['NUMBER']
+_ID = lexer.KIND_CODES['ID']
+_ASSIGN = lexer.KIND_CODES['ASSIGN']
+_LPAREN = lexer.KIND_CODES['LPAREN']
+_RPAREN = lexer.KIND_CODES['RPAREN']
+_SEMI = lexer.KIND_CODES['SEMI']
+_KINDS = lexer.KINDS
+# --- Tablas de operadores (parser de Pratt) ---
+#
+# Indexadas por código de token (lexer.KIND_CODES). Cada operador tiene un
+# poder de ligadura a la izquierda (LBP: cuánto atrae al operando que tiene a
+# su izquierda) y a la derecha (RBP); un operador pendiente se reduce antes de
+# leer otro cuando su RBP es mayor que el LBP del nuevo. Los prefijos se
+# apilan como código + PREFIX y sólo tienen RBP. El '(' pendiente tiene RBP 0
+# y nunca se reduce así; un token que no es operador tiene LBP 0, lo que
+# cierra la expresión (o el paréntesis).
+PREFIX = 0x100
+LBP = [0] * 0x100
+RBP = [0] * 0x200
+# símbolo del nodo del parse-tree y nombre de operador para el builder
+SYMBOL = [None] * 0x200
+OP_NAME = [None] * 0x200
+
+
+def register_infix(kind, precedence, symbol, right_assoc=False):
+    """Agrega (o redefine) el operador binario del token `kind` (p.ej. 'PLUS').
+
+    `precedence` >= 1 (mayor liga más fuerte). El AST se construye con
+    builder.binop(left, kind, right) y el parse-tree con E -> E símbolo E.
+    """
+    code = lexer.KIND_CODES[kind]
+    LBP[code] = 2 * precedence + (1 if right_assoc else 0)
+    RBP[code] = 2 * precedence + (0 if right_assoc else 1)
+    SYMBOL[code] = symbol
+    OP_NAME[code] = kind
+
+
+def register_prefix(kind, precedence, symbol):
+    """Agrega el operador prefijo del token `kind` (p.ej. un '-' unario).
+
+    Liga a su operando con `precedence` (como la de register_infix: un prefijo
+    de precedencia 3 toma `-a * b` como `(-a) * b`). El AST se construye con
+    builder.unary(kind, operand), que el builder tiene que proveer, y el
+    parse-tree con E -> símbolo E.
+    """
+    code = lexer.KIND_CODES[kind] | PREFIX
+    RBP[code] = 2 * precedence + 1
+    SYMBOL[code] = symbol
+    OP_NAME[code] = kind
+
+
+register_infix('PLUS', 1, '+')
+register_infix('MINUS', 1, '-')
+register_infix('MUL', 2, '*')
+register_infix('DIV', 2, '/')
+
+
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, build_tree=True, builder=None, budget=None):
+        # tokens: list of lexer.Token or a lexer.TokenBuffer. The parser reads
+        # the token kinds as byte codes (self.kinds, with an EOF code after
+        # the last token) and the values of NUMBER / ID tokens through
+        # self._number / self._name
         self.tokens = tokens
         self.pos = 0
+        if isinstance(tokens, lexer.TokenBuffer):
+            self.kinds = tokens.kinds.tobytes() + bytes((_EOF,))
+            args, consts, names = tokens.args, tokens.consts, tokens.symbols.names
+            self._number = lambda i: consts[args[i]]
+            self._name = lambda i: names[args[i]]
+        else:
+            self.kinds = bytes(map(lexer.KIND_CODES.__getitem__, map(itemgetter(0), tokens))) + bytes((_EOF,))
+            self._number = self._name = lambda i: tokens[i][1]
+        # build_tree=False: only build the AST (parse-tree nodes are None)
+        self.build_tree = build_tree
+        # builder: creates the AST nodes (number/var/binop/assign/program);
+        # defaults to the object AST of compiler.ast
+        self.builder = builder if builder is not None else ast.ASTBuilder
+        # budget (compiler.limits.Budget): maximum AST nodes and depth.
+        # `nodes` counts the AST nodes built so far; `depth` is the depth of
+        # the last expression parsed
+        self.budget = budget
+        self.nodes = 0
+        self.depth = 0
+        self._check_nodes_at = budget.check_nodes(0) if budget is not None else NEVER
+        self._max_depth = (budget.max_depth or NEVER) if budget is not None else NEVER
+        # stacks of _parse_precedence, reused by every expression: pending
+        # operator codes (LPAREN for an open '('), operand ASTs, operand
+        # parse nodes and operand AST depths
+        self._ops = []
+        self._asts = []
+        self._pts = []
+        self._depths = []
+
+    def _count_nodes(self):
+        self.nodes += 1
+        if self.nodes >= self._check_nodes_at:
+            self._check_nodes_at = self.budget.check_nodes(self.nodes)
 
     def peek(self):
         if self.pos < len(self.tokens):
@@ -157,33 +187,56 @@ class Parser:
         self.pos += 1
         return tok
 
+    def _expect(self, code):
+        # like eat(KINDS[code]) without building the token
+        kind = self.kinds[self.pos]
+        if kind == _EOF:
+            return
+        if kind != code:
+            tok = self.tokens[self.pos]
+            raise ParserError(f'Expected {_KINDS[code]} but got {tok.type} at {tok.line}:{tok.col}')
+        self.pos += 1
+
     def parse(self):
         # build both AST program and parse-tree S
         stmts = []
-        s_root = ParseNode('S')
-        while self.peek() is not None:
-            if self.peek().type == 'ID' and self.pos+1 < len(self.tokens) and self.tokens[self.pos+1].type == 'ASSIGN':
-                a_ast, a_pt = self.parse_assign()
-                stmts.append(a_ast)
-                s_root.children.append(a_pt)
-                if self.peek() and self.peek().type == 'SEMI':
-                    self.eat('SEMI')
-            else:
-                e_ast, e_pt = self.parse_expr()
-                stmts.append(e_ast)
-                s_root.children.append(e_pt)
-                if self.peek() and self.peek().type == 'SEMI':
-                    self.eat('SEMI')
-        return ast.Program(stmts), s_root
+        s_root = ParseNode('S') if self.build_tree else None
+        kinds = self.kinds
+        while kinds[self.pos] != _EOF:
+            s_ast, s_pt = self.parse_statement()
+            stmts.append(s_ast)
+            if s_root is not None:
+                s_root.children.append(s_pt)
+        self._count_nodes()
+        if self.budget is not None:
+            self.budget.check_nodes(self.nodes)
+        return self.builder.program(stmts), s_root
+
+    def parse_statement(self):
+        # S -> id = E | E, optionally followed by ';'
+        kinds = self.kinds
+        if kinds[self.pos] == _ID and kinds[self.pos + 1] == _ASSIGN:
+            s_ast, s_pt = self.parse_assign()
+        else:
+            s_ast, s_pt = self.parse_expr()
+        if kinds[self.pos] == _SEMI:
+            self.pos += 1
+        return s_ast, s_pt
 
     def parse_assign(self):
         # S -> id = E
-        id_tok = self.eat('ID')
-        name = id_tok.value
-        self.eat('ASSIGN')
+        name = self._name(self.pos) if self.kinds[self.pos] == _ID else None
+        self._expect(_ID)
+        self._expect(_ASSIGN)
         val_ast, val_pt = self.parse_expr()
+        self.depth += 1
+        if self.depth > self._max_depth:
+            self.budget.check_depth(self.depth)
+        self._count_nodes()
         # AST
-        assign_ast = ast.Assign(name, val_ast)
+        assign_ast = self.builder.assign(name, val_ast)
+        if not self.build_tree:
+            return assign_ast, None
         # Parse-tree node
         id_node = ParseNode('id', [name])
         eq_node = ParseNode('=', ['='])
@@ -194,83 +247,133 @@ class Parser:
         # parse expression using precedence climbing for binary operators
         return self._parse_precedence()
 
-    def parse_term(self):
-        return self.parse_factor()
-
-    def _parse_binary_tail(self, left_ast, left_pt, op_types, node_label, op_symbol_map, right_parse):
-        tok = self.peek()
-        while tok and tok.type in op_types:
-            op_tok = self.eat()
-            op = op_tok.type
-            # parse right operand using provided callable
-            right_ast, right_pt = right_parse()
-            left_ast = ast.BinOp(left_ast, op, right_ast)
-            op_node = ParseNode(op_symbol_map.get(op, op))
-            left_pt = ParseNode(node_label, [left_pt, op_node, right_pt])
-            tok = self.peek()
-        return left_ast, left_pt
-
     def _parse_precedence(self):
-        """Precedence-climbing parser for binary expressions.
+        """Table-driven Pratt parser for expressions.
 
-        Returns (ast, parse_node) for an expression E.
-        Supports PLUS/MINUS (low precedence) and MUL/DIV (high precedence).
+        Returns (ast, parse_node) for an expression E; the depth of the
+        resulting AST is left in self.depth. Operators, binding powers and
+        parse-tree symbols come from the module tables (LBP, RBP, SYMBOL,
+        OP_NAME; see register_infix / register_prefix), so adding an operator
+        does not touch this loop. The core is iterative: pending operators,
+        operands and operand depths live on stacks kept in the parser and
+        reused by every expression, so neither nested parentheses nor long
+        operator chains are limited by the Python recursion limit and no
+        closures or tables are created per call. Produces the same AST and
+        parse-tree shapes as precedence climbing.
         """
-        # define precedences
-        prec = {'PLUS': 1, 'MINUS': 1, 'MUL': 2, 'DIV': 2}
-
-        def parse_atom():
-            return self.parse_factor()
-
-        def parse_rhs(min_prec, left_ast, left_pt):
-            tok = self.peek()
-            while tok and tok.type in prec and prec[tok.type] >= min_prec:
-                op_tok = self.eat()
-                op = op_tok.type
-                # parse next atom
-                right_ast, right_pt = parse_atom()
-                # handle operators of higher precedence that follow
-                next_tok = self.peek()
-                while next_tok and next_tok.type in prec and prec[next_tok.type] > prec[op]:
-                    right_ast, right_pt = parse_rhs(prec[next_tok.type], right_ast, right_pt)
-                    next_tok = self.peek()
-                # build new left
-                left_ast = ast.BinOp(left_ast, op, right_ast)
-                symbol = {'PLUS': '+', 'MINUS': '-', 'MUL': '*', 'DIV': '/'}[op]
-                left_pt = ParseNode('E', [left_pt, ParseNode(symbol), right_pt])
-                tok = self.peek()
-            return left_ast, left_pt
-
-        # initial left is an atom
-        left_ast, left_pt = parse_atom()
-        return parse_rhs(1, left_ast, left_pt)
-
-    def parse_factor(self):
-        tok = self.peek()
-        if tok.type == 'NUMBER':
-            self.eat('NUMBER')
-            ast_node = ast.Number(tok.value)
-            pt = ParseNode('F', [ParseNode('num', [tok.value])])
-            return ast_node, pt
-        elif tok.type == 'ID':
-            self.eat('ID')
-            ast_node = ast.Var(tok.value)
-            pt = ParseNode('F', [ParseNode('id', [tok.value])])
-            return ast_node, pt
-        elif tok.type == 'LPAREN':
-            self.eat('LPAREN')
-            ast_node, pt = self.parse_expr()
-            self.eat('RPAREN')
-            # represent (E) as just E in parse-tree but keep grouping
-            return ast_node, ParseNode('F', [ParseNode('( )', ['(']), pt, ParseNode('( )', [')'])])
-        else:
-            raise ParserError(f'Unexpected token {tok.type} at {tok.line}:{tok.col}')
+        kinds = self.kinds
+        lbp_of, rbp_of, symbol_of, op_name = LBP, RBP, SYMBOL, OP_NAME
+        build = self.build_tree
+        builder = self.builder
+        binop, number, var = builder.binop, builder.number, builder.var
+        number_at, name_at = self._number, self._name
+        max_depth = self._max_depth
+        # node counter, kept in locals and stored back before anything that
+        # can raise or read it
+        nodes = self.nodes
+        check_at = self._check_nodes_at
+        ops = self._ops
+        asts = self._asts
+        pts = self._pts
+        depths = self._depths
+        del ops[:], asts[:], pts[:], depths[:]
+        pos = self.pos
+
+        while True:
+            # operand position: '(' and prefix operators, then an atom
+            kind = kinds[pos]
+            while kind == _LPAREN or rbp_of[kind | PREFIX]:
+                ops.append(kind if kind == _LPAREN else kind | PREFIX)
+                pos += 1
+                kind = kinds[pos]
+            # pending '(' nest the parse tree (and its text renders) even
+            # when the AST stays shallow, so they count against the depth
+            # limit too
+            if len(ops) > max_depth:
+                self.nodes = nodes
+                self.pos = pos
+                self.budget.check_depth(len(ops))
+            nodes += 1
+            if nodes >= check_at:
+                self.nodes = nodes
+                check_at = self._check_nodes_at = self.budget.check_nodes(nodes)
+            if kind == _NUMBER:
+                value = number_at(pos)
+                asts.append(number(value))
+                pts.append(ParseNode('F', [ParseNode('num', [value])]) if build else None)
+            elif kind == _ID:
+                value = name_at(pos)
+                asts.append(var(value))
+                pts.append(ParseNode('F', [ParseNode('id', [value])]) if build else None)
+            else:
+                self.nodes = nodes
+                self.pos = pos
+                self._unexpected()
+            pos += 1
+            depths.append(1)
+
+            # operator position: reduce the pending operators that bind
+            # tighter than the next token (all of them up to the innermost
+            # '(' if it is not an operator)
+            while True:
+                kind = kinds[pos]
+                lbp = lbp_of[kind]
+                while ops and rbp_of[ops[-1]] > lbp:
+                    op = ops.pop()
+                    operand = asts.pop()
+                    depth = depths.pop()
+                    if op & PREFIX:
+                        depth += 1
+                        right_pt = pts.pop()
+                        ast_node = builder.unary(op_name[op], operand)
+                        pt = ParseNode('E', [ParseNode(symbol_of[op]), right_pt]) if build else None
+                    else:
+                        left_depth = depths.pop()
+                        depth = (left_depth if left_depth > depth else depth) + 1
+                        right_pt = pts.pop()
+                        left_pt = pts.pop()
+                        ast_node = binop(asts.pop(), op_name[op], operand)
+                        pt = ParseNode('E', [left_pt, ParseNode(symbol_of[op]), right_pt]) if build else None
+                    if depth > max_depth:
+                        self.nodes = nodes
+                        self.budget.check_depth(depth)
+                    nodes += 1
+                    if nodes >= check_at:
+                        self.nodes = nodes
+                        check_at = self._check_nodes_at = self.budget.check_nodes(nodes)
+                    asts.append(ast_node)
+                    pts.append(pt)
+                    depths.append(depth)
+                if lbp:
+                    ops.append(kind)
+                    pos += 1
+                    break
+                if not ops:
+                    # the expression ends here
+                    self.pos = pos
+                    self.nodes = nodes
+                    self.depth = depths.pop()
+                    return asts.pop(), pts.pop()
+                # the innermost '(' closes here
+                self.pos = pos
+                self._expect(_RPAREN)
+                pos = self.pos
+                ops.pop()
+                if build:
+                    # represent (E) as just E in parse-tree but keep grouping
+                    pts.append(ParseNode('F', [ParseNode('( )', ['(']), pts.pop(), ParseNode('( )', [')'])]))
 
+    def _unexpected(self):
+        # error for a token that cannot start an operand
+        if self.kinds[self.pos] == _EOF:
+            raise ParserError('Unexpected end of input')
+        tok = self.tokens[self.pos]
+        raise ParserError(f'Unexpected token {tok.type} at {tok.line}:{tok.col}')
 
 
 # convenience
 
-def parse(tokens):
-    p = Parser(tokens)
+def parse(tokens, build_tree=True, builder=None, budget=None):
+    p = Parser(tokens, build_tree, builder, budget)
     program, parse_root = p.parse()
     return program, parse_root
@@ -0,0 +1,532 @@
+"""Pipeline de compilación: lexer -> parser -> semántico -> optimizador -> evaluador.
+
+compile_source() es el núcleo de /compile: recibe el código y las opciones y
+devuelve el payload JSON de la respuesta. No depende de Flask, así puede
+ejecutarse igual en el servidor, en procesos de trabajo (compiler.batch) o
+desde otros scripts.
+"""
+import time
+import traceback
+
+from compiler import bytecode, evaluator, flatast, hashcons, lexer, limits, metrics, optimizer, parser, render, semantic
+
+# Secciones que puede incluir la respuesta de /compile. El cliente puede pedir
+# un subconjunto con `sections`; el pipeline omite el trabajo que no se usa.
+SECTIONS = ('tokens', 'lex', 'ast', 'parse_text', 'parse_text_centered', 'parse_layout', 'result', 'semantic',
+            'validation')
+# secciones que se envían si el cliente no pide ninguna (parse_layout, la
+# disposición del parse-tree como datos, sólo a pedido)
+DEFAULT_SECTIONS = tuple(sec for sec in SECTIONS if sec != 'parse_layout')
+# límites de elisión del render centrado (ver compiler.render)
+RENDER_OPTIONS = ('max_depth', 'max_chain', 'max_width')
+# secciones que requieren parsear / construir el parse-tree / analizar
+_NEEDS_PARSE = {'ast', 'parse_text', 'parse_text_centered', 'parse_layout', 'result', 'semantic', 'validation'}
+_NEEDS_TREE = {'parse_text', 'parse_text_centered', 'parse_layout'}
+_NEEDS_SEMANTIC = {'result', 'semantic', 'validation'}
+_RENDER_SECTIONS = ('parse_text', 'parse_text_centered', 'parse_layout')
+# tokens que producen exactamente un nodo del AST (Number, Var/Assign, BinOp)
+_NODE_TOKENS = frozenset(('NUMBER', 'ID', 'PLUS', 'MINUS', 'MUL', 'DIV'))
+_NODE_KIND_CODES = tuple(lexer.KIND_CODES[k] for k in sorted(_NODE_TOKENS))
+
+
+def _lap(stage, start, budget=None):
+    # registra la duración de una etapa y devuelve el instante actual; entre
+    # etapa y etapa se comprueba el deadline del presupuesto
+    now = time.perf_counter()
+    metrics.STAGE_SECONDS.observe(now - start, stage)
+    if budget is not None:
+        budget.check_time()
+    return now
+
+
+def _count_exceeded(phase, e):
+    # una compilación cancelada (p.ej. una versión en vivo superada por otra
+    # al seguir escribiendo) no es un error: la cuenta quien la canceló
+    if e.limit != 'cancelled':
+        metrics.ERRORS.inc(phase)
+        metrics.BUDGET_EXCEEDED.inc(e.limit)
+
+
+def _count_nodes(ast_node, tokens):
+    """Nodos del AST sin recorrerlo: en un programa bien formado cada número,
+    identificador y operador binario es un nodo, más el Program."""
+    if isinstance(ast_node, flatast.FlatProgram):
+        return len(ast_node) + 1
+    if isinstance(tokens, lexer.TokenBuffer):
+        return sum(tokens.kinds.count(k) for k in _NODE_KIND_CODES) + 1
+    return sum(1 for t in tokens if t.type in _NODE_TOKENS) + 1
+
+
+def _ast_dict(ast_node, sharing):
+    # sección 'ast': el AST serializado (None si el parseo falló)
+    if ast_node is None:
+        return None
+    return hashcons.to_dict(ast_node) if sharing else ast_node.to_dict()
+
+
+def _emit(emit, stage, payload, sections):
+    # entrega a `emit` las secciones ya calculadas de una etapa
+    if emit is not None:
+        ready = {sec: payload[sec] for sec in sections if sec in payload}
+        if ready:
+            emit(stage, ready)
+
+
+def _count_rendered(counters, section, text):
+    # bytes de un texto producido, para los contadores de compile_source
+    if counters is not None and text is not None:
+        counters['rendered_bytes_' + section] = len(text.encode('utf-8'))
+
+
+def read_options(data):
+    """Lee y valida las opciones de compilación de un cuerpo JSON.
+
+    Devuelve un dict con backend, tokenizer, optimize, flat, share, sections (tupla
+    ordenada, sin duplicados) y render_options (de `render`) listo para pasar
+    a compile_source(**options). Lanza ValueError con un mensaje para el
+    cliente si alguna opción es inválida, también si no es del tipo esperado
+    (p.ej. `sections` que no es un string ni una lista de strings, o `render`
+    que no es un objeto).
+    """
+    # backend de evaluación: 'tree' (por defecto) o 'vm' (bytecode)
+    backend = data.get('backend', 'tree')
+    if backend not in evaluator.BACKENDS:
+        raise ValueError(f'Backend desconocido: {backend}')
+    # lexer: 'regex' (lexer.lex, por defecto) o 'scan' (lexer.scan); misma salida
+    tokenizer = data.get('tokenizer', 'regex')
+    if not isinstance(tokenizer, str) or tokenizer not in lexer.LEXERS:
+        raise ValueError(f'Tokenizer desconocido: {tokenizer}')
+    # secciones de la respuesta (por defecto todas): lista o 'a,b,c'
+    sections = data.get('sections')
+    if sections is None:
+        sections = DEFAULT_SECTIONS
+    if isinstance(sections, str):
+        sections = sections.split(',') if sections else DEFAULT_SECTIONS
+    if not isinstance(sections, (list, tuple)) or not all(isinstance(sec, str) for sec in sections):
+        raise ValueError('`sections` debe ser un string o una lista de strings')
+    sections = sections or DEFAULT_SECTIONS
+    unknown = [sec for sec in sections if sec not in SECTIONS]
+    if unknown:
+        raise ValueError(f'Secciones desconocidas: {", ".join(map(str, unknown))}')
+    # elisión del render centrado: {max_depth, max_chain, max_width}
+    render_data = data.get('render')
+    if render_data is None:
+        render_data = {}
+    if not isinstance(render_data, dict) or set(render_data) - set(RENDER_OPTIONS):
+        raise ValueError(f'`render` admite sólo: {", ".join(RENDER_OPTIONS)}')
+    render_options = {}
+    for name in RENDER_OPTIONS:
+        value = render_data.get(name)
+        if value is not None and (type(value) is not int or value < 0):
+            raise ValueError(f'render.{name} debe ser un entero >= 0')
+        render_options[name] = value or None
+    flat = bool(data.get('flat', False))
+    share = bool(data.get('share', False))
+    if flat and share:
+        raise ValueError('`flat` y `share` no se pueden combinar')
+    return {
+        'backend': backend,
+        'tokenizer': tokenizer,
+        # optimizar el AST (plegado de constantes, etc.) antes de evaluar
+        'optimize': bool(data.get('optimize', False)),
+        # AST plano (compiler.flatast): menos memoria en programas muy grandes
+        'flat': flat,
+        # AST compartido (compiler.hashcons): subexpresiones repetidas una vez
+        'share': share,
+        'sections': tuple(sorted(set(sections))),
+        'render_options': render_options,
+    }
+
+
+def compile_source(code, backend='tree', optimize=False, front=None, sections=DEFAULT_SECTIONS, flat=False, budget=None,
+                   tokenizer='regex', render_options=None, render_cache=None, reactive=None, store=None,
+                   counters=None, share=False, emit=None):
+    """Ejecuta el pipeline completo y devuelve (payload, status).
+
+    `front` permite pasar (tokens, program, parse_root) ya calculados (modo
+    incremental); en ese caso se omiten el lexeo y el parseo.
+    `sections` limita las secciones de la respuesta: las etapas que no aportan
+    a ninguna sección pedida no se ejecutan (p.ej. sin parse_text* el parser
+    no construye el parse-tree).
+    `flat` construye el AST como un FlatProgram (arrays tipados, ver
+    compiler.flatast); el análisis, la evaluación y la serialización
+    trabajan directamente sobre él.
+    `share` construye el AST con compiler.hashcons.HashConsBuilder: un nodo
+    por subexpresión distinta, análisis y serialización que recorren una vez
+    cada subárbol compartido y, con el backend 'tree', evaluación que
+    reutiliza el valor de cada uno hasta que cambian las variables que lee.
+    La respuesta es la misma; no se aplica a los documentos (con `reactive`).
+    `flat` y `share` no se pueden combinar (ValueError).
+    `render_options` ({max_depth, max_chain, max_width}) acota el render
+    centrado y parse_layout; `render_cache` es un dict para reutilizar la
+    medición de los subárboles entre compilaciones (ver compiler.render).
+    `reactive` (compiler.depgraph.ReactiveEvaluator) evalúa con el backend
+    'tree' reutilizando los resultados de su evaluación anterior: sólo se
+    re-evalúan las sentencias afectadas por los cambios (la respuesta incluye
+    `reactive` con cuántas se evaluaron y cuántas se reutilizaron).
+    `store` (compiler.artifacts.ArtifactStore) guarda el front-end (tokens,
+    AST, parse-tree y análisis semántico) de cada código compilado y, si ya
+    estaba guardado, lo carga en lugar de lexear, parsear y analizar.
+    `tokenizer` elige el lexer: 'regex' (lexer.lex), 'scan' (lexer.scan, el
+    scanner escrito a mano; produce los mismos tokens más rápido) o
+    'columnar' (lexer.scan_columns: los mismos tokens en un TokenBuffer).
+    `counters` (un dict, p.ej. Profile.counters de compiler.profiling)
+    recibe cuánto trabajo hizo cada etapa: source_bytes, tokens, ast_nodes,
+    eval_steps (o reactive_evaluated) y rendered_bytes_<sección> de cada
+    texto del parse-tree; con `share`, también unique_nodes y memo_hits.
+    `emit(stage, sections)` recibe las secciones de la respuesta apenas
+    están listas, en este orden: 'lex' (tokens, lex), 'ast', 'semantic',
+    'render' (parse_text*, parse_layout) y 'result'; sólo se llama para las
+    etapas que producen alguna sección pedida. Para cancelar la compilación
+    puede lanzar limits.BudgetExceeded('cancelled').
+    `budget` (compiler.limits.Budget) acota tamaño, tokens, nodos,
+    profundidad, pasos, enteros y tiempo; si se agota, la respuesta es un
+    error (status 400) con el límite en `budget` y en la fase de `validation`
+    donde ocurrió.
+
+    Resumen del flujo:
+    1. LEX: tokenizar con lexer.lex (o lexer.scan)
+    2. PARSE: construir AST y parse-tree usando parser.parse
+    3. SEMANTIC: análisis semántico simple (uso antes de asignar)
+    3b. OPTIMIZE (opcional): plegado/propagación de constantes sobre el AST
+    4. EVALUATE: si no hay errores semánticos, evaluar el AST
+    5. Construir respuesta JSON con tokens, representación legible (lex),
+       AST serializada, texto del parse-tree y resultados/validaciones.
+    """
+    if flat and share:
+        raise ValueError('`flat` y `share` no se pueden combinar')
+    want = set(sections)
+    # fase en curso, para clasificar los errores inesperados en las métricas
+    phase = 'lexical'
+    validation = {}
+    t = time.perf_counter()
+    try:
+        if isinstance(code, str):
+            size = len(code.encode('utf-8'))
+            metrics.INPUT_BYTES.observe(size)
+            if counters is not None:
+                counters['source_bytes'] = size
+            if budget is not None:
+                budget.check_source_bytes(size)
+        # front-end ya compilado en el almacén de artefactos
+        artifact = None
+        if store is not None and not front and isinstance(code, str) and want & _NEEDS_PARSE:
+            artifact = store.load(code, flat=flat, tree=bool(want & _NEEDS_TREE))
+            if artifact is not None:
+                front = (artifact.tokens, artifact.program, artifact.parse_root)
+                t = _lap('artifact_load', t, budget)
+        # LEXICAL: convertir texto a tokens
+        if front:
+            tokens = front[0]
+            if budget is not None:
+                budget.check_tokens(len(tokens))
+        else:
+            tokens = lexer.LEXERS[tokenizer](code, budget=budget)
+            t = _lap('lex', t, budget)
+        metrics.INPUT_TOKENS.observe(len(tokens))
+        if counters is not None:
+            counters['tokens'] = len(tokens)
+        phase = 'syntactic'
+        validation['lexical'] = {'ok': True, 'message': f'{len(tokens)} token(s) generados' if tokens else '0 tokens'}
+        payload = {'ok': True}
+        if 'tokens' in want:
+            payload['tokens'] = [tok._asdict() for tok in tokens]
+        if 'lex' in want:
+            payload['lex'] = [f"[{lbl}: {val}]" for (lbl, val) in (token_label(tok) for tok in tokens)]
+        if 'tokens' in want or 'lex' in want:
+            t = _lap('tokens', t, budget)
+            _emit(emit, 'lex', payload, ('tokens', 'lex'))
+
+        ast_node = None
+        parse_root = None
+        semantic_res = None
+        opt_report = None
+        # HashConsBuilder del AST compartido (con `share`)
+        sharing = None
+        if want & _NEEDS_PARSE:
+            # SYNTACTIC: parsear tokens -> AST + parse-tree
+            try:
+                builder = flatast.FlatBuilder() if flat else hashcons.HashConsBuilder() if share else None
+                parsed = front[1:] if front else parser.parse(tokens, bool(want & _NEEDS_TREE), builder, budget)
+                # parser.parse devuelve (program, parse_root)
+                if isinstance(parsed, tuple):
+                    ast_node, parse_root = parsed
+                else:
+                    ast_node = parsed
+                    parse_root = None
+                validation['syntactic'] = {'ok': True, 'message': 'Parseo correcto'}
+                if share and not front:
+                    sharing = builder
+                elif share and artifact is not None:
+                    ast_node, sharing = hashcons.share(ast_node)
+                if sharing and counters is not None:
+                    counters['unique_nodes'] = sharing.unique()
+                nodes = _count_nodes(ast_node, tokens)
+                metrics.AST_NODES.observe(nodes)
+                if counters is not None:
+                    counters['ast_nodes'] = nodes
+                if front and budget is not None:
+                    budget.check_nodes(nodes)
+            except limits.BudgetExceeded:
+                raise
+            except Exception as pe:
+                # Capturar error de parseo y continuar para devolver información útil
+                ast_node = None
+                parse_root = None
+                validation['syntactic'] = {'ok': False, 'message': str(pe)}
+                metrics.ERRORS.inc('syntactic')
+            if not front:
+                t = _lap('parse', t, budget)
+        if 'ast' in want and not optimize:
+            # sin optimizar, la AST de la respuesta es la del parser
+            payload['ast'] = _ast_dict(ast_node, sharing)
+            t = _lap('to_dict', t, budget)
+            _emit(emit, 'ast', payload, ('ast',))
+        phase = 'semantic'
+
+        if want & _NEEDS_SEMANTIC:
+            # SEMANTIC: sólo si el parse fue correcto
+            if artifact is not None:
+                semantic_res = artifact.semantic
+                validation['semantic'] = {'ok': semantic_res['ok'], 'message': semantic_res['message']}
+                if semantic_res['errors']:
+                    metrics.ERRORS.inc('semantic')
+            elif validation.get('syntactic', {}).get('ok'):
+                semantic_res = hashcons.analyze(ast_node) if sharing else semantic.analyze(ast_node)
+                validation['semantic'] = {'ok': semantic_res.get('ok', False), 'message': semantic_res.get('message', '')}
+                if semantic_res['errors']:
+                    metrics.ERRORS.inc('semantic')
+            else:
+                semantic_res = {'symbols': {}, 'errors': ['Parse error, análisis semántico omitido'], 'ok': False, 'message': 'Omitido'}
+                validation['semantic'] = {'ok': False, 'message': 'Omitido por error sintáctico'}
+            t = _lap('semantic', t, budget)
+            if 'semantic' in want:
+                _emit(emit, 'semantic', {'semantic': semantic_res}, ('semantic',))
+
+        if store is not None and artifact is None and not front and validation.get('syntactic', {}).get('ok'):
+            # guardar el front-end (antes de optimizar) para la próxima vez
+            store.save(code, tokens, ast_node, parse_root, semantic_res or semantic.analyze(ast_node))
+            t = _lap('artifact_save', t, budget)
+
+        if want & _NEEDS_SEMANTIC:
+            # OPTIMIZE: sólo sobre programas semánticamente correctos; la AST
+            # devuelta al cliente pasa a ser la optimizada
+            if optimize and not semantic_res.get('errors'):
+                if isinstance(ast_node, flatast.FlatProgram):
+                    ast_node = ast_node.to_program()
+                opt_res = optimizer.optimize(ast_node, budget)
+                ast_node = opt_res.pop('program')
+                if sharing:
+                    ast_node, sharing = hashcons.share(ast_node)
+                opt_report = opt_res
+                t = _lap('optimize', t, budget)
+
+        phase = 'render'
+        if 'ast' in want and optimize:
+            payload['ast'] = _ast_dict(ast_node, sharing)
+            t = _lap('to_dict', t, budget)
+            _emit(emit, 'ast', payload, ('ast',))
+
+        # Intentar producir ambas formas de texto del parse-tree (vertical y centrado)
+        if 'parse_text' in want:
+            parse_text = None
+            try:
+                parse_text = parse_root.to_text(0, budget) if parse_root and hasattr(parse_root, 'to_text') else None
+            except limits.BudgetExceeded:
+                raise
+            except Exception:
+                parse_text = None
+            payload['parse_text'] = parse_text
+            _count_rendered(counters, 'parse_text', parse_text)
+            t = _lap('parse_text', t, budget)
+        if want & {'parse_text_centered', 'parse_layout'}:
+            # ambas vistas comparten la medición de los subárboles
+            renderer = render.Renderer(cache=render_cache, budget=budget, **(render_options or {}))
+        if 'parse_text_centered' in want:
+            parse_text_centered = None
+            try:
+                parse_text_centered = renderer.to_text(parse_root) if parse_root is not None else None
+            except limits.BudgetExceeded:
+                raise
+            except Exception:
+                parse_text_centered = None
+            payload['parse_text_centered'] = parse_text_centered
+            _count_rendered(counters, 'parse_text_centered', parse_text_centered)
+            t = _lap('parse_text_centered', t, budget)
+        if 'parse_layout' in want:
+            payload['parse_layout'] = renderer.layout(parse_root) if parse_root is not None else None
+            t = _lap('parse_layout', t, budget)
+        _emit(emit, 'render', payload, _RENDER_SECTIONS)
+
+        if 'result' in want:
+            # EVALUATION: si hay errores semánticos no evaluamos
+            if semantic_res.get('errors'):
+                payload['result'] = None
+            else:
+                phase = 'runtime'
+                if reactive is not None and backend == 'tree' and not isinstance(ast_node, flatast.FlatProgram):
+                    payload['result'] = reactive.evaluate(ast_node, budget)
+                    payload['reactive'] = reactive.stats()
+                    if counters is not None:
+                        counters['reactive_evaluated'] = reactive.evaluated
+                elif sharing and backend == 'tree':
+                    payload['result'] = hashcons.evaluate(ast_node, sharing, budget, counters)
+                else:
+                    payload['result'] = evaluator.evaluate(ast_node, backend, budget, counters)
+                t = _lap('evaluate', t)
+            _emit(emit, 'result', payload, ('result',))
+        if 'semantic' in want:
+            payload['semantic'] = semantic_res
+        if 'validation' in want:
+            payload['validation'] = validation
+        if opt_report is not None:
+            payload['optimizer'] = opt_report
+        return payload, 200
+    except limits.BudgetExceeded as e:
+        return budget_error(e, phase, validation)
+    except Exception as e:
+        # Error inesperado: devolver traza para depuración en el frontend
+        metrics.ERRORS.inc(phase)
+        return {'ok': False, 'error': str(e), 'trace': traceback.format_exc()}, 400
+
+
+def budget_error(e, phase='lexical', validation=None):
+    """Respuesta (payload, 400) de un presupuesto agotado (BudgetExceeded `e`)
+    en la fase `phase`: error estructurado en esa fase de `validation` y las
+    fases posteriores omitidas."""
+    _count_exceeded(phase, e)
+    validation = {} if validation is None else validation
+    validation[phase] = {'ok': False, 'message': str(e), 'budget': e.to_dict()}
+    for later in ('lexical', 'syntactic', 'semantic'):
+        validation.setdefault(later, {'ok': False, 'message': 'Omitido por límite de recursos'})
+    return {'ok': False, 'error': str(e), 'budget': e.to_dict(), 'validation': validation}, 400
+
+
+def _front(code, budget):
+    # lexeo y parseo (sólo AST) de un código: (program, validation), con
+    # program None si el parseo falla; los errores léxicos se propagan
+    tokens = lexer.lex(code, budget=budget)
+    validation = {'lexical': {'ok': True, 'message': f'{len(tokens)} token(s) generados' if tokens else '0 tokens'}}
+    try:
+        program, _ = parser.parse(tokens, False, None, budget)
+    except limits.BudgetExceeded:
+        raise
+    except Exception as e:
+        validation['syntactic'] = {'ok': False, 'message': str(e)}
+        validation['semantic'] = {'ok': False, 'message': 'Omitido por error sintáctico'}
+        return None, validation
+    validation['syntactic'] = {'ok': True, 'message': 'Parseo correcto'}
+    return program, validation
+
+
+def _run(program, env, backend, budget):
+    # evalúa `program` sobre `env` (dict o compiler.env.Env)
+    if backend == 'vm':
+        return bytecode.run(bytecode.compile_ast(program), env, budget)
+    return evaluator.Evaluator(budget, env).eval(program)
+
+
+def _branch(code, prefix_analyzer, prefix_ev, backend, budget):
+    # una continuación sobre bifurcaciones del estado del prefijo
+    # (prefix_ev None: el prefijo no se evaluó)
+    phase = 'lexical'
+    try:
+        program, validation = _front(code, budget)
+        if program is None:
+            metrics.ERRORS.inc('syntactic')
+            return {'ok': True, 'result': None, 'validation': validation}
+        phase = 'semantic'
+        analyzer = prefix_analyzer.fork()
+        analyzer.visit(program)
+        res = analyzer.result()
+        res['symbols'] = analyzer.symbols.changes()
+        validation['semantic'] = {'ok': res['ok'], 'message': res['message']}
+        if res['errors']:
+            metrics.ERRORS.inc('semantic')
+        result = None
+        if prefix_ev is not None and not res['errors']:
+            phase = 'runtime'
+            result = _run(program, prefix_ev.fork().env, backend, budget)
+        return {'ok': True, 'result': result, 'semantic': res, 'validation': validation}
+    except limits.BudgetExceeded as e:
+        _count_exceeded(phase, e)
+        return {'ok': False, 'error': str(e), 'budget': e.to_dict()}
+    except Exception as e:
+        metrics.ERRORS.inc(phase)
+        return {'ok': False, 'error': str(e)}
+
+
+def compile_branches(prefix, suffixes, backend='tree', budget=None):
+    """Evalúa `prefix` una vez y cada código de `suffixes` a continuación.
+
+    Cada continuación ve las variables y los símbolos que dejó el prefijo,
+    como si se compilara `prefix + suffix`, pero sobre una bifurcación
+    copy-on-write de ese estado (compiler.env.Env): el costo es el del
+    prefijo más el de cada continuación, no N veces el prefijo. El prefijo y
+    cada continuación tienen que ser sentencias completas.
+
+    Devuelve (payload, status):
+      - prefix: {result, semantic, validation} del prefijo
+      - branches: uno por continuación, {ok, result, semantic (sus errores y
+        los símbolos que asigna), validation}, o {ok: False, error[, budget]}
+        si falla; una rama con error no afecta a las demás. None si el
+        prefijo no parsea.
+    Si el prefijo tiene errores semánticos no se evalúa nada (result None);
+    si su evaluación falla (p.ej. división por cero) la respuesta es ese
+    error (status 400), aunque alguna continuación tenga errores semánticos.
+    `budget` (compiler.limits.Budget) acota el total; el máximo de pasos se
+    aplica a cada evaluación por separado.
+    """
+    if backend not in evaluator.BACKENDS:
+        raise ValueError(f'Backend de evaluación desconocido: {backend!r}')
+    phase = 'lexical'
+    try:
+        if budget is not None:
+            budget.check_source_bytes(sum(len(code.encode('utf-8')) for code in [prefix, *suffixes]))
+        program, validation = _front(prefix, budget)
+        if program is None:
+            metrics.ERRORS.inc('syntactic')
+            return {'ok': True, 'prefix': {'result': None, 'validation': validation}, 'branches': None}, 200
+        # el prefijo se analiza y evalúa con dicts (el camino rápido); el
+        # primer fork() los copia una vez a un Env
+        phase = 'semantic'
+        analyzer = semantic.Analyzer()
+        analyzer.visit(program)
+        res = analyzer.result()
+        validation['semantic'] = {'ok': res['ok'], 'message': res['message']}
+        if res['errors']:
+            metrics.ERRORS.inc('semantic')
+        ev = result = None
+        if not res['errors']:
+            phase = 'runtime'
+            ev = evaluator.Evaluator(budget)
+            result = _run(program, ev.env, backend, budget)
+        branches = [_branch(code, analyzer, ev, backend, budget) for code in suffixes]
+    except limits.BudgetExceeded as e:
+        _count_exceeded(phase, e)
+        return {'ok': False, 'error': str(e), 'budget': e.to_dict()}, 400
+    except Exception as e:
+        metrics.ERRORS.inc(phase)
+        return {'ok': False, 'error': str(e)}, 400
+    return {'ok': True, 'prefix': {'result': result, 'semantic': res, 'validation': validation},
+            'branches': branches}, 200
+
+
+def token_label(tok):
+    """Mapeo para etiquetas legibles en español y reconocimiento de keywords."""
+    t = tok.type
+    v = tok.value
+    # detectar 'keywords' simples (si se decide introducirlas)
+    if t == 'ID' and isinstance(v, str) and v in ('let', 'var', 'const'):
+        return ('declare', v)
+    if t == 'ID':
+        return ('identificador', v)
+    if t == 'NUMBER':
+        return ('number', v)
+    if t in ('ASSIGN', 'PLUS', 'MINUS', 'MUL', 'DIV'):
+        return ('operador', v)
+    if t in ('LPAREN', 'RPAREN'):
+        return ('paren', v)
+    if t == 'SEMI':
+        return ('separador', v)
+    return (t.lower(), v)
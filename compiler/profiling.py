@@ -0,0 +1,246 @@
+"""Perfilado bajo demanda de una compilación.
+
+Un Profile registra, mientras está activo, cada llamada a función del hilo
+que lo activó (sys.setprofile: las peticiones atendidas por otros hilos no
+se ven afectadas) en un árbol de llamadas: un nodo por cada camino distinto
+de funciones, con el número de llamadas y el tiempo propio (sin contar las
+funciones llamadas). Del árbol salen:
+
+- functions(): las funciones más costosas, con llamadas, tiempo propio y
+  tiempo total (las llamadas recursivas no se cuentan dos veces)
+- collapsed(): las pilas en el formato "plegado" (una línea
+  `f1;f2;f3 microsegundos` por pila) que leen flamegraph.pl, inferno o
+  speedscope para dibujar un flame graph
+
+Además cada Profile lleva `counters` (tokens, nodos del AST, pasos de
+evaluación, bytes renderizados...) que completa compiler.pipeline.
+
+Perfilar así multiplica varias veces el tiempo de la compilación, así que
+es opcional por petición y el Sampler limita cuántas se perfilan.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+# funciones más costosas que se incluyen por defecto en el reporte
+DEFAULT_LIMIT = 50
+
+
+def _label(key):
+    # nombre legible de una función: código de Python o (módulo, nombre) de C
+    if isinstance(key, tuple):
+        module, name = key
+        return f'{module}.{name}' if module and module != 'builtins' else name
+    name = getattr(key, 'co_qualname', key.co_name)
+    return f'{name} ({os.path.basename(key.co_filename)}:{key.co_firstlineno})'
+
+
+class Profile:
+    """Árbol de llamadas de lo ejecutado entre start() y stop() en este hilo.
+
+    También sirve como context manager. `id` identifica el perfil (p.ej. en
+    /profile/<id>) y `counters` es un dict libre para contadores del trabajo
+    hecho.
+    """
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.counters = {}
+        self.created = time.time()
+        self.seconds = 0.0
+        # nodo 0: raíz (lo que corre en el marco que llamó a start())
+        self._parent = [-1]
+        self._key = [None]
+        self._self_time = [0.0]
+        self._calls = [0]
+        self._children = [{}]
+        self._previous = None
+        self._started = None
+
+    def start(self):
+        parent, keys, self_time, calls, children = (
+            self._parent, self._key, self._self_time, self._calls, self._children)
+        clock = time.perf_counter
+        # nodo actual e instante del último evento
+        state = [0, clock()]
+
+        def tracer(frame, event, arg):
+            now = clock()
+            cur = state[0]
+            self_time[cur] += now - state[1]
+            if event == 'call' or event == 'c_call':
+                key = frame.f_code if event == 'call' else (getattr(arg, '__module__', None), arg.__qualname__)
+                child = children[cur].get(key)
+                if child is None:
+                    child = children[cur][key] = len(keys)
+                    parent.append(cur)
+                    keys.append(key)
+                    self_time.append(0.0)
+                    calls.append(0)
+                    children.append({})
+                calls[child] += 1
+                state[0] = child
+            elif cur:
+                # return, c_return, c_exception; los retornos por encima del
+                # marco de start() quedan en la raíz
+                state[0] = parent[cur]
+            # el tiempo del propio tracer no se le cuenta a nadie
+            state[1] = clock()
+
+        self._previous = sys.getprofile()
+        self._started = clock()
+        sys.setprofile(tracer)
+        return self
+
+    def stop(self):
+        sys.setprofile(self._previous)
+        self.seconds += time.perf_counter() - self._started
+        self._previous = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _visible(self):
+        # nodos a reportar: sin stop()/__exit__ ni lo que llamaron (el
+        # final del propio perfilado)
+        hidden = {Profile.stop.__code__, Profile.__exit__.__code__}
+        keys, parent = self._key, self._parent
+        visible = [True] * len(keys)
+        for i in range(1, len(keys)):
+            visible[i] = visible[parent[i]] and keys[i] not in hidden
+        return visible
+
+    def _totals(self):
+        # tiempo total de cada subárbol; los hijos tienen índices mayores
+        # que su padre, así que basta un recorrido hacia atrás
+        total = list(self._self_time)
+        parent = self._parent
+        for i in range(len(total) - 1, 0, -1):
+            total[parent[i]] += total[i]
+        return total
+
+    def functions(self, limit=DEFAULT_LIMIT):
+        """Funciones ordenadas por tiempo propio (las `limit` primeras; None: todas).
+
+        Cada una es un dict con function, calls, self_seconds y total_seconds.
+        """
+        keys, calls, self_time = self._key, self._calls, self._self_time
+        visible = self._visible()
+        total = self._totals()
+        stats = {}
+        # pila explícita en pre-orden llevando cuántas veces aparece cada
+        # función en el camino: el tiempo total sólo se suma en la llamada
+        # más externa de una recursión
+        active = {}
+        children = self._children
+        stack = [(c, False) for c in reversed(list(children[0].values()))]
+        while stack:
+            i, leaving = stack.pop()
+            key = keys[i]
+            if leaving:
+                active[key] -= 1
+                continue
+            if not visible[i]:
+                continue
+            entry = stats.get(key)
+            if entry is None:
+                entry = stats[key] = [0, 0.0, 0.0]
+            entry[0] += calls[i]
+            entry[1] += self_time[i]
+            if not active.get(key):
+                entry[2] += total[i]
+            active[key] = active.get(key, 0) + 1
+            stack.append((i, True))
+            stack.extend((c, False) for c in reversed(list(children[i].values())))
+        ranked = sorted(stats.items(), key=lambda kv: kv[1][1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [{'function': _label(key), 'calls': n, 'self_seconds': st, 'total_seconds': tt}
+                for key, (n, st, tt) in ranked]
+
+    def collapsed(self):
+        """Pilas en formato plegado para flame graphs (una por línea, en microsegundos)."""
+        keys, parent, self_time = self._key, self._parent, self._self_time
+        visible = self._visible()
+        labels = [None] + [_label(k).replace(';', ',') for k in keys[1:]]
+        paths = [''] * len(keys)
+        lines = []
+        for i in range(1, len(keys)):
+            if not visible[i]:
+                continue
+            p = parent[i]
+            paths[i] = paths[p] + ';' + labels[i] if p else labels[i]
+            micros = round(self_time[i] * 1e6)
+            if micros > 0:
+                lines.append(f'{paths[i]} {micros}')
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def to_dict(self, limit=DEFAULT_LIMIT):
+        """Reporte JSON: duración, contadores y funciones más costosas."""
+        return {
+            'id': self.id,
+            'created': self.created,
+            'seconds': self.seconds,
+            'counters': dict(self.counters),
+            'calls': sum(self._calls),
+            'call_paths': len(self._key) - 1,
+            'functions': self.functions(limit),
+        }
+
+
+class Sampler:
+    """Decide qué peticiones que piden perfilado se perfilan.
+
+    - rate: fracción de esas peticiones que se perfilan (0 desactiva)
+    - max_per_minute: máximo de perfiles por minuto (0: sin máximo)
+    """
+    def __init__(self, rate=1.0, max_per_minute=60):
+        self.rate = rate
+        self.max_per_minute = max_per_minute
+        self._times = []
+        self._lock = threading.Lock()
+
+    def admit(self):
+        if self.rate <= 0 or (self.rate < 1 and random.random() >= self.rate):
+            return False
+        if not self.max_per_minute:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            times = self._times = [t for t in self._times if now - t < 60]
+            if len(times) >= self.max_per_minute:
+                return False
+            times.append(now)
+            return True
+
+
+class ProfileStore:
+    """Últimos perfiles por id (LRU acotado por número de perfiles)."""
+    def __init__(self, max_profiles=32):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+def profile_call(fn, *args, **kwargs):
+    """Función de conveniencia: (resultado de fn(*args, **kwargs), Profile)."""
+    with Profile() as prof:
+        result = fn(*args, **kwargs)
+    return result, prof
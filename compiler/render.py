@@ -0,0 +1,274 @@
+"""Render del parse-tree con los padres centrados sobre sus hijos.
+
+Produce el mismo texto que el algoritmo original de to_text_centered (cada
+bloque armado rellenando y concatenando las líneas de los bloques hijos),
+pero sin copiar líneas de nivel en nivel:
+
+1. layout: en post-orden se calcula para cada subárbol un Block con su ancho,
+   su centro y la posición relativa de cada hijo (costo proporcional al
+   número de hijos, no al tamaño del texto).
+2. emisión: en pre-orden se ubica cada etiqueta, barra y conector en su fila
+   y columna absolutas; cada fila se arma una sola vez al final.
+
+El costo total es lineal en el número de nodos más el tamaño del texto
+producido. Los Block no dependen de dónde está el subárbol, así que se
+guardan en `cache` (un dict del llamador, p.ej. uno por documento del modo
+incremental) y un subárbol que no cambió no se vuelve a medir.
+
+Opcionalmente se acota el tamaño del resultado, reemplazando lo que no entra
+por un nodo '... (+N)' con el número N de nodos omitidos:
+- max_depth: niveles de nodos mostrados (la raíz es el nivel 1)
+- max_chain: nodos seguidos con la misma etiqueta (p.ej. cadenas E -> E -> E
+  de a + b + c + ...)
+- max_width: ancho máximo de los hijos de un nodo (en caracteres); los
+  hermanos que no entran se resumen en un único nodo al final
+
+layout() devuelve la misma disposición como datos (coordenadas de cada nodo
+en la grilla de caracteres) para que el navegador dibuje el árbol.
+"""
+from compiler.limits import CHECK_INTERVAL
+
+# espacio entre bloques hermanos
+GAP = 3
+
+
+class Block:
+    """Disposición de un subárbol, relativa a su esquina superior izquierda.
+
+    - label: texto del nodo; label_x: su columna
+    - width: ancho del bloque; mid: columna de la barra bajo la etiqueta (y
+      punto de conexión con el padre)
+    - height: filas que ocupa
+    - children: lista de (columna, Block) de los hijos
+    - hidden: nodos omitidos que resume este bloque (0 si no es una elisión)
+    - count: nodos del subárbol original que representa
+    """
+    __slots__ = ('label', 'label_x', 'width', 'mid', 'height', 'children', 'hidden', 'count')
+
+    def __init__(self, label, children=(), hidden=0, count=1):
+        self.label = label
+        self.children = []
+        self.hidden = hidden
+        self.count = count
+        if not children:
+            self.label_x = 0
+            self.width = len(label)
+            self.mid = self.width // 2
+            self.height = 1
+            return
+        cur = 0
+        height = 0
+        for child in children:
+            self.children.append((cur, child))
+            cur += child.width + GAP
+            if child.height > height:
+                height = child.height
+        total_w = cur - GAP
+        self.mid = total_w // 2
+        self.label_x = max(0, self.mid - len(label) // 2)
+        self.width = max(total_w, self.label_x + len(label))
+        self.height = height + 3
+
+
+def _elided(hidden):
+    return Block(f'... (+{hidden})', hidden=hidden, count=hidden)
+
+
+def _subtree_size(node, node_type):
+    # nodos de un subárbol (ParseNode y valores hoja), sin recursión
+    count = 0
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        count += 1
+        if type(n) is node_type:
+            stack.extend(n.children)
+    return count
+
+
+class Renderer:
+    """Render centrado acotado (ver la descripción del módulo).
+
+    - max_depth, max_chain, max_width: límites de elisión (None = sin límite)
+    - cache: dict opcional para reutilizar los Block entre renders; después
+      de cada render sólo conserva los del último árbol
+    - budget: compiler.limits.Budget opcional (se respeta su deadline)
+    """
+    def __init__(self, max_depth=None, max_chain=None, max_width=None, cache=None, budget=None):
+        self.max_depth = max_depth or None
+        self.max_chain = max_chain or None
+        self.max_width = max_width or None
+        self.cache = cache if cache is not None else {}
+        self.budget = budget
+
+    def measure(self, root):
+        """Block de la raíz `root` (un ParseNode), aplicando las elisiones."""
+        node_type = type(root)
+        options = (self.max_depth, self.max_chain, self.max_width)
+        cache = self.cache
+        used = {}
+        budget = self.budget
+        visited = 0
+        # pila de (nodo, nivel, largo de la cadena, hijos); `hijos` es None
+        # hasta que se apilan los hijos del nodo y luego (k, resto): k hijos
+        # medidos y `resto` nodos de los hermanos que seguro no entran en
+        # max_width. Los resultados de los hijos se acumulan en `done` y el
+        # padre los toma al cerrarse
+        done = []
+        stack = [(root, 1, 1, None)]
+        while stack:
+            node, depth, chain, expanded = stack.pop()
+            visited += 1
+            if budget is not None and visited % CHECK_INTERVAL == 0:
+                budget.check_time()
+            if type(node) is not node_type:
+                text = str(node)
+                done.append(Block(text))
+                continue
+            key = (id(node), depth if self.max_depth else 0, chain if self.max_chain else 0, options)
+            if expanded is None:
+                entry = cache.get(key)
+                if entry is not None and entry[0] is node:
+                    used[key] = entry
+                    done.append(entry[1])
+                    continue
+                subnodes = [c for c in node.children if type(c) is node_type]
+                if subnodes and ((self.max_depth and depth >= self.max_depth)
+                                 or (self.max_chain and chain >= self.max_chain)):
+                    # los hijos quedan resumidos en un único nodo
+                    hidden = _subtree_size(node, node_type) - 1
+                    block = Block(str(node.label), [_elided(hidden)], count=hidden + 1)
+                    used[key] = (node, block)
+                    done.append(block)
+                    continue
+                children = node.children
+                rest = 0
+                if self.max_width:
+                    k = self._cut(children, node_type)
+                    rest = sum(_subtree_size(c, node_type) for c in children[k:])
+                    children = children[:k]
+                stack.append((node, depth, chain, (len(children), rest)))
+                label = node.label
+                for c in reversed(children):
+                    if type(c) is node_type:
+                        stack.append((c, depth + 1, chain + 1 if c.label == label else 1, None))
+                    else:
+                        stack.append((c, depth + 1, 1, None))
+                continue
+            k, rest = expanded
+            children = done[len(done) - k:] if k else []
+            del done[len(done) - k:]
+            if self.max_width:
+                children = self._fit(children, rest)
+            block = Block(str(node.label), children, count=1 + sum(c.count for c in children))
+            used[key] = (node, block)
+            done.append(block)
+        cache.clear()
+        cache.update(used)
+        return done.pop()
+
+    def _cut(self, children, node_type):
+        """Cuántos de `children` hay que medir con max_width.
+
+        Un bloque es al menos tan ancho como su etiqueta: en cuanto esa cota
+        supera max_width, los hermanos siguientes seguro no entran y basta
+        con contar sus nodos.
+        """
+        width = -GAP
+        for i, c in enumerate(children):
+            width += GAP + len(str(c.label if type(c) is node_type else c))
+            if width > self.max_width:
+                return i + 1
+        return len(children)
+
+    def _fit(self, children, rest=0):
+        """Hijos que entran en max_width; el resto (y los `rest` nodos de
+        hermanos no medidos) se resume en un nodo."""
+        total = sum(c.width for c in children) + GAP * (len(children) - 1)
+        if total <= self.max_width and not rest:
+            return children
+        # suffix[i]: nodos de children[i:] más los no medidos
+        suffix = [0] * (len(children) + 1)
+        suffix[-1] = rest
+        for i in range(len(children) - 1, -1, -1):
+            suffix[i] = suffix[i + 1] + children[i].count
+        kept = []
+        width = -GAP
+        for i, child in enumerate(children):
+            width += GAP + child.width
+            # el hijo entra si todavía queda lugar para resumir a los demás
+            if width + GAP + len(f'... (+{suffix[i + 1]})') > self.max_width:
+                kept.append(_elided(suffix[i]))
+                return kept
+            kept.append(child)
+        if rest:
+            kept.append(_elided(rest))
+        return kept
+
+    def _walk(self, block):
+        """(Block, columna, fila, índice del padre) en pre-orden (izquierda a derecha)."""
+        stack = [(block, 0, 0, -1)]
+        index = 0
+        while stack:
+            b, x, y, parent = stack.pop()
+            yield b, x, y, parent
+            for offset, child in reversed(b.children):
+                stack.append((child, x + offset, y + 3, index))
+            index += 1
+
+    def to_text(self, root):
+        """Texto ASCII del árbol (el de ParseNode.to_text_centered)."""
+        block = self.measure(root)
+        # por fila: lista de (columna, texto) en orden creciente de columna
+        rows = [[] for _ in range(block.height)]
+        budget = self.budget
+        visited = 0
+        for b, x, y, _ in self._walk(block):
+            visited += 1
+            if budget is not None and visited % CHECK_INTERVAL == 0:
+                budget.check_time()
+            rows[y].append((x + b.label_x, b.label))
+            if not b.children:
+                continue
+            mid = x + b.mid
+            rows[y + 1].append((mid, '|'))
+            positions = [x + offset + child.mid for offset, child in b.children]
+            lo = min(positions[0], mid)
+            hi = max(positions[-1], mid)
+            connector = ['-'] * (hi - lo + 1)
+            for pos in positions:
+                connector[pos - lo] = '+'
+            rows[y + 2].append((lo, ''.join(connector)))
+        lines = []
+        for items in rows:
+            parts = []
+            cur = 0
+            for col, text in items:
+                if col > cur:
+                    parts.append(' ' * (col - cur))
+                parts.append(text)
+                cur = col + len(text)
+            lines.append(''.join(parts).rstrip())
+        return '\n'.join(lines)
+
+    def layout(self, root):
+        """Disposición del árbol como datos, para dibujarlo en el cliente.
+
+        Devuelve {width, height, nodes}; cada nodo es {label, x, y, parent} en
+        la grilla de caracteres del texto: x es la columna de la etiqueta, y la
+        fila, parent el índice del padre en `nodes` (-1 para la raíz). Los
+        nodos que resumen una elisión tienen además `hidden` (nodos omitidos).
+        """
+        block = self.measure(root)
+        nodes = []
+        for b, x, y, parent in self._walk(block):
+            node = {'label': b.label, 'x': x + b.label_x, 'y': y, 'parent': parent}
+            if b.hidden:
+                node['hidden'] = b.hidden
+            nodes.append(node)
+        return {'width': block.width, 'height': block.height, 'nodes': nodes}
+
+
+def render_centered(root, max_depth=None, max_chain=None, max_width=None):
+    """Función de conveniencia: texto centrado de `root` con las elisiones dadas."""
+    return Renderer(max_depth, max_chain, max_width).to_text(root)
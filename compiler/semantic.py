@@ -1,4 +1,4 @@
-from compiler import ast
+from compiler import ast, env as envs, flatast
 
 
 class SemanticError(Exception):
@@ -6,52 +6,97 @@ class SemanticError(Exception):
     pass
 
 
-def analyze(program_node):
+class Analyzer:
     """Analizador semántico muy simple.
 
     Recorre el AST y detecta usos de variables antes de su asignación.
+    Conserva su estado entre llamadas a visit(), de modo que puede analizar
+    un programa sentencia por sentencia (ver compiler.stream).
+
+    - symbols: mapa de nombre -> None (registrados cuando se asignan); se
+      puede pasar uno inicial (un dict o un compiler.env.Env, ver fork)
+    - errors: lista de mensajes de error semántico
+    """
+    def __init__(self, symbols=None):
+        self.symbols = symbols if symbols is not None else {}
+        self.errors = []
+
+    def fork(self):
+        """Analyzer nuevo (sin errores) que parte de los símbolos actuales
+        sin copiarlos; la tabla pasa a ser un compiler.env.Env."""
+        self.symbols, symbols = envs.fork(self.symbols)
+        return Analyzer(symbols)
+
+    def visit(self, node):
+        """Visita `node` en pre-orden con pila explícita (sin recursión).
+
+        Para una asignación se apila un marcador (nombre,) debajo de su RHS:
+        el símbolo se registra después de visitar la RHS, como corresponde.
+        """
+        if isinstance(node, flatast.FlatProgram):
+            return self.visit_flat(node)
+        stack = [node]
+        while stack:
+            n = stack.pop()
+
+            # marcador: la RHS de la asignación ya fue visitada
+            if type(n) is tuple:
+                self.symbols[n[0]] = None
+
+            # Program: visitar cada sentencia (en orden)
+            elif isinstance(n, ast.Program):
+                stack.extend(reversed(n.statements))
+
+            # Assign: primero visitar RHS (para detectar usos en la RHS),
+            # luego registrar el símbolo como asignado
+            elif isinstance(n, ast.Assign):
+                stack.append((n.name,))
+                stack.append(n.value)
+
+            # BinOp: visitar subexpresiones (izquierda primero)
+            elif isinstance(n, ast.BinOp):
+                stack.append(n.right)
+                stack.append(n.left)
+
+            # Var: si no fue asignada antes, registrar error
+            elif isinstance(n, ast.Var):
+                if n.name not in self.symbols:
+                    self.errors.append(f"Variable '{n.name}' usada antes de asignar")
 
-    Entrada: nodo Program
+            # Number: literal, no acción necesaria
+            # Nodo desconocido: ignorar para este análisis simple
+
+    def visit_flat(self, flat):
+        """Analiza un FlatProgram recorriendo sus nodos en orden.
+
+        En post-orden las variables aparecen en el mismo orden (izquierda a
+        derecha) que en visit(), y cada asignación después de su RHS.
+        """
+        names = flat.names
+        symbols = self.symbols
+        for k, a in zip(flat.kinds, flat.args):
+            if k == flatast.VAR:
+                if names[a] not in symbols:
+                    self.errors.append(f"Variable '{names[a]}' usada antes de asignar")
+            elif k == flatast.ASSIGN:
+                symbols[names[a]] = None
+
+    def result(self):
+        ok = len(self.errors) == 0
+        message = 'Sin errores semánticos' if ok else f'{len(self.errors)} error(es) semántico(s)'
+        return {'symbols': self.symbols, 'errors': self.errors, 'ok': ok, 'message': message}
+
+
+def analyze(program_node):
+    """Analiza un Program completo.
+
+    Entrada: nodo Program (o FlatProgram)
     Salida: diccionario con keys:
       - symbols: mapa de nombre -> None (registrados cuando se asignan)
       - errors: lista de mensajes de error semántico
       - ok: booleano si no hay errores
       - message: mensaje resumen
     """
-    symbols = {}
-    errors = []
-
-    def visit(node):
-        # Program: visitar cada sentencia
-        if isinstance(node, ast.Program):
-            for s in node.statements:
-                visit(s)
-
-        # Assign: primero visitar RHS (para detectar usos en la RHS),
-        # luego registrar el símbolo como asignado
-        elif isinstance(node, ast.Assign):
-            visit(node.value)
-            symbols[node.name] = None
-
-        # BinOp: visitar subexpresiones
-        elif isinstance(node, ast.BinOp):
-            visit(node.left)
-            visit(node.right)
-
-        # Var: si no fue asignada antes, registrar error
-        elif isinstance(node, ast.Var):
-            if node.name not in symbols:
-                errors.append(f"Variable '{node.name}' usada antes de asignar")
-
-        # Number: literal, no acción necesaria
-        elif isinstance(node, ast.Number):
-            pass
-
-        else:
-            # Nodo desconocido: ignorar para este análisis simple
-            pass
-
-    visit(program_node)
-    ok = len(errors) == 0
-    message = 'Sin errores semánticos' if ok else f'{len(errors)} error(es) semántico(s)'
-    return {'symbols': symbols, 'errors': errors, 'ok': ok, 'message': message}
+    analyzer = Analyzer()
+    analyzer.visit(program_node)
+    return analyzer.result()
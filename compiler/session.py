@@ -0,0 +1,261 @@
+"""Sesiones de compilación persistentes (estilo REPL).
+
+/compile no guarda estado: cada llamada empieza con un Evaluator y una tabla
+de símbolos vacíos, así que un cliente tipo REPL tendría que reenviar (y el
+servidor recompilar) toda su historia en cada línea nueva. Una Session
+conserva en el servidor el entorno del evaluador y los símbolos del análisis
+semántico; cada entrada nueva se lexea, parsea, analiza y evalúa sola contra
+ese estado, así que su costo depende de la entrada y no de la historia.
+
+Una entrada se aplica entera o no se aplica: si tiene errores (de sintaxis,
+semánticos, de evaluación o de límites, o si su resultado no se puede
+devolver en JSON) el estado queda como estaba.
+
+La memoria está acotada por sesión (variables y bytes estimados de sus
+valores, ver Session) y en total (SessionStore: máximo de sesiones y
+expiración por inactividad).
+"""
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from compiler import ast, evaluator, lexer, limits, parser, semantic
+
+_MESSAGES = {
+    'sessions': 'Demasiadas sesiones abiertas ({value} >= {maximum})',
+    'variables': 'La sesión supera el máximo de variables ({value} > {maximum})',
+    'bytes': 'La sesión supera el máximo de memoria ({value} > {maximum} bytes)',
+}
+
+_MISSING = object()
+
+
+class SessionLimitExceeded(Exception):
+    """Se agotó un límite de las sesiones.
+
+    - limit: 'sessions' (SessionStore lleno), 'variables' o 'bytes'
+    - value: lo que se habría alcanzado; maximum: el límite configurado
+    """
+    def __init__(self, limit, value=None, maximum=None):
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+        super().__init__(_MESSAGES[limit].format(value=value, maximum=maximum))
+
+    def to_dict(self):
+        return {'limit': self.limit, 'value': self.value, 'max': self.maximum}
+
+
+def _size(name, value):
+    # memoria estimada de una variable de la sesión
+    return sys.getsizeof(name) + sys.getsizeof(value)
+
+
+class Session:
+    """Estado de una sesión: entorno del evaluador y símbolos declarados.
+
+    - max_variables / max_bytes: límites de la sesión (None: sin límite);
+      `nbytes` estima la memoria de sus variables (nombre más valor)
+    - statements: sentencias aplicadas desde que se creó
+    - lock: serializa las entradas de una misma sesión
+    """
+    def __init__(self, session_id, max_variables=None, max_bytes=None):
+        self.id = session_id
+        self.max_variables = max_variables or None
+        self.max_bytes = max_bytes or None
+        self.env = {}
+        self.symbols = {}
+        self.nbytes = 0
+        self.statements = 0
+        self.created = self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def run(self, code, budget=None):
+        """Compila y evalúa `code` contra el estado de la sesión.
+
+        Devuelve (payload, status) como compiler.pipeline.compile_source:
+        `result` tiene los valores de las sentencias nuevas, `semantic` los
+        errores y los símbolos asignados de esta entrada (no los de toda la
+        sesión) y `validation` el resultado de cada fase.
+        `budget` (compiler.limits.Budget) acota sólo esta entrada.
+        """
+        validation = {}
+        phase = 'lexical'
+        try:
+            if budget is not None:
+                budget.check_source_bytes(len(code.encode('utf-8')))
+            tokens = lexer.lex(code, budget=budget)
+            validation['lexical'] = {'ok': True, 'message': f'{len(tokens)} token(s) generados' if tokens else '0 tokens'}
+            phase = 'syntactic'
+            try:
+                program, _ = parser.parse(tokens, False, None, budget)
+            except limits.BudgetExceeded:
+                raise
+            except Exception as pe:
+                validation['syntactic'] = {'ok': False, 'message': str(pe)}
+                validation['semantic'] = {'ok': False, 'message': 'Omitido por error sintáctico'}
+                return self._payload(None, None, validation), 200
+            validation['syntactic'] = {'ok': True, 'message': 'Parseo correcto'}
+            phase = 'semantic'
+            statements = program.statements
+            assigned = {s.name for s in statements if isinstance(s, ast.Assign)}
+            # el Analyzer comparte la tabla de símbolos de la sesión; si hay
+            # errores se quitan los símbolos que agregó esta entrada
+            analyzer = semantic.Analyzer()
+            analyzer.symbols = self.symbols
+            new_symbols = [name for name in assigned if name not in self.symbols]
+            analyzer.visit(program)
+            res = analyzer.result()
+            res['symbols'] = {name: None for name in sorted(assigned)}
+            validation['semantic'] = {'ok': res['ok'], 'message': res['message']}
+            if res['errors']:
+                for name in new_symbols:
+                    del self.symbols[name]
+                return self._payload(None, res, validation), 200
+            phase = 'runtime'
+            saved = {name: self.env.get(name, _MISSING) for name in assigned}
+            try:
+                ev = evaluator.Evaluator(budget)
+                ev.env = self.env
+                result = ev.eval(program)
+                # un resultado que no se podría devolver en JSON también
+                # deshace la entrada
+                for value in result:
+                    limits.check_text(value)
+                self._account(saved)
+            except BaseException:
+                self._restore(saved)
+                for name in new_symbols:
+                    del self.symbols[name]
+                raise
+            self.statements += len(statements)
+            return self._payload(result, res, validation), 200
+        except (limits.BudgetExceeded, SessionLimitExceeded) as e:
+            validation[phase] = {'ok': False, 'message': str(e), 'budget': e.to_dict()}
+            for later in ('lexical', 'syntactic', 'semantic'):
+                validation.setdefault(later, {'ok': False, 'message': 'Omitido por límite de recursos'})
+            return {'ok': False, 'session': self.id, 'error': str(e), 'budget': e.to_dict(),
+                    'validation': validation}, 400
+        except Exception as e:
+            return {'ok': False, 'session': self.id, 'error': str(e), 'phase': phase}, 400
+
+    def _account(self, saved):
+        # actualiza la memoria estimada con las variables asignadas y
+        # comprueba los límites (si se superan, run() deshace la entrada)
+        env = self.env
+        delta = 0
+        for name, old in saved.items():
+            if old is not _MISSING:
+                delta -= _size(name, old)
+            delta += _size(name, env[name])
+        if self.max_variables and len(env) > self.max_variables:
+            raise SessionLimitExceeded('variables', len(env), self.max_variables)
+        if self.max_bytes and self.nbytes + delta > self.max_bytes:
+            raise SessionLimitExceeded('bytes', self.nbytes + delta, self.max_bytes)
+        self.nbytes += delta
+
+    def _restore(self, saved):
+        env = self.env
+        for name, old in saved.items():
+            if old is _MISSING:
+                env.pop(name, None)
+            else:
+                env[name] = old
+
+    def _payload(self, result, semantic_res, validation):
+        payload = {'ok': True, 'session': self.id, 'statements': self.statements, 'result': result}
+        if semantic_res is not None:
+            payload['semantic'] = semantic_res
+        payload['validation'] = validation
+        return payload
+
+    def info(self):
+        """Resumen de la sesión (sin su entorno)."""
+        return {'session': self.id, 'statements': self.statements, 'variables': len(self.env),
+                'bytes': self.nbytes, 'idle_seconds': time.monotonic() - self.last_used}
+
+
+class SessionStore:
+    """Sesiones abiertas, con expiración por inactividad y un máximo global.
+
+    - max_sessions: sesiones abiertas a la vez (0: sin máximo); al llegar al
+      máximo create() lanza SessionLimitExceeded('sessions') en lugar de
+      cerrar sesiones activas
+    - idle_seconds: una sesión sin uso durante ese tiempo expira (0: nunca)
+    - max_variables / max_bytes: límites de cada sesión (ver Session)
+
+    Las sesiones se guardan por orden de último uso, así que purgar las
+    expiradas sólo recorre esas.
+    """
+    def __init__(self, max_sessions=256, idle_seconds=900, max_variables=None, max_bytes=None):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_variables = max_variables
+        self.max_bytes = max_bytes
+        self.created = 0
+        self.expired = 0
+        self.closed = 0
+        self.rejected = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _purge(self, now):
+        # quita las sesiones expiradas (las primeras, por orden de uso)
+        if not self.idle_seconds:
+            return
+        sessions = self._sessions
+        while sessions:
+            session = next(iter(sessions.values()))
+            if now - session.last_used < self.idle_seconds:
+                break
+            sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self):
+        """Abre una sesión nueva con un id aleatorio."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            if self.max_sessions and len(self._sessions) >= self.max_sessions:
+                self.rejected += 1
+                raise SessionLimitExceeded('sessions', len(self._sessions), self.max_sessions)
+            session = Session(uuid.uuid4().hex, self.max_variables, self.max_bytes)
+            self._sessions[session.id] = session
+            self.created += 1
+            return session
+
+    def get(self, session_id):
+        """La sesión `session_id` (marcada como usada), o None si no existe o expiró."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id):
+        """Cierra la sesión; devuelve False si no existía."""
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                return False
+            self.closed += 1
+            return True
+
+    def stats(self):
+        """Resumen de contadores para diagnóstico."""
+        with self._lock:
+            return {'open': len(self._sessions), 'created': self.created, 'expired': self.expired,
+                    'closed': self.closed, 'rejected': self.rejected}
+
+
+def run_session(inputs):
+    """Función de conveniencia: aplica cada entrada de `inputs` en una sesión nueva.
+
+    Devuelve la lista de (payload, status), uno por entrada.
+    """
+    session = Session(uuid.uuid4().hex)
+    return [session.run(code) for code in inputs]
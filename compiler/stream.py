@@ -0,0 +1,308 @@
+"""Pipeline en streaming para programas muy grandes.
+
+En lugar de materializar la lista completa de tokens, el Program y la lista de
+resultados, cada etapa consume a la anterior de forma perezosa:
+
+- iter_tokens: lee la entrada por bloques (str, bytes, archivo o mmap) y lexea
+  cada bloque hasta su último separador (espacio, salto de línea, operador,
+  paréntesis o ';'); sólo retiene el token que quedó partido. Una línea
+  enorme no se acumula entera.
+- iter_statements: agrupa los tokens de una sentencia y la parsea sola.
+- run_stream: análisis semántico y evaluación sentencia por sentencia,
+  emitiendo un registro por sentencia en cuanto está listo.
+
+Con un `budget` (compiler.limits.Budget) el deadline y la cancelación valen
+para todo el stream, y los demás límites (tokens, profundidad y nodos del
+AST, pasos y bits de los enteros) para cada sentencia por separado. El
+tamaño total de la entrada no se limita, es lo que el streaming permite
+procesar; el máximo de bytes del código vale para cada sentencia (y para un
+token partido entre bloques), medido por bloques lexeados.
+
+La memoria queda acotada por la sentencia más larga y por el número de
+variables distintas, no por el tamaño de la entrada.
+
+Uso desde la línea de comandos:
+
+    python -m compiler.stream programa.txt
+"""
+import argparse
+import codecs
+import json
+import mmap
+import sys
+
+from compiler import evaluator, semantic
+from compiler.lexer import lex
+from compiler.limits import BudgetExceeded, check_text
+from compiler.parser import Parser
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# Una sentencia sin ';' termina cuando tras el final de un factor aparece el
+# comienzo de otro (p.ej. "a = 1 b = 2"): el parser no puede continuar la
+# expresión porque sólo los operadores la extienden.
+_FACTOR_END = frozenset(('ID', 'NUMBER', 'RPAREN'))
+_FACTOR_START = frozenset(('ID', 'NUMBER', 'LPAREN'))
+
+# caracteres que ningún token contiene: la entrada se puede cortar después de
+# cualquiera de ellos sin partir un token
+_SEPARATORS = ' \t\n=+-*/();'
+
+
+class StreamError(Exception):
+    """Error en una etapa del pipeline en streaming.
+
+    - phase: 'lexical', 'syntactic' o 'runtime'
+    - cause: excepción original
+    """
+    def __init__(self, phase, cause):
+        super().__init__(str(cause))
+        self.phase = phase
+        self.cause = cause
+
+
+def iter_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Produce la entrada como bloques de texto.
+
+    Acepta str, bytes/bytearray/memoryview, un mmap o cualquier objeto con
+    read() (texto o binario). Los bytes se decodifican como UTF-8 de forma
+    incremental (un carácter multibyte puede quedar partido entre bloques).
+    """
+    if isinstance(source, str):
+        for i in range(0, len(source), chunk_size):
+            yield source[i:i + chunk_size]
+        return
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield decoder.decode(view[i:i + chunk_size])
+    else:
+        while True:
+            data = source.read(chunk_size)
+            if not data:
+                break
+            yield data if isinstance(data, str) else decoder.decode(data)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class TokenReader:
+    """Tokens de la entrada, equivalentes a lexer.lex sobre toda ella.
+
+    Lexea cada bloque hasta su último separador (ver _SEPARATORS) y guarda
+    el resto para el siguiente, así ningún token queda partido; las líneas y
+    columnas se cuentan como si se lexeara la entrada completa.
+
+    - start / offset: bytes de la entrada antes y después del último
+      fragmento lexeado (los tokens que se están produciendo son de ese
+      fragmento)
+    - max_pending: máximo de bytes sin lexear (un token partido entre
+      bloques); si se supera lanza BudgetExceeded('source_bytes')
+    """
+    def __init__(self, source, chunk_size=DEFAULT_CHUNK_SIZE, max_pending=None):
+        self.start = 0
+        self.offset = 0
+        self._tokens = self._read(source, chunk_size, max_pending)
+
+    def __iter__(self):
+        return self._tokens
+
+    def _read(self, source, chunk_size, max_pending):
+        parts = []
+        pending = 0
+        line_num = col_num = 1
+        for chunk in iter_chunks(source, chunk_size):
+            cut = max(chunk.rfind(c) for c in _SEPARATORS)
+            if cut < 0:
+                parts.append(chunk)
+                pending += len(chunk)
+                if max_pending and pending > max_pending:
+                    size = len(''.join(parts).encode('utf-8'))
+                    if size > max_pending:
+                        raise BudgetExceeded('source_bytes', size, max_pending)
+                continue
+            parts.append(chunk[:cut + 1])
+            piece = ''.join(parts)
+            parts = [chunk[cut + 1:]]
+            pending = len(parts[0])
+            yield from self._lex(piece, line_num, col_num)
+            newlines = piece.count('\n')
+            if newlines:
+                line_num += newlines
+                col_num = len(piece) - piece.rfind('\n')
+            else:
+                col_num += len(piece)
+        piece = ''.join(parts)
+        if piece:
+            yield from self._lex(piece, line_num, col_num)
+
+    def _lex(self, piece, line_num, col_num):
+        tokens = lex(piece, line_num, col_num=col_num)
+        self.start = self.offset
+        self.offset += len(piece.encode('utf-8'))
+        return tokens
+
+
+def iter_tokens(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Generador de tokens equivalente a lexer.lex sobre toda la entrada (ver
+    TokenReader)."""
+    yield from TokenReader(source, chunk_size)
+
+
+def iter_statement_tokens(tokens, max_tokens=None, max_bytes=None, reader=None):
+    """Agrupa un flujo de tokens en listas, una por sentencia.
+
+    Corta después de ';' y entre el final de un factor y el comienzo de otro
+    fuera de paréntesis, que es exactamente donde Parser.parse termina una
+    sentencia. Los errores de sintaxis quedan dentro de su grupo y el parser
+    los reporta igual que al parsear el programa completo. Un grupo de más de
+    `max_tokens` tokens es un error (fase 'lexical') antes de terminar de
+    juntarlo; con `reader` (el TokenReader que produce `tokens`) también lo
+    es uno que abarca más de `max_bytes` bytes de la entrada, contados desde
+    el comienzo del fragmento de su primer token hasta el final del
+    fragmento del último.
+    """
+    group = []
+    depth = 0
+    prev = None
+    start = 0
+    if reader is None:
+        max_bytes = None
+    for tok in tokens:
+        t = tok.type
+        if group and depth == 0 and prev in _FACTOR_END and t in _FACTOR_START:
+            yield group
+            group = []
+        if max_bytes:
+            if not group:
+                start = reader.start
+            elif reader.offset - start > max_bytes:
+                raise StreamError('lexical', BudgetExceeded('source_bytes', reader.offset - start, max_bytes))
+        group.append(tok)
+        if max_tokens and len(group) > max_tokens:
+            raise StreamError('lexical', BudgetExceeded('tokens', len(group), max_tokens))
+        if t == 'LPAREN':
+            depth += 1
+        elif t == 'RPAREN':
+            depth -= 1
+        elif t == 'SEMI':
+            yield group
+            group = []
+            depth = 0
+        prev = t
+    if group:
+        yield group
+
+
+def iter_statements(tokens):
+    """Parsea las sentencias de un flujo de tokens una a una (sólo AST)."""
+    return _parsed(tokens)
+
+
+def _parsed(tokens, budget=None, reader=None):
+    # con `budget`, cada grupo se parsea con su propio contador de nodos
+    max_tokens = budget.max_tokens if budget is not None else None
+    max_bytes = budget.max_source_bytes if budget is not None else None
+    for group in iter_statement_tokens(tokens, max_tokens, max_bytes, reader):
+        p = Parser(group, build_tree=False, budget=budget)
+        try:
+            while p.peek() is not None:
+                stmt, _ = p.parse_statement()
+                yield stmt
+        except Exception as e:
+            raise StreamError('syntactic', e)
+
+
+def _lexical(tokens):
+    # etiqueta los errores del lexer antes de que lleguen al parser
+    try:
+        yield from tokens
+    except Exception as e:
+        raise StreamError('lexical', e)
+
+
+def run_stream(source, chunk_size=DEFAULT_CHUNK_SIZE, budget=None):
+    """Compila y evalúa `source` sentencia por sentencia.
+
+    `budget` (compiler.limits.Budget, opcional) acota el stream: su deadline
+    el total y sus otros límites cada sentencia (ver la descripción del
+    módulo).
+
+    Produce diccionarios (uno por línea en la salida JSON):
+      - {'index': i, 'result': valor} por cada sentencia evaluada
+      - {'index': i, 'errors': [...]} si la sentencia tiene errores semánticos;
+        desde ese punto ya no se evalúa (como en el pipeline normal, que no
+        evalúa programas con errores) pero se siguen reportando errores
+      - {'error': mensaje, 'phase': fase} si el lexeo, parseo o la evaluación
+        fallan (también si un resultado no se puede escribir como JSON); si
+        se agotó el presupuesto, además 'budget': {limit, value, max}. El
+        stream termina ahí
+      - {'done': True, 'statements': n, 'ok': bool} al final
+    """
+    analyzer = semantic.Analyzer()
+    env = {}
+    index = 0
+    ok = True
+    max_pending = budget.max_source_bytes if budget is not None else None
+    reader = TokenReader(source, chunk_size, max_pending)
+    try:
+        for stmt in _parsed(_lexical(reader), budget, reader):
+            analyzer.visit(stmt)
+            if analyzer.errors:
+                ok = False
+                yield {'index': index, 'errors': analyzer.errors}
+                analyzer.errors = []
+            elif ok:
+                try:
+                    value = evaluator.Evaluator(budget, env).eval(stmt)
+                    check_text(value)
+                except Exception as e:
+                    raise StreamError('runtime', e)
+                yield {'index': index, 'result': value}
+            index += 1
+    except StreamError as e:
+        ok = False
+        record = {'error': str(e), 'phase': e.phase}
+        if isinstance(e.cause, BudgetExceeded):
+            record['budget'] = e.cause.to_dict()
+        yield record
+    yield {'done': True, 'statements': index, 'ok': ok}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog='python -m compiler.stream',
+                                 description='Compila y evalúa un programa en streaming (una línea JSON por sentencia).')
+    ap.add_argument('path', nargs='?', default='-', help="archivo de entrada ('-' para stdin)")
+    ap.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='tamaño de bloque de lectura en bytes')
+    args = ap.parse_args(argv)
+
+    out = sys.stdout
+    ok = True
+    if args.path == '-':
+        records = run_stream(sys.stdin.buffer, args.chunk_size)
+        f = mm = None
+    else:
+        f = open(args.path, 'rb')
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # archivo vacío: no se puede mapear
+            mm = None
+        records = run_stream(mm if mm is not None else f, args.chunk_size)
+    try:
+        for record in records:
+            if record.get('done'):
+                ok = record['ok']
+            out.write(json.dumps(record) + '\n')
+    finally:
+        if mm is not None:
+            mm.close()
+        if f is not None:
+            f.close()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
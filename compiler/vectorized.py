@@ -0,0 +1,165 @@
+"""Evaluación vectorizada de un programa sobre muchas filas de entrada.
+
+En lugar de evaluar el programa una vez por fila, cada variable libre recibe
+una columna (un array con un valor por fila) y cada BinOp se evalúa como una
+única operación de NumPy sobre todas las filas. El resultado es una columna
+por sentencia.
+
+Semántica (la del evaluador por árbol, fila a fila, salvo donde se indica):
+- Las variables sin columna ni asignación previa valen 0, como en Evaluator.
+- Tipos: las columnas y literales enteros (y booleanos) son int64 y los
+  reales float64. Una operación con algún float64 da float64 y la división
+  siempre da float64 (como `/` en Python).
+- Los enteros no tienen tamaño arbitrario: si un literal o el resultado de
+  +, - o * no cabe en int64 se lanza OverflowError en lugar de desbordar.
+- División por cero: con zero_division='raise' (por defecto) se lanza
+  ZeroDivisionError si algún divisor es 0, como al evaluar fila a fila; con
+  zero_division='nan' esas filas dan NaN y el resto se calcula normalmente.
+
+NumPy es una dependencia opcional: sólo hace falta para usar este módulo.
+"""
+from compiler import flatast
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+ZERO_DIVISION = ('raise', 'nan')
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError('La evaluación vectorizada requiere numpy (pip install numpy)')
+
+
+def _column(name, values):
+    """Convierte una columna de entrada a int64 o float64."""
+    arr = np.asarray(values)
+    if arr.ndim != 1:
+        raise ValueError(f"La columna '{name}' debe ser unidimensional")
+    kind = arr.dtype.kind
+    if kind == 'f':
+        return arr.astype(np.float64, copy=False)
+    if kind in 'biu':
+        if kind == 'u' and arr.size and arr.max() > np.iinfo(np.int64).max:
+            raise OverflowError(f"La columna '{name}' tiene valores fuera de int64")
+        return arr.astype(np.int64, copy=False)
+    raise TypeError(f"La columna '{name}' debe ser numérica (dtype {arr.dtype})")
+
+
+def _literal(value):
+    if isinstance(value, float):
+        return np.float64(value)
+    if not -2 ** 63 <= value < 2 ** 63:
+        raise OverflowError(f'El literal {value} no cabe en int64')
+    return np.int64(value)
+
+
+def _is_int(x):
+    return np.asarray(x).dtype.kind == 'i'
+
+
+class VectorEvaluator:
+    """Evalúa programas sobre columnas (ver la descripción del módulo).
+
+    - env: nombre -> columna (o escalar NumPy) con el valor actual
+    - rows: número de filas de las columnas
+    - zero_division: 'raise' o 'nan'
+    """
+    def __init__(self, columns=None, rows=None, zero_division='raise'):
+        _require_numpy()
+        if zero_division not in ZERO_DIVISION:
+            raise ValueError(f'zero_division debe ser uno de {ZERO_DIVISION}: {zero_division!r}')
+        self.zero_division = zero_division
+        self.env = {name: _column(name, col) for name, col in (columns or {}).items()}
+        lengths = {len(col) for col in self.env.values()}
+        if len(lengths) > 1:
+            raise ValueError(f'Las columnas tienen distinto número de filas: {sorted(lengths)}')
+        if rows is None:
+            rows = lengths.pop() if lengths else 1
+        elif lengths and rows not in lengths:
+            raise ValueError(f'rows={rows} no coincide con el largo de las columnas')
+        self.rows = rows
+
+    def eval(self, program):
+        """Evalúa un Program (o FlatProgram); devuelve una columna por sentencia.
+
+        Los nodos se recorren en post-orden sobre la forma plana del
+        programa; cada valor intermedio se libera en cuanto lo usa su padre.
+        """
+        flat = program if isinstance(program, flatast.FlatProgram) else flatast.flatten(program)
+        env = self.env
+        consts = [_literal(v) for v in flat.consts]
+        names = flat.names
+        values = [None] * len(flat.kinds)
+        i = 0
+        for k, a, l, r in zip(flat.kinds, flat.args, flat.lefts, flat.rights):
+            if k == flatast.VAR:
+                values[i] = env.get(names[a], np.int64(0))
+            elif k == flatast.NUMBER:
+                values[i] = consts[a]
+            elif k == flatast.BINOP:
+                values[i] = self.binop(flatast.OPS[a], values[l], values[r])
+                values[l] = values[r] = None
+            else:
+                env[names[a]] = values[i] = values[l]
+                values[l] = None
+            i += 1
+        return [self._full(values[s]) for s in flat.statements]
+
+    def _full(self, value):
+        # las sentencias que no dependen de ninguna columna dan un escalar
+        if np.ndim(value) == 0:
+            return np.full(self.rows, value)
+        return value
+
+    def binop(self, op, left, right):
+        both_int = _is_int(left) and _is_int(right)
+        if op == 'DIV':
+            return self._divide(left, right)
+        with np.errstate(over='ignore'):
+            if op == 'PLUS':
+                result = np.add(left, right)
+                if both_int and np.any((left ^ result) & (right ^ result) < 0):
+                    raise OverflowError('Desbordamiento de int64 en una suma')
+            elif op == 'MINUS':
+                result = np.subtract(left, right)
+                if both_int and np.any((left ^ right) & (left ^ result) < 0):
+                    raise OverflowError('Desbordamiento de int64 en una resta')
+            else:
+                result = np.multiply(left, right)
+                if both_int and self._mul_overflows(left, right, result):
+                    raise OverflowError('Desbordamiento de int64 en una multiplicación')
+        return result
+
+    def _mul_overflows(self, left, right, result):
+        # el producto es correcto sii result / left == right (con left != 0);
+        # -1 * INT64_MIN es el único caso que la división no detecta
+        nonzero = left != 0
+        with np.errstate(divide='ignore', over='ignore'):
+            back = np.floor_divide(result, np.where(nonzero, left, 1))
+        wrong = nonzero & ((back != right) | ((left == -1) & (right == np.iinfo(np.int64).min)))
+        return bool(np.any(wrong))
+
+    def _divide(self, left, right):
+        zero = right == 0
+        if np.any(zero):
+            if self.zero_division == 'raise':
+                raise ZeroDivisionError('division by zero')
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = np.true_divide(left, right)
+            return np.where(zero, np.nan, result)
+        with np.errstate(over='ignore'):
+            return np.true_divide(left, right)
+
+
+def evaluate_columns(program, columns=None, rows=None, zero_division='raise'):
+    """Función de conveniencia: evalúa `program` sobre `columns`.
+
+    - program: Program (compiler.ast) o FlatProgram
+    - columns: dict nombre -> secuencia/array con un valor por fila
+    - rows: número de filas si no hay columnas (por defecto 1)
+    Devuelve una lista con un array de NumPy por sentencia.
+    """
+    return VectorEvaluator(columns, rows, zero_division).eval(program)
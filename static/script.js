@@ -79,60 +79,180 @@ document.addEventListener('click', (e)=>{
   });
 });
 
-runBtn.addEventListener('click', async () => {
-  const code = codeTA.value;
-  // show spinner and disable inputs
-  runBtn.disabled = true;
-  codeTA.disabled = true;
+// --- Compilación incremental ---
+// El servidor guarda el documento (tokens, AST y parse-tree por sentencia);
+// tras el primer envío sólo mandamos la edición respecto al último texto
+// enviado y el servidor re-procesa únicamente la región afectada.
+const docId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : String(Math.random()).slice(2);
+let docVersion = null;
+let lastSent = null;
+
+// Edición mínima (prefijo y sufijo comunes) que transforma prev en next
+function computeEdit(prev, next){
+  let start = 0;
+  const max = Math.min(prev.length, next.length);
+  while(start < max && prev.charCodeAt(start) === next.charCodeAt(start)) start++;
+  let endPrev = prev.length, endNext = next.length;
+  while(endPrev > start && endNext > start && prev.charCodeAt(endPrev - 1) === next.charCodeAt(endNext - 1)){
+    endPrev--; endNext--;
+  }
+  return {start, end: endPrev, text: next.slice(start, endNext)};
+}
+
+async function postCompile(payload){
+  const res = await fetch('/compile', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json'},
+    body: JSON.stringify(payload)
+  });
+  return {status: res.status, data: await res.json()};
+}
+
+async function compileDocument(code){
+  // los índices de JS cuentan unidades UTF-16: con caracteres fuera del BMP
+  // no coinciden con los del servidor, así que enviamos el texto completo
+  const astral = /[\uD800-\uDFFF]/;
+  let res;
+  if(docVersion !== null && lastSent !== null && !astral.test(code) && !astral.test(lastSent)){
+    res = await postCompile({doc: docId, version: docVersion, edit: computeEdit(lastSent, code)});
+  }
+  if(!res || res.status === 409){
+    // primera compilación o versión desincronizada: reenviar todo
+    res = await postCompile({doc: docId, code});
+  }
+  docVersion = (res.data.version !== undefined) ? res.data.version : null;
+  lastSent = code;
+  return res.data;
+}
+
+// --- Render de las secciones de la respuesta ---
+function renderTokens(data){
+  document.getElementById('tokens').textContent = data.lex ? (Array.isArray(data.lex) ? data.lex.join('\n') : data.lex) : JSON.stringify(data.tokens || {}, null, 2);
+}
+
+function renderTree(data){
+  // parse / ast
+  if (data.parse_text_centered) {
+    document.getElementById('ast').textContent = data.parse_text_centered;
+  } else if (data.parse_text) {
+    document.getElementById('ast').textContent = data.parse_text;
+  } else {
+    document.getElementById('ast').textContent = JSON.stringify(data.ast || {}, null, 2);
+  }
+}
+
+function renderSemantic(sem){
+  let out = '';
+  out += `Verificación: ${sem.ok ? 'OK' : 'FALLÓ'} - ${sem.message}\n\n`;
+  out += 'Symbols:\n';
+  for (const k of Object.keys(sem.symbols || {})) {
+    out += `  ${k}\n`;
+  }
+  out += '\nErrors:\n';
+  if (sem.errors && sem.errors.length) {
+    for (const e of sem.errors) out += `  - ${e}\n`;
+  } else {
+    out += '  (none)\n';
+  }
+  document.getElementById('semantic').textContent = out;
+}
+
+function badge(ok, text){
+  const cls = ok ? 'badge ok' : 'badge err';
+  return `<span class="${cls}">${text}</span>`;
+}
+
+function renderValidation(data){
+  const v = data.validation;
+  const el = document.getElementById('validation');
+  el.innerHTML = '';
+  el.innerHTML += `Léxico: ${badge(v.lexical.ok, v.lexical.ok ? 'OK' : 'FALLÓ')} - ${v.lexical.message}<br>`;
+  el.innerHTML += `Sintáctico: ${badge(v.syntactic.ok, v.syntactic.ok ? 'OK' : 'FALLÓ')} - ${v.syntactic.message}<br>`;
+  el.innerHTML += `Semántico: ${badge(v.semantic.ok, v.semantic.ok ? 'OK' : 'FALLÓ')} - ${v.semantic.message}`;
+  // compilación cortada por un límite de recursos (ver compiler/limits.py)
+  if (data.budget) {
+    el.innerHTML += `<br>Límites: ${badge(false, 'EXCEDIDO')} - ${data.error}`;
+  }
+}
+
+// --- Compilación en vivo ---
+// Un único stream SSE por pestaña (/live/<docId>/events) recibe cada etapa
+// de la compilación (tokens, semántico, parse-tree, resultado) apenas el
+// servidor la termina. Tras una pausa al escribir se envía el texto con un
+// número de versión creciente; el servidor cancela la compilación de la
+// versión anterior y aquí se ignoran los eventos de versiones viejas.
+const liveToggle = document.getElementById('live');
+const LIVE_DEBOUNCE_MS = 300;
+const LIVE_SECTIONS = ['lex', 'parse_text_centered', 'semantic', 'validation', 'result'];
+let liveSource = null;
+let liveVersion = 0;
+let liveTimer = null;
+
+function openLive(){
+  if(liveSource) return;
+  liveSource = new EventSource(`/live/${docId}/events`);
+  liveSource.addEventListener('stage', (e) => {
+    const data = JSON.parse(e.data);
+    if(data.version !== liveVersion) return;
+    if(data.stage === 'lex') renderTokens(data);
+    else if(data.stage === 'semantic') renderSemantic(data.semantic);
+    else if(data.stage === 'render') renderTree(data);
+    else if(data.stage === 'result') status.textContent = 'Resultado: ' + JSON.stringify(data.result);
+  });
+  liveSource.addEventListener('done', (e) => {
+    const data = JSON.parse(e.data);
+    if(data.version !== liveVersion) return;
+    spinner.style.display = 'none';
+    if(data.validation) renderValidation(data);
+    if(!data.ok) status.textContent = data.error || '';
+  });
+}
+
+async function sendLive(){
+  openLive();
+  const version = ++liveVersion;
   spinner.style.display = 'inline-block';
-  status.textContent = 'Compilando...';
   try{
-    const res = await fetch('/compile', {
+    const res = await fetch(`/live/${docId}/compile`, {
       method: 'POST',
       headers: {'Content-Type': 'application/json'},
-      body: JSON.stringify({code})
+      body: JSON.stringify({version, code: codeTA.value, sections: LIVE_SECTIONS})
     });
     const data = await res.json();
-    // tokens
-    document.getElementById('tokens').textContent = data.lex ? (Array.isArray(data.lex) ? data.lex.join('\n') : data.lex) : JSON.stringify(data.tokens || {}, null, 2);
-    // parse / ast
-    if (data.parse_text_centered) {
-      document.getElementById('ast').textContent = data.parse_text_centered;
-    } else if (data.parse_text) {
-      document.getElementById('ast').textContent = data.parse_text;
-    } else {
-      document.getElementById('ast').textContent = JSON.stringify(data.ast || {}, null, 2);
-    }
-    // semantic
-    if (data.semantic) {
-      const sem = data.semantic;
-      let out = '';
-      out += `Verificación: ${sem.ok ? 'OK' : 'FALLÓ'} - ${sem.message}\n\n`;
-      out += 'Symbols:\n';
-      for (const k of Object.keys(sem.symbols || {})) {
-        out += `  ${k}\n`;
-      }
-      out += '\nErrors:\n';
-      if (sem.errors && sem.errors.length) {
-        for (const e of sem.errors) out += `  - ${e}\n`;
-      } else {
-        out += '  (none)\n';
-      }
-      document.getElementById('semantic').textContent = out;
+    if(!data.ok && version === liveVersion){
+      spinner.style.display = 'none';
+      status.textContent = data.error || '';
     }
-    // validation badges
-    if (data.validation) {
-      const v = data.validation;
-      function badge(ok, text){
-        const cls = ok ? 'badge ok' : 'badge err';
-        return `<span class="${cls}">${text}</span>`;
-      }
-      const el = document.getElementById('validation');
-      el.innerHTML = '';
-      el.innerHTML += `Léxico: ${badge(v.lexical.ok, v.lexical.ok ? 'OK' : 'FALLÓ')} - ${v.lexical.message}<br>`;
-      el.innerHTML += `Sintáctico: ${badge(v.syntactic.ok, v.syntactic.ok ? 'OK' : 'FALLÓ')} - ${v.syntactic.message}<br>`;
-      el.innerHTML += `Semántico: ${badge(v.semantic.ok, v.semantic.ok ? 'OK' : 'FALLÓ')} - ${v.semantic.message}`;
+  }catch(err){
+    if(version === liveVersion){
+      spinner.style.display = 'none';
+      status.textContent = 'Error: ' + err;
     }
+  }
+}
+
+codeTA.addEventListener('input', () => {
+  if(!liveToggle.checked || !window.EventSource) return;
+  clearTimeout(liveTimer);
+  liveTimer = setTimeout(sendLive, LIVE_DEBOUNCE_MS);
+});
+
+runBtn.addEventListener('click', async () => {
+  const code = codeTA.value;
+  // una compilación pendiente del modo en vivo ya no aplica
+  clearTimeout(liveTimer);
+  liveVersion++;
+  // show spinner and disable inputs
+  runBtn.disabled = true;
+  codeTA.disabled = true;
+  spinner.style.display = 'inline-block';
+  status.textContent = 'Compilando...';
+  try{
+    const data = await compileDocument(code);
+    renderTokens(data);
+    renderTree(data);
+    if (data.semantic) renderSemantic(data.semantic);
+    if (data.validation) renderValidation(data);
   }catch(err){
     document.getElementById('tokens').textContent = 'Error: ' + err;
   }finally{
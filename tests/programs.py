@@ -0,0 +1,49 @@
+"""Programas aleatorios para las pruebas diferenciales.
+
+A diferencia de benchmarks/generators.py, estos programas pueden tener
+errores: variables usadas antes de asignarse, divisiones por cero, literales
+reales que dan -0.0, expresiones sin asignar. Sirven para comparar dos
+implementaciones que deben coincidir en todo, incluidos los errores.
+"""
+import random
+
+NAMES = ('a', 'b', 'c', 'd')
+LITERALS = ('0', '1', '2', '7', '0.0', '1.5', '3.0')
+OPS = '+-*/'
+
+
+def expression(rng, size):
+    if size <= 1:
+        return rng.choice(NAMES) if rng.random() < 0.5 else rng.choice(LITERALS)
+    left = rng.randint(1, size - 1)
+    text = f'{expression(rng, left)} {rng.choice(OPS)} {expression(rng, size - left)}'
+    return f'({text})' if rng.random() < 0.4 else text
+
+
+def statement(rng, size=6):
+    expr = expression(rng, rng.randint(1, size))
+    return f'{rng.choice(NAMES)} = {expr}' if rng.random() < 0.8 else expr
+
+
+def program(rng, statements=8, size=6):
+    """Código de `statements` sentencias separadas por saltos de línea."""
+    return '\n'.join(statement(rng, size) for _ in range(rng.randint(1, statements)))
+
+
+def defined(rng, statements=8, size=6):
+    """Como program(), pero con todas las variables asignadas al comienzo."""
+    prefix = [f'{name} = {rng.choice(LITERALS[1:])}' for name in NAMES]
+    return '\n'.join(prefix) + '\n' + program(rng, statements, size)
+
+
+def outcome(func, *args, **kwargs):
+    """Resultado de `func` comparable con repr (distingue 1, 1.0 y -0.0), o
+    el tipo de la excepción que lanzó."""
+    try:
+        return repr(func(*args, **kwargs))
+    except Exception as e:
+        return type(e).__name__
+
+
+def seeds(n):
+    return [random.Random(seed) for seed in range(n)]
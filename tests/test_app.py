@@ -0,0 +1,126 @@
+"""Pruebas de los endpoints de app.py."""
+import pytest
+
+import app as app_module
+
+# un entero de ~7800 dígitos: más de los que Python convierte a texto
+HUGE_CODE = 'x = 3\n' + 'x = x*x\n' * 14
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # sin límite de bits, para que el entero llegue hasta la serialización
+    monkeypatch.setitem(app_module.app.config, 'MAX_INT_BITS', 0)
+    app_module.compile_cache.clear()
+    return app_module.app.test_client()
+
+
+def test_compile_huge_int_is_json_error(client):
+    r = client.post('/compile', json={'code': HUGE_CODE})
+    assert r.status_code == 400
+    assert r.is_json
+    assert r.json['ok'] is False
+    assert 'serializar' in r.json['error']
+    # el error no queda en la caché
+    r = client.post('/compile', json={'code': HUGE_CODE})
+    assert r.status_code == 400
+    assert r.headers.get('X-Cache') is None
+
+
+def test_stream_huge_int_ends_with_done(client):
+    r = client.post('/compile/stream', data=HUGE_CODE + 'y = 1\n')
+    records = [app_module.app.json.loads(line) for line in r.data.decode().splitlines()]
+    assert records[-2]['phase'] == 'runtime'
+    assert records[-1] == {'done': True, 'statements': 14, 'ok': False}
+    assert [rec['index'] for rec in records[:-2]] == list(range(14))
+
+
+def test_batch_huge_int_only_fails_its_item(client):
+    r = client.post('/compile/batch', json={'programs': ['a = 1 + 2', HUGE_CODE, 'b = 4']})
+    assert r.status_code == 200
+    results = r.json['results']
+    assert results[0]['result'] == [3]
+    assert results[1]['ok'] is False and 'serializar' in results[1]['error']
+    assert results[2]['result'] == [4]
+
+
+def test_default_int_bits_limit_catches_unserializable_ints():
+    client = app_module.app.test_client()
+    r = client.post('/compile', json={'code': HUGE_CODE})
+    assert r.status_code == 400
+    assert r.json['budget']['limit'] == 'int_bits'
+
+
+def test_stream_has_a_budget():
+    r = app_module.app.test_client().post('/compile/stream', data=HUGE_CODE)
+    records = [app_module.app.json.loads(line) for line in r.data.decode().splitlines()]
+    assert records[-2]['budget']['limit'] == 'int_bits'
+    assert records[-1]['ok'] is False
+
+
+def test_deep_parentheses_count_against_depth_limit():
+    depth = app_module.app.config['MAX_AST_DEPTH'] + 1
+    r = app_module.app.test_client().post('/compile', json={'code': '(' * depth + 'a' + ')' * depth})
+    assert r.status_code == 400
+    assert r.json['budget']['limit'] == 'depth'
+
+
+def test_session_huge_int_does_not_advance_the_session(client):
+    sid = client.post('/session', json={'code': 'x = 3'}).json['session']
+    r = client.post(f'/session/{sid}', json={'code': 'x = x*x\n' * 14})
+    assert r.status_code == 400
+    assert r.json['ok'] is False and r.json['phase'] == 'runtime'
+    r = client.post(f'/session/{sid}', json={'code': 'x'})
+    assert r.json['result'] == [3]
+    assert r.json['statements'] == 2
+
+
+@pytest.mark.parametrize('code', [5, None, ['a = 1'], {'a': 1}])
+def test_compile_rejects_non_string_code(client, code):
+    r = client.post('/compile', json={'code': code})
+    assert r.status_code == 400
+    assert r.json == {'ok': False, 'error': '`code` debe ser un string'}
+
+
+@pytest.mark.parametrize('doc', [['x'], {'a': 1}, 1.5])
+def test_compile_rejects_unhashable_doc(client, doc):
+    r = client.post('/compile', json={'doc': doc, 'code': 'a = 1'})
+    assert r.status_code == 400
+    assert r.json == {'ok': False, 'error': '`doc` debe ser un string o un entero'}
+
+
+def test_document_edit_over_size_limit_is_not_applied(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MAX_SOURCE_BYTES', 32)
+    r = client.post('/compile', json={'doc': 'size', 'code': 'a = 1'})
+    assert r.json['ok'] and r.json['version'] == 0
+    r = client.post('/compile', json={'doc': 'size', 'version': 0,
+                                      'edit': {'start': 5, 'end': 5, 'text': ' + 1' * 10}})
+    assert r.status_code == 400
+    assert r.json['budget']['limit'] == 'source_bytes'
+    assert r.json['version'] == 0
+    r = client.post('/compile', json={'doc': 'size', 'version': 0,
+                                      'edit': {'start': 5, 'end': 5, 'text': ' + 1'}})
+    assert r.json['ok'] and r.json['result'] == [2]
+    assert r.json['version'] == 1
+
+
+@pytest.mark.parametrize('options', [{'sections': 5}, {'sections': [1]}, {'render': 5}, {'tokenizer': []}])
+def test_compile_rejects_invalid_option_types(client, options):
+    r = client.post('/compile', json=dict(options, code='a = 1'))
+    assert r.status_code == 400
+    assert r.json['ok'] is False
+
+
+def test_document_front_end_has_a_budget(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MAX_AST_DEPTH', 50)
+    deep = '(' * 100 + 'a' + ')' * 100
+    r = client.post('/compile', json={'doc': 'deep', 'code': 'x = ' + deep})
+    assert r.status_code == 400
+    assert r.json['budget']['limit'] == 'depth'
+    assert r.json['validation']['syntactic']['budget']['limit'] == 'depth'
+    r = client.post('/compile', json={'doc': 'deep', 'code': 'x = 1'})
+    assert r.json['ok'] and r.json['version'] == 0
+    r = client.post('/compile', json={'doc': 'deep', 'version': 0, 'edit': {'start': 4, 'end': 5, 'text': deep}})
+    assert r.status_code == 400
+    assert r.json['budget']['limit'] == 'depth'
+    assert r.json['version'] == 0
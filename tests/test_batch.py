@@ -0,0 +1,30 @@
+"""Compilación por lotes (compiler.batch): mismos payloads que compilar cada
+programa por separado, en el mismo orden."""
+import pytest
+
+from compiler import batch, pipeline
+from tests.programs import program, seeds
+
+
+def without_trace(payload):
+    return {k: v for k, v in payload.items() if k != 'trace'}
+
+
+def sequential(programs, **options):
+    return [without_trace(pipeline.compile_source(code, **options)[0]) for code in programs]
+
+
+@pytest.mark.parametrize('workers, chunk_size', [(1, None), (2, 3)])
+def test_batch_matches_sequential_compile(workers, chunk_size):
+    programs = [program(rng) for rng in seeds(40)]
+    options = {'backend': 'vm', 'sections': ('result', 'semantic', 'validation')}
+    results = batch.compile_batch(programs, workers, chunk_size, **options)
+    assert [without_trace(r) for r in results] == sequential(programs, **options)
+
+
+def test_each_program_has_its_own_budget():
+    programs = ['a = 1 + 2', 'x = 3\n' + 'x = x * x\n' * 20, 'b = 4']
+    results = batch.compile_batch(programs, 2, 1, limits={'max_int_bits': 1000}, sections=('result',))
+    assert results[0] == {'ok': True, 'result': [3]}
+    assert results[1]['budget']['limit'] == 'int_bits'
+    assert results[2] == {'ok': True, 'result': [4]}
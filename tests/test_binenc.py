@@ -0,0 +1,159 @@
+"""Formato binario (compiler.binenc) y almacén de artefactos
+(compiler.artifacts): lo que se guarda se vuelve a leer idéntico."""
+import gc
+import threading
+
+import pytest
+
+from compiler import artifacts, ast, binenc, flatast, lexer, parser, semantic
+from compiler.parser import ParseNode
+from tests.programs import program, seeds
+
+
+def test_encoding_does_not_pause_gc(monkeypatch):
+    # el GC es global al proceso: sólo lo pausa quien usa paused_gc
+    calls = []
+    monkeypatch.setattr(binenc.gc, 'disable', lambda: calls.append('disable'))
+    tokens = lexer.lex('a = 1 + 2')
+    assert binenc.loads_tokens(binenc.dumps_tokens(tokens)) == tokens
+    assert calls == []
+
+
+def test_paused_gc_restores_state_after_nested_pauses():
+    assert gc.isenabled()
+    entered, release = threading.Event(), threading.Event()
+
+    def other():
+        with binenc.paused_gc():
+            entered.set()
+            release.wait()
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    entered.wait()
+    with binenc.paused_gc():
+        assert not gc.isenabled()
+    # el otro hilo sigue en su pausa
+    assert not gc.isenabled()
+    release.set()
+    thread.join()
+    assert gc.isenabled()
+    gc.disable()
+    try:
+        with binenc.paused_gc():
+            pass
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+# --- ida y vuelta ---
+
+def front(code):
+    tokens = lexer.lex(code)
+    program_node, root = parser.parse(tokens)
+    return tokens, program_node, root, semantic.analyze(program_node)
+
+
+def tree_shape(node):
+    # repr distingue 1, 1.0, 0.0 y -0.0 dentro de las hojas
+    if isinstance(node, ParseNode):
+        return (repr(node.label), [tree_shape(c) for c in node.children])
+    return repr(node)
+
+
+# literales que el lexer no produce: enteros de más de 64 bits (también
+# negativos), -0.0 y reales especiales
+SPECIAL = ast.Program([
+    ast.Assign('a', ast.Number(-0.0)),
+    ast.Assign('b', ast.Number(2 ** 64)),
+    ast.BinOp(ast.Number(-(2 ** 200)), 'MUL', ast.Number(2 ** 63 - 1)),
+    ast.BinOp(ast.Number(float('inf')), 'PLUS', ast.Number(1e-300)),
+    ast.BinOp(ast.Number(1), 'DIV', ast.Number(1.0)),
+])
+
+
+def test_program_round_trip():
+    programs = [front(program(rng))[1] for rng in seeds(200)] + [SPECIAL]
+    for program_node in programs:
+        data = binenc.dumps_program(program_node)
+        assert repr(binenc.loads_program(data).to_dict()) == repr(program_node.to_dict())
+        assert repr(binenc.loads_program(data, flat=True).to_dict()) == repr(program_node.to_dict())
+    flat = flatast.flatten(SPECIAL)
+    assert repr(binenc.loads_program(binenc.dumps_program(flat)).to_dict()) == repr(SPECIAL.to_dict())
+
+
+def test_tokens_tree_and_semantic_round_trip():
+    codes = [program(rng) for rng in seeds(200)]
+    codes.append('x = 123456789012345678901234567890 * 2.5\ny = x / 0.0 + z')
+    for code in codes:
+        tokens, _, root, sem = front(code)
+        enc = binenc.Encoder()
+        enc.tokens(tokens)
+        enc.parse_tree(root)
+        enc.semantic(sem)
+        dec = binenc.Decoder(enc.getvalue())
+        assert repr(dec.tokens()) == repr(tokens)
+        assert tree_shape(dec.parse_tree()) == tree_shape(root)
+        assert dec.semantic() == sem
+
+
+def test_truncated_or_corrupt_data_is_format_error():
+    data = binenc.dumps_program(SPECIAL)
+    for cut in range(len(data)):
+        with pytest.raises(ValueError):
+            binenc.loads_program(data[:cut])
+    with pytest.raises(binenc.FormatError):
+        binenc.loads_program(b'XXXX' + data[4:])
+
+
+# --- almacén de artefactos ---
+
+def save(store, code):
+    tokens, program_node, root, sem = front(code)
+    assert store.save(code, tokens, program_node, root, sem)
+    return tokens, program_node, root, sem
+
+
+def test_artifact_store_round_trip(tmp_path):
+    store = artifacts.ArtifactStore(str(tmp_path))
+    code = 'a = 1.5 * 0.0\nb = 99999999999999999999999 + a\nc = d'
+    tokens, program_node, root, sem = save(store, code)
+    for flat in (False, True):
+        artifact = store.load(code, flat=flat)
+        assert repr(artifact.tokens) == repr(tokens)
+        assert repr(artifact.program.to_dict()) == repr(program_node.to_dict())
+        assert tree_shape(artifact.parse_root) == tree_shape(root)
+        assert artifact.semantic == sem
+    assert store.load('otro = 1') is None
+    assert store.stats() == {'hits': 2, 'misses': 1, 'writes': 1, 'errors': 0}
+
+
+def test_artifact_without_tree_is_a_miss_when_tree_is_needed(tmp_path):
+    store = artifacts.ArtifactStore(str(tmp_path))
+    tokens, program_node, _, sem = front('a = 1')
+    store.save('a = 1', tokens, program_node, None, sem)
+    assert store.load('a = 1', tree=True) is None
+    assert store.load('a = 1', tree=False).parse_root is None
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:len(data) // 2],                       # truncado
+    lambda data: data[:40] + bytes(b ^ 0xFF for b in data[40:]),  # bytes cambiados
+    lambda data: bytes(32) + data[32:],                       # hash de otro código
+    lambda data: b'',
+])
+def test_damaged_artifact_is_a_miss(tmp_path, damage):
+    store = artifacts.ArtifactStore(str(tmp_path))
+    code = 'a = 1 + 2\nb = a * 3'
+    save(store, code)
+    path = store.path(store.digest(code))
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(damage(data))
+    assert store.load(code) is None
+    assert store.stats()['misses'] == 1
+    # se reescribe en la próxima compilación
+    save(store, code)
+    assert store.load(code) is not None
@@ -0,0 +1,29 @@
+"""Backend de bytecode (compiler.bytecode): mismos resultados que el Evaluator."""
+import pytest
+
+from compiler import bytecode, evaluator, lexer, limits, parser
+from tests.programs import outcome, program, seeds
+
+
+def parse(code):
+    return parser.parse(lexer.lex(code), build_tree=False)[0]
+
+
+def test_vm_matches_tree_evaluator():
+    for rng in seeds(500):
+        ast_node = parse(program(rng))
+        assert outcome(evaluator.evaluate, ast_node, 'vm') == outcome(evaluator.evaluate, ast_node, 'tree')
+
+
+def test_vm_env_is_updated_like_evaluator():
+    ast_node = parse('a = b + 1\nc = a * 2\na')
+    env = {'b': 4}
+    assert bytecode.run(bytecode.compile_ast(ast_node), env) == [5, 10, 5]
+    assert env == {'a': 5, 'b': 4, 'c': 10}
+
+
+def test_vm_respects_budget():
+    ast_node = parse('x = 3\n' + 'x = x * x\n' * 20)
+    with pytest.raises(limits.BudgetExceeded) as info:
+        evaluator.evaluate(ast_node, 'vm', limits.Budget(max_int_bits=1000))
+    assert info.value.limit == 'int_bits'
@@ -0,0 +1,130 @@
+"""Programas muy anidados: parser, evaluador, análisis semántico y serialización.
+
+Todas las etapas recorren el AST con pilas explícitas, así que 100k niveles de
+paréntesis o una cadena a+a+... de 100k operandos no tocan el límite de
+recursión. En entradas chicas el resultado se compara con una implementación
+recursiva de referencia (el parser por descenso recursivo original).
+
+ParseNode.to_text no se prueba a esa profundidad: cada línea repite el
+prefijo de su nivel, así que el texto crece cuadráticamente con la
+profundidad. Se prueba en cambio el render centrado acotado.
+"""
+import json
+import random
+
+import pytest
+
+from compiler import evaluator, jsonenc, lexer, parser, render, semantic
+
+DEPTH = 100000
+
+
+def nested(depth):
+    return '(' * depth + 'a' + ')' * depth
+
+
+def chain(length):
+    return '+'.join(['a'] * length)
+
+
+# --- referencia recursiva (sólo para entradas chicas) ---
+
+def ref_parse(code):
+    # E -> T (('+'|'-') T)*, T -> F (('*'|'/') F)*, F -> num | id | '(' E ')'
+    tokens = lexer.lex(code)
+    pos = 0
+
+    def factor():
+        nonlocal pos
+        tok = tokens[pos]
+        pos += 1
+        if tok.type == 'LPAREN':
+            node = expr()
+            pos += 1
+            return node
+        if tok.type == 'NUMBER':
+            return {'type': 'Number', 'value': tok.value}
+        return {'type': 'Var', 'name': tok.value}
+
+    def binary(operand, ops):
+        nonlocal pos
+        left = operand()
+        while pos < len(tokens) and tokens[pos].type in ops:
+            op = tokens[pos].type
+            pos += 1
+            left = {'type': 'BinOp', 'op': op, 'left': left, 'right': operand()}
+        return left
+
+    def term():
+        return binary(factor, ('MUL', 'DIV'))
+
+    def expr():
+        return binary(term, ('PLUS', 'MINUS'))
+
+    return expr()
+
+
+def ref_eval(node, env):
+    if node['type'] == 'Number':
+        return node['value']
+    if node['type'] == 'Var':
+        return env.get(node['name'], 0)
+    left, right = ref_eval(node['left'], env), ref_eval(node['right'], env)
+    return {'PLUS': left + right, 'MINUS': left - right, 'MUL': left * right}[node['op']]
+
+
+def random_expr(rng, size):
+    if size <= 1:
+        return rng.choice(['a', 'b', str(rng.randint(1, 9))])
+    left = rng.randint(1, size - 1)
+    text = random_expr(rng, left) + rng.choice('+-*') + random_expr(rng, size - left)
+    return '(' + text + ')' if rng.random() < 0.5 else text
+
+
+def compile_expr(code):
+    program, _ = parser.parse(lexer.lex('a = 3\nb = 5\nx = ' + code), build_tree=False)
+    return program
+
+
+# --- entradas chicas contra la referencia ---
+
+def test_small_inputs_match_recursive_reference():
+    rng = random.Random(7)
+    for _ in range(300):
+        code = random_expr(rng, rng.randint(1, 12))
+        program = compile_expr(code)
+        expected = ref_parse(code)
+        assert program.statements[2].value.to_dict() == expected
+        assert evaluator.Evaluator().eval(program)[2] == ref_eval(expected, {'a': 3, 'b': 5})
+        assert jsonenc.dumps(program.to_dict()) == json.dumps(program.to_dict())
+
+
+def test_small_parse_tree_matches_render():
+    _, root = parser.parse(lexer.lex('x = ((a + 1) * b)'))
+    assert root.to_text_centered() == render.render_centered(root)
+    assert root.to_text().splitlines()[0] == 'S'
+
+
+# --- 100k niveles ---
+
+@pytest.mark.parametrize('code, value', [(nested(DEPTH), 3), (chain(DEPTH), 3 * DEPTH)])
+def test_deep_input_compiles(code, value):
+    program = compile_expr(code)
+    result = semantic.analyze(program)
+    assert result['ok'] and result['errors'] == []
+    assert evaluator.Evaluator().eval(program)[2] == value
+    assert evaluator.evaluate(program, backend='vm')[2] == value
+    d = program.to_dict()
+    text = jsonenc.dumps(d)
+    assert text.startswith('{"type": "Program"')
+    assert text.count('"Var"') == (1 if code.startswith('(') else DEPTH)
+
+
+def test_deep_parse_tree_bounded_render():
+    _, root = parser.parse(lexer.lex(nested(DEPTH)))
+    text = render.render_centered(root, max_depth=8, max_chain=4, max_width=160)
+    lines = text.splitlines()
+    assert lines[0].strip() == 'S'
+    assert any('... (+' in line for line in lines)
+    assert max(len(line) for line in lines) <= 160
+
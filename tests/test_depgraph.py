@@ -0,0 +1,67 @@
+"""Evaluación reactiva (compiler.depgraph): tras cada edición da lo mismo que
+evaluar el programa completo."""
+from compiler import depgraph, evaluator, incremental, lexer, limits, parser
+from tests.programs import outcome, program, seeds, statement
+
+
+def parse(code):
+    return parser.parse(lexer.lex(code), build_tree=False)[0]
+
+
+def edit_lines(rng, lines):
+    """Reemplaza, inserta, borra o mueve una sentencia."""
+    lines = list(lines)
+    action = rng.choice(('replace', 'insert', 'delete', 'move'))
+    i = rng.randrange(len(lines)) if lines else 0
+    if action == 'replace' and lines:
+        lines[i] = statement(rng)
+    elif action == 'delete' and len(lines) > 1:
+        del lines[i]
+    elif action == 'move' and lines:
+        lines.insert(rng.randint(0, len(lines) - 1), lines.pop(i))
+    else:
+        lines.insert(i, statement(rng))
+    return lines
+
+
+def test_reactive_matches_full_evaluation_after_edits():
+    for rng in seeds(200):
+        reactive = depgraph.ReactiveEvaluator()
+        lines = program(rng).split('\n')
+        for _ in range(8):
+            lines = edit_lines(rng, lines)
+            program_node = parse('\n'.join(lines))
+            assert outcome(reactive.evaluate, program_node) == outcome(evaluator.evaluate, program_node)
+
+
+def test_reactive_on_incremental_document():
+    # el documento conserva los nodos de las sentencias que no cambian
+    for rng in seeds(100):
+        doc = incremental.Document(program(rng))
+        reactive = depgraph.ReactiveEvaluator()
+        for version in range(8):
+            text = doc.text
+            start = rng.randint(0, len(text))
+            doc.apply_edit(version, start, start, rng.choice(('\n' + statement(rng) + '\n', ' + 1', ' * 2')))
+            if doc.error is not None:
+                break
+            program_node = doc.program()
+            assert outcome(reactive.evaluate, program_node) == outcome(evaluator.evaluate, parse(doc.text))
+
+
+def test_only_affected_statements_are_evaluated():
+    reactive = depgraph.ReactiveEvaluator()
+    assert reactive.evaluate(parse('a = 1\nb = 2\nc = a + 1\nd = b * 2')) == [1, 2, 2, 4]
+    assert reactive.evaluate(parse('a = 5\nb = 2\nc = a + 1\nd = b * 2')) == [5, 2, 6, 4]
+    assert (reactive.evaluated, reactive.reused) == (2, 2)
+
+
+def test_failed_evaluation_resets_state():
+    reactive = depgraph.ReactiveEvaluator()
+    reactive.evaluate(parse('a = 1\nb = a + 1'))
+    assert outcome(reactive.evaluate, parse('a = 0\nb = 1 / a')) == 'ZeroDivisionError'
+    assert reactive.evaluate(parse('a = 2\nb = 1 / a')) == [2, 0.5]
+    assert reactive.evaluated == 2
+    budget = limits.Budget(max_int_bits=100)
+    assert outcome(reactive.evaluate, parse('x = 3\n' + 'x = x * x\n' * 10), budget) == 'BudgetExceeded'
+    assert reactive.evaluate(parse('a = 2\nb = 1 / a')) == [2, 0.5]
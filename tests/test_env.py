@@ -0,0 +1,115 @@
+"""Entornos copy-on-write (compiler.env) y compile_branches: cada rama ve lo
+mismo que si se evaluara el prefijo seguido de su continuación."""
+import random
+
+from compiler import ast, env, evaluator, lexer, parser, pipeline, semantic
+from tests.programs import NAMES, defined, program, seeds
+
+
+def parse(code):
+    return parser.parse(lexer.lex(code), False)[0]
+
+
+def contents(e):
+    return {'dict': e.to_dict(), 'items': dict(e.items()), 'iter': sorted(e), 'len': len(e), 'bool': bool(e),
+            'get': {name: e.get(name, 'x') for name in NAMES + ('z',)},
+            'in': [name in e for name in NAMES + ('z',)]}
+
+
+def test_fork_matches_copied_dicts():
+    for rng in seeds(300):
+        # pares (Env, dict equivalente); un fork copia el dict
+        pairs = [(env.Env(), {})]
+        since_fork = [{}]
+        for _ in range(rng.randint(1, 60)):
+            i = rng.randrange(len(pairs))
+            e, d = pairs[i]
+            if rng.random() < 0.3:
+                pairs.append((e.fork(), dict(d)))
+                since_fork[i] = {}
+                since_fork.append({})
+            else:
+                name, value = rng.choice(NAMES), rng.randint(0, 9)
+                e[name] = value
+                d[name] = value
+                since_fork[i][name] = value
+        for (e, d), changes in zip(pairs, since_fork):
+            expected = env.Env(d)
+            assert contents(e) == contents(expected)
+            assert e.changes() == changes
+            for name in d:
+                assert e[name] == d[name]
+
+
+def test_long_fork_chains_are_merged():
+    e = env.Env({'a': 0})
+    for i in range(1, 100):
+        e['a'] = i
+        e[f'v{i}'] = i
+        e = e.fork()
+        assert len(e._layers) <= env.MAX_LAYERS
+    assert e['a'] == 99 and len(e) == 100 and e.changes() == {}
+
+
+def test_fork_convenience():
+    base, branch = env.fork({'a': 1})
+    branch['a'] = 2
+    assert (base['a'], branch['a']) == (1, 2)
+    assert env.fork(base)[0] is base
+
+
+def run(node, backend):
+    """Resultados de evaluar `node`, o el tipo del error."""
+    try:
+        return evaluator.evaluate(node, backend)
+    except Exception as e:
+        return type(e).__name__
+
+
+def test_branches_match_full_compilation():
+    for rng in seeds(150):
+        prefix = defined(rng) if rng.random() < 0.8 else program(rng)
+        suffixes = [program(rng, statements=4) for _ in range(rng.randint(1, 4))]
+        backend = rng.choice(evaluator.BACKENDS)
+        payload, status = pipeline.compile_branches(prefix, suffixes, backend)
+        prefix_node = parse(prefix)
+        prefix_sem = semantic.analyze(prefix_node)
+        prefix_result = run(prefix_node, backend) if prefix_sem['ok'] else None
+        if isinstance(prefix_result, str):
+            # la evaluación del prefijo falló: la respuesta es ese error
+            assert status == 400 and not payload['ok']
+            continue
+        assert status == 200
+        assert repr(payload['prefix']['result']) == repr(prefix_result)
+        n = len(prefix_node.statements)
+        for suffix, branch in zip(suffixes, payload['branches']):
+            node = parse(prefix + '\n' + suffix)
+            sem = semantic.analyze(node)
+            expected = run(node, backend) if sem['ok'] else None
+            if isinstance(expected, str):
+                assert not branch['ok'], (prefix, suffix)
+                continue
+            assert branch['ok']
+            assert branch['semantic']['errors'] == sem['errors'][len(prefix_sem['errors']):]
+            assert set(branch['semantic']['symbols']) == {s.name for s in parse(suffix).statements
+                                                          if isinstance(s, ast.Assign)}
+            assert repr(branch['result']) == repr(expected and expected[n:]), (prefix, suffix)
+
+
+def test_branches_do_not_see_each_other():
+    payload, status = pipeline.compile_branches('a = 1\nb = 2', ['a = 10\nc = a + b', 'c = a + b', 'b = b * 3\nb'])
+    assert status == 200
+    assert [b['result'] for b in payload['branches']] == [[10, 12], [3], [6, 6]]
+    assert payload['branches'][1]['semantic']['symbols'] == {'c': None}
+
+
+def test_branch_errors_are_isolated():
+    rng = random.Random(0)
+    prefix = defined(rng)
+    payload, status = pipeline.compile_branches(prefix, ['x = a / 0', 'y = (', 'z = q', 'w = a'])
+    assert status == 200
+    first, second, third, fourth = payload['branches']
+    assert not first['ok']
+    assert not second['validation']['syntactic']['ok']
+    assert third['semantic']['errors'] and third['result'] is None
+    assert fourth['ok'] and fourth['result'] == [evaluator.evaluate(parse(prefix + '\nw = a'))[-1]]
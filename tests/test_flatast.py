@@ -0,0 +1,39 @@
+"""AST plano (compiler.flatast): se serializa, analiza y evalúa igual que el
+AST de objetos."""
+from compiler import evaluator, flatast, lexer, parser, pipeline, semantic
+from tests.programs import defined, outcome, program, seeds
+
+
+def parse(code, builder=None):
+    return parser.parse(lexer.lex(code), False, builder)[0]
+
+
+def test_flat_program_matches_plain_ast():
+    for rng in seeds(300):
+        code = program(rng) if rng.random() < 0.5 else defined(rng)
+        plain = parse(code)
+        flat = parse(code, flatast.FlatBuilder())
+        assert isinstance(flat, flatast.FlatProgram)
+        assert flat.to_dict() == plain.to_dict()
+        assert flatast.flatten(plain).to_dict() == plain.to_dict()
+        assert flat.to_program().to_dict() == plain.to_dict()
+        assert semantic.analyze(flat) == semantic.analyze(plain)
+        for backend in evaluator.BACKENDS:
+            assert outcome(evaluator.evaluate, flat, backend) == outcome(evaluator.evaluate, plain, backend), code
+
+
+def test_flat_response_matches_plain_response():
+    for rng in seeds(50):
+        code = defined(rng)
+        plain, status = pipeline.compile_source(code)
+        flat, flat_status = pipeline.compile_source(code, flat=True)
+        # la traza de un error de ejecución pasa por funciones distintas
+        plain.pop('trace', None)
+        flat.pop('trace', None)
+        assert (flat_status, flat) == (status, plain)
+
+
+def test_literals_are_not_merged_across_types():
+    flat = parse('a = 1\nb = 1.0\nc = 0.0\nd = 0', flatast.FlatBuilder())
+    assert [repr(v) for v in flat.consts] == ['1', '1.0', '0.0', '0']
+    assert evaluator.evaluate(flat) == [1, 1.0, 0.0, 0]
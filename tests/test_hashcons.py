@@ -0,0 +1,79 @@
+"""AST compartido (compiler.hashcons): se serializa, analiza y evalúa igual
+que el AST de objetos, también cuando las variables cambian entre dos
+apariciones de la misma subexpresión."""
+from compiler import evaluator, hashcons, lexer, limits, parser, pipeline, semantic
+from tests.programs import NAMES, defined, expression, outcome, program, seeds
+
+
+def parse(code, builder=None):
+    return parser.parse(lexer.lex(code), False, builder)[0]
+
+
+def repetitive(rng):
+    """Programa cuyas sentencias combinan unas pocas subexpresiones y
+    reasignan las variables que éstas leen."""
+    pool = [expression(rng, rng.randint(2, 5)) for _ in range(3)]
+    lines = []
+    for _ in range(rng.randint(2, 12)):
+        expr = ' + '.join(f'({rng.choice(pool)})' for _ in range(rng.randint(1, 3)))
+        lines.append(f'{rng.choice(NAMES)} = {expr}' if rng.random() < 0.7 else expr)
+    return '\n'.join(lines)
+
+
+def codes(n):
+    for rng in seeds(n):
+        yield repetitive(rng) if rng.random() < 0.5 else program(rng) if rng.random() < 0.5 else defined(rng)
+
+
+def memo_evaluate(program_node, builder):
+    return hashcons.evaluate(program_node, builder, limits.Budget(max_int_bits=4096))
+
+
+def test_shared_program_matches_plain_ast():
+    for code in codes(400):
+        plain = parse(code)
+        builder = hashcons.HashConsBuilder()
+        shared = parse(code, builder)
+        assert builder.unique() <= builder.occurrences
+        assert hashcons.to_dict(shared) == plain.to_dict()
+        assert shared.to_dict() == plain.to_dict()
+        assert hashcons.analyze(shared) == semantic.analyze(plain)
+        assert hashcons.analyze(shared, builder.shared()) == semantic.analyze(plain)
+        expected = outcome(evaluator.evaluate, plain, budget=limits.Budget(max_int_bits=4096))
+        assert outcome(memo_evaluate, shared, builder) == expected, code
+
+        # share() sobre el árbol del parser da lo mismo que el builder
+        reshared, rebuilder = hashcons.share(plain)
+        assert hashcons.to_dict(reshared) == plain.to_dict()
+        assert rebuilder.unique() == builder.unique()
+        assert outcome(memo_evaluate, reshared, rebuilder) == expected, code
+
+
+def test_memo_is_invalidated_by_assignments():
+    code = 'a = 1\nb = a * 2 + 1\na = 5\nc = a * 2 + 1\nd = (a * 2 + 1) - b'
+    builder = hashcons.HashConsBuilder()
+    shared = parse(code, builder)
+    assert shared.statements[1].value is shared.statements[3].value
+    stats = {}
+    assert hashcons.evaluate(shared, builder, stats=stats) == [1, 3, 5, 11, 8]
+    assert stats['memo_hits'] == 1
+
+
+def test_literals_are_not_merged_across_types():
+    builder = hashcons.HashConsBuilder()
+    shared = parse('a = 1 + 0.0\nb = 1.0 + 0\nc = 1 + 0.0', builder)
+    first, second, third = (s.value for s in shared.statements)
+    assert first is third and first is not second
+    assert [repr(v) for v in hashcons.evaluate(shared, builder)] == ['1.0', '1.0', '1.0']
+    assert hashcons.to_dict(shared) == parse('a = 1 + 0.0\nb = 1.0 + 0\nc = 1 + 0.0').to_dict()
+
+
+def test_shared_response_matches_plain_response():
+    for code in codes(80):
+        for optimize in (False, True):
+            plain, status = pipeline.compile_source(code, optimize=optimize)
+            shared, shared_status = pipeline.compile_source(code, optimize=optimize, share=True)
+            # la traza de un error de ejecución pasa por funciones distintas
+            plain.pop('trace', None)
+            shared.pop('trace', None)
+            assert (shared_status, shared) == (status, plain), code
@@ -0,0 +1,111 @@
+"""Documentos incrementales (compiler.incremental): tras cada edición, los
+tokens, el AST y el parse-tree coinciden con un lexeo y parseo completo."""
+import pytest
+
+from compiler import incremental, lexer, limits, parser
+from tests.programs import expression, program, seeds
+
+# fragmentos que se insertan: sentencias completas, operadores sueltos,
+# paréntesis sin cerrar, saltos de línea y caracteres inválidos
+SNIPPETS = ('\n', ' ', '+', ' * 2', '(', ')', 'a', '7', '\nb = 1', '1.5', '\n\n', '$', ' = ')
+
+
+def full(code):
+    """(tokens, ast, parse-tree) de un parseo completo, o el tipo del error."""
+    try:
+        tokens = lexer.lex(code)
+        program_node, root = parser.parse(tokens)
+    except Exception as e:
+        return type(e).__name__
+    return tokens, program_node.to_dict(), root.to_text()
+
+
+def incremental_state(doc):
+    if doc.error is not None:
+        return type(doc.error).__name__
+    return doc.tokens(), doc.program().to_dict(), doc.parse_root().to_text()
+
+
+def random_edit(rng, text):
+    start = rng.randint(0, len(text))
+    end = min(len(text), start + rng.choice((0, 0, 1, 2, 5)))
+    if rng.random() < 0.5:
+        new = rng.choice(SNIPPETS)
+    else:
+        new = expression(rng, rng.randint(1, 4))
+    return start, end, new
+
+
+def test_edits_match_full_reparse():
+    for rng in seeds(200):
+        doc = incremental.Document(program(rng))
+        text = doc.text
+        undo = None
+        for version in range(10):
+            if doc.error is not None and undo is not None and rng.random() < 0.8:
+                # deshacer la edición que rompió el documento
+                start, end, new = undo
+            else:
+                start, end, new = random_edit(rng, text)
+            undo = (start, start + len(new), text[start:end])
+            assert doc.apply_edit(version, start, end, new) == version + 1
+            text = text[:start] + new + text[end:]
+            assert doc.text == text
+            assert incremental_state(doc) == full(text), (text, start, end, new)
+
+
+def test_edit_requires_current_version():
+    doc = incremental.Document('a = 1')
+    with pytest.raises(incremental.VersionMismatch):
+        doc.apply_edit(3, 0, 0, 'b = 2\n')
+    with pytest.raises(ValueError):
+        doc.apply_edit(0, 4, 99, '2')
+    with pytest.raises(TypeError):
+        doc.apply_edit(0, 0, 0, 5)
+    assert doc.version == 0 and doc.text == 'a = 1'
+
+
+def test_edit_over_budget_leaves_document_unchanged():
+    doc = incremental.Document('a = 1\nb = a + 2\n')
+    before = incremental_state(doc)
+    for budget, text in [(limits.Budget(max_source_bytes=20), ' + 1' * 5),
+                         (limits.Budget(max_tokens=12), ' + 1' * 5),
+                         (limits.Budget(max_depth=3), '(' * 5 + '1' + ')' * 5)]:
+        with pytest.raises(limits.BudgetExceeded):
+            doc.apply_edit(0, 5, 5, text, budget)
+        assert doc.version == 0
+        assert incremental_state(doc) == before
+
+
+def test_open_over_budget_is_not_stored():
+    store = incremental.DocumentStore()
+    with pytest.raises(limits.BudgetExceeded):
+        store.open('d', 'a = ' + '+'.join('1' * 100), limits.Budget(max_tokens=50))
+    assert store.get('d') is None
+
+
+def test_document_totals_count_against_budget():
+    # cada edición re-lexea una región chica, pero los máximos de tokens y
+    # nodos son los del documento completo, como en el pipeline
+    doc = incremental.Document('a = 1\nb = 2\n')
+    budget = limits.Budget(max_tokens=10)
+    doc.apply_edit(0, 12, 12, 'c = 3\n', budget)
+    with pytest.raises(limits.BudgetExceeded) as info:
+        doc.apply_edit(1, 18, 18, 'd = 4\n', budget)
+    assert info.value.limit == 'tokens'
+    assert doc.text == 'a = 1\nb = 2\nc = 3\n'
+    with pytest.raises(limits.BudgetExceeded) as info:
+        doc.apply_edit(1, 18, 18, 'd = 4\n', limits.Budget(max_nodes=8))
+    assert info.value.limit == 'nodes'
+    doc.apply_edit(1, 18, 18, 'd = 4\n', limits.Budget(max_nodes=9))
+    assert incremental_state(doc) == full(doc.text)
+
+
+def test_edit_respects_deadline():
+    budget = limits.Budget(deadline=1)
+    budget.cancel()
+    doc = incremental.Document('a = 1')
+    with pytest.raises(limits.BudgetExceeded) as info:
+        doc.apply_edit(0, 5, 5, ' + 2', budget)
+    assert info.value.limit == 'cancelled'
+    assert doc.text == 'a = 1'
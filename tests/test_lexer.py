@@ -0,0 +1,98 @@
+"""Lexers (compiler.lexer): scan y scan_columns producen los mismos tokens y
+errores que lex."""
+import random
+
+import pytest
+
+from compiler import lexer, limits, parser
+from tests.programs import program, seeds
+
+# piezas que ejercitan los bordes de cada regla: números con y sin parte
+# decimal, identificadores con dígitos y '_', tabs, saltos de línea y
+# letras/dígitos Unicode; y algunas que son errores léxicos
+PIECES = ('0', '7', '12', '1.5', '007', 'a', 'b1', '_x', 'x_2y', '+', '-', '*', '/', '(', ')', '=', ';',
+          ' ', '\t', '\n', '  ', 'xé', 'añandú', '٣')
+INVALID = ('1.', '.5', '3.0.1', '$', '.', '\r', 'é')
+
+
+def result(func, *args, **kwargs):
+    """Tokens (como lista de tuplas) o (tipo, mensaje) del error."""
+    try:
+        return [tuple(tok) for tok in func(*args, **kwargs)]
+    except Exception as e:
+        return type(e).__name__, str(e)
+
+
+def random_code(rng):
+    return ''.join(rng.choice(INVALID if rng.random() < 0.02 else PIECES) for _ in range(rng.randint(0, 30)))
+
+
+def test_scan_matches_lex_on_programs():
+    for rng in seeds(200):
+        code = program(rng)
+        assert result(lexer.scan, code) == result(lexer.lex, code)
+
+
+def test_scan_matches_lex_on_edge_cases():
+    for rng in seeds(2000):
+        code = random_code(rng)
+        expected = result(lexer.lex, code)
+        assert result(lexer.scan, code) == expected, code
+        assert result(lexer.scan, code.encode('utf-8')) == expected, code
+        assert result(lexer.scan, code, 5) == result(lexer.lex, code, 5), code
+
+
+def test_scan_respects_token_budget():
+    code = ' + '.join(['a'] * 5000)
+    for func in (lexer.lex, lexer.scan):
+        with pytest.raises(limits.BudgetExceeded) as info:
+            func(code, budget=limits.Budget(max_tokens=100))
+        assert info.value.limit == 'tokens'
+        assert len(func(code, budget=limits.Budget(max_tokens=9999))) == 9999
+
+
+def test_lex_col_num_offsets_first_line():
+    code = 'b = 2\nc'
+    tokens = lexer.lex(code, 3, col_num=10)
+    assert [(t.line, t.col) for t in tokens] == [(3, 10), (3, 12), (3, 14), (4, 1)]
+    with pytest.raises(RuntimeError, match='line 1 col 4'):
+        lexer.lex('$', col_num=4)
+
+
+def test_large_random_input():
+    rng = random.Random(99)
+    code = ' '.join(rng.choice(PIECES) for _ in range(20000))
+    assert result(lexer.scan, code) == result(lexer.lex, code)
+
+
+# --- scan_columns: los mismos tokens, guardados en columnas ---
+
+def test_scan_columns_matches_lex():
+    codes = [program(rng) for rng in seeds(200)] + [random_code(rng) for rng in seeds(2000)]
+    codes.append('a = 1 + 1.0 * 0.0 - 1 / 1.0\nb = a')
+    for code in codes:
+        # repr: las constantes deduplicadas no deben confundir 1 con 1.0
+        expected = repr(result(lexer.lex, code))
+        assert repr(result(lexer.scan_columns, code)) == expected, code
+        assert repr(result(lexer.scan_columns, code.encode('utf-8'))) == expected, code
+        assert repr(result(lexer.scan_columns, code, 5)) == repr(result(lexer.lex, code, 5)), code
+
+
+def test_scan_columns_buffer_behaves_like_token_list():
+    code = 'x1 = 2.5 * (x1 + 7)\ny = x1'
+    tokens = lexer.lex(code)
+    buf = lexer.scan_columns(code)
+    assert len(buf) == len(tokens)
+    assert buf.to_list() == tokens
+    assert [buf[i] for i in range(-len(buf), len(buf))] == tokens + tokens
+    assert buf[2:5] == tokens[2:5]
+    assert buf.symbols.names == ['x1', 'y']
+    assert parser.parse(buf, build_tree=False)[0].to_dict() == parser.parse(tokens, build_tree=False)[0].to_dict()
+
+
+def test_scan_columns_respects_token_budget():
+    code = ' + '.join(['a'] * 5000)
+    with pytest.raises(limits.BudgetExceeded) as info:
+        lexer.scan_columns(code, budget=limits.Budget(max_tokens=100))
+    assert info.value.limit == 'tokens'
+    assert len(lexer.scan_columns(code, budget=limits.Budget(max_tokens=9999))) == 9999
@@ -0,0 +1,24 @@
+"""Pruebas del canal de compilación en vivo (compiler.live)."""
+from compiler import limits, live, metrics, pipeline
+
+
+def _error_counts():
+    return (sum(metrics.ERRORS._values.values()), metrics.BUDGET_EXCEEDED.value('cancelled'))
+
+
+def test_superseded_version_is_not_an_error():
+    channel = live.Channel('test')
+    old = limits.Budget()
+    assert channel.submit(1, old)
+    emit = channel.emitter(1)
+    assert channel.submit(2, limits.Budget())
+    before = _error_counts()
+    payload, status = pipeline.compile_source('a = 1 + 2', budget=old, emit=emit)
+    assert status == 400 and payload['budget']['limit'] == 'cancelled'
+    assert _error_counts() == before
+
+
+def test_compile_live_outcomes():
+    channel = live.Channel('test')
+    assert live.compile_live(channel, 2, 'a = 1', {}, limits.Budget()) == 'done'
+    assert live.compile_live(channel, 1, 'a = 2', {}, limits.Budget()) == 'stale'
@@ -0,0 +1,74 @@
+"""Métricas (/metrics): histogramas por etapa del pipeline y contadores de
+errores en formato Prometheus."""
+import re
+
+import pytest
+
+import app as app_module
+
+STAGES = ('lex', 'tokens', 'parse', 'to_dict', 'parse_text', 'parse_text_centered', 'semantic',
+          'evaluate', 'serialize')
+SAMPLE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+
+
+@pytest.fixture
+def client():
+    app_module.compile_cache.clear()
+    return app_module.app.test_client()
+
+
+def samples(client):
+    """Muestras de /metrics: (nombre, etiquetas ordenadas) -> valor."""
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    assert r.mimetype == 'text/plain'
+    out = {}
+    for line in r.data.decode().splitlines():
+        if line.startswith('#') or not line:
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        key = tuple(sorted(re.findall(r'(\w+)="([^"]*)"', labels or '')))
+        out[name, key] = float(value)
+    return out
+
+
+def test_metrics_expose_stage_histograms(client):
+    before = samples(client)
+    r = client.post('/compile', json={'code': 'a = 1 + 2\nb = a * 3'})
+    assert r.status_code == 200
+    after = samples(client)
+    for stage in STAGES:
+        count = ('compiler_stage_seconds_count', (('stage', stage),))
+        assert after[count] - before.get(count, 0) == 1, stage
+        total = ('compiler_stage_seconds_sum', (('stage', stage),))
+        assert after[total] >= before.get(total, 0)
+        inf = ('compiler_stage_seconds_bucket', (('le', '+Inf'), ('stage', stage)))
+        assert after[inf] == after[count]
+    requests = ('http_requests_total', (('endpoint', 'compile_code'), ('status', '200')))
+    assert after[requests] - before.get(requests, 0) == 1
+
+
+def test_buckets_are_cumulative(client):
+    client.post('/compile', json={'code': 'a = 1'})
+    buckets = {}
+    for (name, labels), value in samples(client).items():
+        if name == 'compiler_stage_seconds_bucket':
+            labels = dict(labels)
+            le = float('inf') if labels['le'] == '+Inf' else float(labels['le'])
+            buckets.setdefault(labels['stage'], []).append((le, value))
+    assert set(STAGES) <= set(buckets)
+    for values in buckets.values():
+        counts = [v for _, v in sorted(values)]
+        assert counts == sorted(counts)
+
+
+def test_budget_errors_are_counted(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'MAX_TOKENS', 3)
+    before = samples(client)
+    r = client.post('/compile', json={'code': 'a = 1 + 2'})
+    assert r.status_code == 400
+    after = samples(client)
+    key = ('compiler_budget_exceeded_total', (('limit', 'tokens'),))
+    assert after[key] - before.get(key, 0) == 1
+    key = ('compiler_errors_total', (('phase', 'lexical'),))
+    assert after[key] - before.get(key, 0) == 1
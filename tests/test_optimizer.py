@@ -0,0 +1,50 @@
+"""Optimizador (compiler.optimizer): el programa optimizado evalúa igual."""
+import pytest
+
+from compiler import evaluator, lexer, optimizer, parser
+from tests.programs import defined, outcome, program, seeds
+
+
+def parse(code):
+    return parser.parse(lexer.lex(code), build_tree=False)[0]
+
+
+def test_optimized_program_evaluates_the_same():
+    for rng in seeds(500):
+        code = program(rng) if rng.random() < 0.5 else defined(rng)
+        ast_node = parse(code)
+        optimized = optimizer.optimize(ast_node)['program']
+        assert outcome(evaluator.evaluate, optimized) == outcome(evaluator.evaluate, ast_node), code
+
+
+def test_optimizer_does_not_modify_input():
+    ast_node = parse('a = 2\nb = a * 3 + 0\nb')
+    before = ast_node.to_dict()
+    result = optimizer.optimize(ast_node)
+    assert ast_node.to_dict() == before
+    assert result['removed'] > 0
+
+
+@pytest.mark.parametrize('code', [
+    'y = (0 - 1.5) * a\ny + 0',    # y vale -0.0 y -0.0 + 0 da 0.0
+    'y = (0 - 1.5) * a\n0 + y',
+    'y = (0 - 1.5) * a\ny * 0',
+    'x = 1.5 / 0.0\nx * 0',                # no se llega a evaluar
+    'x = a / b\nx * 0',                    # a / b es float
+    'x = a * 1.5\n0 * x',
+])
+def test_float_identities_are_kept(code):
+    ast_node = parse(code)
+    optimized = optimizer.optimize(ast_node)['program']
+    assert outcome(evaluator.evaluate, optimized) == outcome(evaluator.evaluate, ast_node)
+    last = optimized.statements[-1]
+    assert last.to_dict()['type'] == 'BinOp'
+
+
+def test_int_identities_are_simplified():
+    optimized = optimizer.optimize(parse('x = a * 2\nx + 0\n0 * x\nx * 1'))['program']
+    assert [s.to_dict() for s in optimized.statements[1:]] == [
+        {'type': 'Var', 'name': 'x'},
+        {'type': 'Number', 'value': 0},
+        {'type': 'Var', 'name': 'x'},
+    ]
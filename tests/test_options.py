@@ -0,0 +1,43 @@
+"""Opciones de compilación (compiler.pipeline.read_options)."""
+import pytest
+
+from compiler import pipeline
+
+
+def test_defaults():
+    options = pipeline.read_options({})
+    assert options['sections'] == tuple(sorted(pipeline.DEFAULT_SECTIONS))
+    assert options['render_options'] == {'max_depth': None, 'max_chain': None, 'max_width': None}
+    assert pipeline.read_options({'sections': []})['sections'] == options['sections']
+    assert pipeline.read_options({'sections': ''})['sections'] == options['sections']
+
+
+def test_sections_as_list_or_string():
+    assert pipeline.read_options({'sections': 'result,ast,result'})['sections'] == ('ast', 'result')
+    assert pipeline.read_options({'sections': ['validation', 'result']})['sections'] == ('result', 'validation')
+
+
+@pytest.mark.parametrize('data', [
+    {'sections': 5},
+    {'sections': {'result': True}},
+    {'sections': ['result', 5]},
+    {'sections': ['result', ['ast']]},
+    {'sections': 'result,nope'},
+    {'render': 5},
+    {'render': []},
+    {'render': 'max_depth'},
+    {'render': {'max_depth': '3'}},
+    {'render': {'max_depth': -1}},
+    {'render': {'depth': 3}},
+    {'backend': ['tree']},
+    {'tokenizer': ['scan']},
+    {'flat': True, 'share': True},
+])
+def test_invalid_options_raise_value_error(data):
+    with pytest.raises(ValueError):
+        pipeline.read_options(data)
+
+
+def test_compile_source_rejects_flat_with_share():
+    with pytest.raises(ValueError, match='flat'):
+        pipeline.compile_source('a = 1', flat=True, share=True)
@@ -0,0 +1,63 @@
+"""Pruebas del parser de Pratt (compiler.parser)."""
+import pytest
+
+from compiler import ast, lexer, limits, parser
+
+
+def test_no_prefix_operators_registered_by_default():
+    # el AST no tiene nodos unarios: un '-' al comienzo de un operando es un error
+    with pytest.raises(parser.ParserError):
+        parser.parse(lexer.lex('x = -a'))
+    with pytest.raises(parser.ParserError):
+        parser.parse(lexer.lex('x = 2 * (-a)'))
+
+
+def test_operator_tables_hold_the_default_operators():
+    infix = {name for name in parser.OP_NAME[:parser.PREFIX] if name is not None}
+    prefix = {name for name in parser.OP_NAME[parser.PREFIX:] if name is not None}
+    assert infix == {'PLUS', 'MINUS', 'MUL', 'DIV'}
+    assert prefix == set()
+    assert not any(parser.RBP[parser.PREFIX:])
+
+
+class UnaryBuilder(ast.ASTBuilder):
+    """ASTBuilder con nodos unarios como tuplas ('neg', operando)."""
+    @staticmethod
+    def unary(op, operand):
+        return ('neg' if op == 'MINUS' else op, operand)
+
+
+@pytest.fixture
+def minus_prefix():
+    # registra un '-' prefijo y deja las tablas como estaban al terminar
+    tables = [table[:] for table in (parser.LBP, parser.RBP, parser.SYMBOL, parser.OP_NAME)]
+    parser.register_prefix('MINUS', 3, '-')
+    yield
+    for table, saved in zip((parser.LBP, parser.RBP, parser.SYMBOL, parser.OP_NAME), tables):
+        table[:] = saved
+
+
+def expr(code, **kwargs):
+    p = parser.Parser(lexer.lex(code), builder=UnaryBuilder(), **kwargs)
+    return p.parse_expr()
+
+
+def test_registered_prefix_operator(minus_prefix):
+    node, pt = expr('-x')
+    assert node[0] == 'neg' and node[1].to_dict() == ast.Var('x').to_dict()
+    assert pt.to_text() == parser.ParseNode('E', [parser.ParseNode('-'), parser.ParseNode(
+        'F', [parser.ParseNode('id', ['x'])])]).to_text()
+
+    # liga más fuerte que '*' y que el '-' binario, y se anida
+    node, _ = expr('a - -b * c')
+    assert node.op == 'MINUS'
+    assert node.right.op == 'MUL'
+    assert node.right.left[0] == 'neg'
+    node, _ = expr('--(x)')
+    assert node[0] == 'neg' and node[1][0] == 'neg'
+
+
+def test_prefix_operator_counts_against_depth(minus_prefix):
+    with pytest.raises(limits.BudgetExceeded) as info:
+        expr('-' * 20 + 'x', budget=limits.Budget(max_depth=10))
+    assert info.value.limit == 'depth'
@@ -0,0 +1,117 @@
+"""Render centrado del parse-tree (compiler.render): mismo texto que el
+algoritmo original sin límites, y elisiones que respetan cada límite."""
+import pytest
+
+from compiler import lexer, parser, render
+from compiler.parser import ParseNode
+from tests.programs import defined, program, seeds
+
+
+def tree(code):
+    return parser.parse(lexer.lex(code))[1]
+
+
+def trees(n):
+    for rng in seeds(n):
+        yield tree(program(rng, size=10) if rng.random() < 0.5 else defined(rng, size=10))
+
+
+# --- referencia: el algoritmo original (recursivo, copia las líneas de los hijos) ---
+
+def ref_block(node):
+    """(líneas, ancho, columna del centro) del subárbol."""
+    if not isinstance(node, ParseNode) or not node.children:
+        text = str(node.label if isinstance(node, ParseNode) else node)
+        return [text], len(text), len(text) // 2
+    blocks = [ref_block(c) for c in node.children]
+    offsets, cur = [], 0
+    for _, width, _ in blocks:
+        offsets.append(cur)
+        cur += width + render.GAP
+    total = cur - render.GAP
+    mid = total // 2
+    label = str(node.label)
+    label_x = max(0, mid - len(label) // 2)
+    width = max(total, label_x + len(label))
+    positions = [off + m for off, (_, _, m) in zip(offsets, blocks)]
+    lo, hi = min(positions[0], mid), max(positions[-1], mid)
+    connector = ['-'] * (hi - lo + 1)
+    for pos in positions:
+        connector[pos - lo] = '+'
+    lines = [' ' * label_x + label, ' ' * mid + '|', ' ' * lo + ''.join(connector)]
+    for row in range(max(len(lines) for lines, _, _ in blocks)):
+        line = ''
+        for off, (child_lines, child_width, _) in zip(offsets, blocks):
+            text = child_lines[row] if row < len(child_lines) else ''
+            line = line.ljust(off) + text.ljust(child_width)
+        lines.append(line)
+    return lines, width, mid
+
+
+def ref_text(root):
+    return '\n'.join(line.rstrip() for line in ref_block(root)[0])
+
+
+def size(node):
+    return 1 + sum(size(c) for c in node.children) if isinstance(node, ParseNode) else 1
+
+
+# --- pruebas ---
+
+def test_unbounded_render_matches_original_algorithm():
+    for root in trees(150):
+        assert render.render_centered(root) == ref_text(root)
+
+
+def test_layout_matches_text():
+    for root in trees(50):
+        renderer = render.Renderer(max_depth=6, max_width=60)
+        lines = renderer.to_text(root).splitlines()
+        layout = renderer.layout(root)
+        assert layout['height'] == len(lines)
+        for node in layout['nodes']:
+            assert lines[node['y']][node['x']:node['x'] + len(node['label'])] == node['label']
+        # cada nodo cuelga de uno anterior, tres filas más arriba
+        for node in layout['nodes'][1:]:
+            assert layout['nodes'][node['parent']]['y'] == node['y'] - 3
+
+
+@pytest.mark.parametrize('limits', [{'max_depth': 4}, {'max_chain': 2}, {'max_width': 40},
+                                    {'max_depth': 6, 'max_chain': 3, 'max_width': 80}])
+def test_elision_respects_limits_and_counts_hidden_nodes(limits):
+    for root in trees(100):
+        renderer = render.Renderer(**limits)
+        layout = renderer.layout(root)
+        nodes = layout['nodes']
+        # los nodos visibles más los resumidos son todos los del árbol
+        assert sum(n.get('hidden', 1) for n in nodes) == size(root)
+        if 'max_depth' in limits:
+            # niveles mostrados, más el de los nodos '... (+N)'
+            assert max(n['y'] for n in nodes) // 3 + 1 <= limits['max_depth'] + 1
+        if 'max_chain' in limits:
+            for n in nodes:
+                run, p = 1, n['parent']
+                while p >= 0 and nodes[p]['label'] == n['label'] and 'hidden' not in n:
+                    run, p = run + 1, nodes[p]['parent']
+                assert run <= limits['max_chain']
+        if 'max_width' in limits:
+            text = renderer.to_text(root)
+            assert max(len(line) for line in text.splitlines()) <= limits['max_width']
+            assert layout['width'] <= limits['max_width']
+
+
+def test_cache_gives_same_text():
+    cache = {}
+    for root in trees(50):
+        for limits in ({}, {'max_depth': 5}, {'max_width': 50}):
+            cached = render.Renderer(cache=cache, **limits).to_text(root)
+            assert cached == render.Renderer(**limits).to_text(root)
+            # el mismo árbol otra vez: sale de la caché
+            assert render.Renderer(cache=cache, **limits).to_text(root) == cached
+
+
+def test_elided_node_label():
+    root = tree('x = ((((a))))')
+    text = render.render_centered(root, max_depth=3)
+    assert '... (+' in text
+    assert render.render_centered(root, max_depth=100) == render.render_centered(root)
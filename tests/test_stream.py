@@ -0,0 +1,62 @@
+"""Pipeline en streaming (compiler.stream): mismos tokens y resultados que
+el pipeline completo, con memoria acotada por sentencia."""
+import tracemalloc
+
+from compiler import evaluator, lexer, limits, parser, stream
+from tests.programs import outcome, program, seeds
+
+
+def run(source, chunk_size=stream.DEFAULT_CHUNK_SIZE, budget=None):
+    return list(stream.run_stream(source, chunk_size, budget))
+
+
+def test_tokens_match_lex_for_any_chunk_size():
+    for rng in seeds(200):
+        code = program(rng).replace('\n', rng.choice(('\n', '; ', ' ')), rng.randint(0, 4))
+        if rng.random() < 0.2:
+            code += rng.choice(('$', ' .', '\n#'))
+        chunk_size = rng.choice((1, 2, 3, 7, 64))
+        source = code if rng.random() < 0.5 else code.encode('utf-8')
+        assert outcome(lambda: list(stream.iter_tokens(source, chunk_size))) == outcome(lexer.lex, code), code
+
+
+def test_results_match_full_pipeline():
+    for rng in seeds(200):
+        code = program(rng)
+        records = run(code, chunk_size=5)
+        results = [r['result'] for r in records if 'result' in r]
+        program_node, _ = parser.parse(lexer.lex(code), build_tree=False)
+        if records[-1]['ok']:
+            assert results == evaluator.evaluate(program_node)
+
+
+def test_long_single_line_has_bounded_memory():
+    # ~110 KB en una sola línea: lexearla entera ocuparía unos 7 MB
+    code = 'a = 0; ' + 'a = a + 1; ' * 10000
+    tracemalloc.start()
+    try:
+        last = None
+        for record in stream.run_stream(code, chunk_size=4096):
+            last = record
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert last == {'done': True, 'statements': 10001, 'ok': True}
+    assert peak < 1024 * 1024
+
+
+def test_statement_bytes_are_limited():
+    # un paréntesis sin cerrar: la sentencia nunca termina
+    code = 'a = (' + '1 + ' * 100000
+    records = run(code, chunk_size=256, budget=limits.Budget(max_source_bytes=4096))
+    assert records[-2]['phase'] == 'lexical'
+    assert records[-2]['budget']['limit'] == 'source_bytes'
+    assert records[-1] == {'done': True, 'statements': 0, 'ok': False}
+
+
+def test_split_token_bytes_are_limited():
+    records = run('a = ' + 'x' * 100000, chunk_size=256, budget=limits.Budget(max_source_bytes=4096))
+    assert records[-2]['budget']['limit'] == 'source_bytes'
+    # las sentencias cortas en una sola línea no agotan el límite
+    records = run('a = 1; ' * 10000, chunk_size=256, budget=limits.Budget(max_source_bytes=4096))
+    assert records[-1] == {'done': True, 'statements': 10000, 'ok': True}
@@ -0,0 +1,50 @@
+"""Evaluación vectorizada (compiler.vectorized): cada fila da lo mismo que el
+evaluador por árbol. NumPy es opcional: sin él estas pruebas se omiten."""
+import pytest
+
+from compiler import evaluator, lexer, parser, vectorized
+from tests.programs import outcome, program, seeds
+
+
+def parse(code):
+    return parser.parse(lexer.lex(code), build_tree=False)[0]
+
+
+def row_results(program_node, env):
+    return outcome(evaluator.Evaluator(None, dict(env)).eval, program_node)
+
+
+def test_rows_match_tree_evaluator():
+    np = pytest.importorskip('numpy')
+    # sin ceros en las columnas, para que pocas divisiones fallen
+    columns = {'a': np.array([1, -2, 7, 3]), 'b': np.array([1.5, -0.5, 3.0, -1.0]),
+               'c': np.array([2, 5, -1, 4]), 'd': np.array([0.5, 2.0, 1.0, -3.0])}
+    rows = [{name: col[i].item() for name, col in columns.items()} for i in range(4)]
+    for rng in seeds(300):
+        program_node = parse(program(rng))
+        try:
+            results = vectorized.evaluate_columns(program_node, columns)
+        except ZeroDivisionError:
+            # alguna fila divide por cero
+            assert 'ZeroDivisionError' in [row_results(program_node, env) for env in rows]
+            continue
+        for i, env in enumerate(rows):
+            assert repr([col[i].item() for col in results]) == row_results(program_node, env)
+
+
+def test_zero_division_nan():
+    np = pytest.importorskip('numpy')
+    (result,) = vectorized.evaluate_columns(parse('1 / a'), {'a': [1, 0, 4]}, zero_division='nan')
+    assert result[0] == 1.0 and np.isnan(result[1]) and result[2] == 0.25
+
+
+def test_int64_overflow_raises():
+    pytest.importorskip('numpy')
+    with pytest.raises(OverflowError):
+        vectorized.evaluate_columns(parse('a * a'), {'a': [2 ** 40]})
+
+
+def test_without_numpy_raises_clear_error(monkeypatch):
+    monkeypatch.setattr(vectorized, 'np', None)
+    with pytest.raises(RuntimeError, match='numpy'):
+        vectorized.evaluate_columns(parse('a + 1'), {'a': [1, 2]})